@@ -1,44 +1,87 @@
 """
 AI/ML Engine Entry Point
 Main module for the medical AI system
+
+Submodules are imported on first attribute access (PEP 562), so
+`import ai_ml_engine` stays cheap and the shared MedicalAICore is only
+built when `ai_core` (or a convenience function) is first used.
 """
 
-from .medical_ai_core import MedicalAICore, MedicalAnalysisResult
-from .inference.optimized_medicine_analyzer import OptimizedMedicineAnalyzer, MedicineInfo
-from .local_llm_integration import LocalMedicalLLM, LLMResponse
-from .medical_agents import MedicalAgentOrchestrator, PatientContext, MedicalAgentResponse
-from .caching_system import cache_manager, cache_memoize
+import importlib
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .medical_agents import PatientContext
 
-# Create main instances
-ai_core = MedicalAICore()
+# Public name -> (submodule, attribute)
+_LAZY_ATTRIBUTES = {
+    'MedicalAICore': ('.medical_ai_core', 'MedicalAICore'),
+    'MedicalAnalysisResult': ('.medical_ai_core', 'MedicalAnalysisResult'),
+    'OptimizedMedicineAnalyzer': ('.inference.optimized_medicine_analyzer', 'OptimizedMedicineAnalyzer'),
+    'MedicineInfo': ('.inference.optimized_medicine_analyzer', 'MedicineInfo'),
+    'LocalMedicalLLM': ('.local_llm_integration', 'LocalMedicalLLM'),
+    'LLMResponse': ('.local_llm_integration', 'LLMResponse'),
+    'MedicalAgentOrchestrator': ('.medical_agents', 'MedicalAgentOrchestrator'),
+    'PatientContext': ('.medical_agents', 'PatientContext'),
+    'MedicalAgentResponse': ('.medical_agents', 'MedicalAgentResponse'),
+    'cache_manager': ('.caching_system', 'cache_manager'),
+    'cache_memoize': ('.caching_system', 'cache_memoize'),
+    # Not 'model_registry': importing the submodule binds that name to the module itself
+    'registry': ('.model_registry', 'model_registry'),
+    'ModelRegistry': ('.model_registry', 'ModelRegistry'),
+    'ModelLoadError': ('.model_registry', 'ModelLoadError'),
+}
 
 # Export main classes and functions
 __all__ = [
     'ai_core',
     'MedicalAICore',
-    'OptimizedMedicineAnalyzer', 
+    'OptimizedMedicineAnalyzer',
     'LocalMedicalLLM',
     'MedicalAgentOrchestrator',
     'PatientContext',
     'MedicalAnalysisResult',
     'MedicineInfo',
     'LLMResponse',
-    'cache_manager'
+    'cache_manager',
+    'registry'
 ]
 
+_ai_core = None
+_ai_core_lock = threading.Lock()
+
+def __getattr__(name: str):
+    if name == 'ai_core':
+        return get_ai_core()
+    if name in _LAZY_ATTRIBUTES:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        value = getattr(importlib.import_module(module_name, __name__), attribute)
+        globals()[name] = value  # Later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'ai_core'})
+
 def get_ai_core():
-    """Get the main AI core instance"""
-    return ai_core
+    """Get the main AI core instance (created on first use)"""
+    global _ai_core
+    if _ai_core is None:
+        with _ai_core_lock:
+            if _ai_core is None:
+                _ai_core = __getattr__('MedicalAICore')()
+    return _ai_core
 
-def analyze_patient_case(patient_id: str, symptoms: list, patient_context: PatientContext):
+def analyze_patient_case(patient_id: str, symptoms: list, patient_context: 'PatientContext'):
     """Convenience function to analyze a patient case"""
     import asyncio
-    return asyncio.run(ai_core.analyze_patient_case(patient_id, symptoms, patient_context))
+    return asyncio.run(get_ai_core().analyze_patient_case(patient_id, symptoms, patient_context))
 
 def analyze_medicine_from_text(text: str):
     """Convenience function to analyze medicine from text"""
-    return ai_core.analyze_medicine_from_text(text)
+    return get_ai_core().analyze_medicine_from_text(text)
 
-def get_medical_advice(query: str, patient_context: PatientContext = None):
+def get_medical_advice(query: str, patient_context: 'PatientContext' = None):
     """Convenience function to get medical advice"""
-    return ai_core.get_medical_advice(query, patient_context)
\ No newline at end of file
+    return get_ai_core().get_medical_advice(query, patient_context)
@@ -7,8 +7,6 @@ import asyncio
 import json
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
-from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
-import torch
 import numpy as np
 from scipy import spatial
 from datetime import datetime, timedelta
@@ -18,7 +16,7 @@ import asyncio
 from .inference.optimized_medicine_analyzer import OptimizedMedicineAnalyzer, MedicineInfo
 from .local_llm_integration import LocalMedicalLLM, LLMResponse
 from .medical_agents import MedicalAgentOrchestrator, PatientContext, MedicalAgentResponse
-from .caching_system import cache_manager, cache_memoize
+from .caching_system import cache_manager, cache_memoize, make_cache_key
 from .medical_ai_core import MedicalAICore, MedicalAnalysisResult
 
 @dataclass
@@ -42,27 +40,25 @@ class AdvancedMedicalAI:
     Advanced AI system with contextual understanding and voice capabilities
     """
     
-    def __init__(self):
-        self.medicine_analyzer = OptimizedMedicineAnalyzer()
-        
-        # Initialize local LLM for enhanced medical knowledge
-        self.local_llm = LocalMedicalLLM()
-        
-        # Initialize the integrated medical AI core system
-        self.medical_ai_core = MedicalAICore()
+    def __init__(self, medical_ai_core: Optional[MedicalAICore] = None):
+        """
+        Args:
+            medical_ai_core: Core to build on (default: the package's shared core, so no
+                second analyzer, LLM client or set of models is created)
+        """
+        if medical_ai_core is None:
+            from . import get_ai_core
+            medical_ai_core = get_ai_core()
+        self.medical_ai_core = medical_ai_core
         
         # Get components from the core system
+        self.medicine_analyzer = self.medical_ai_core.medicine_analyzer
         self.agent_orchestrator = self.medical_ai_core.agent_orchestrator
         self.cache_manager = self.medical_ai_core.cache_manager
         self.local_llm = self.medical_ai_core.local_llm
         
-        # Check if LLM is available
-        self.llm_available = self.local_llm.check_connection()
         self.contexts = {}  # user_id -> ConversationContext
         self.medical_knowledge_base = {}
-        self.qa_pipeline = None
-        self.summarizer = None
-        self.nlp_pipeline = None
         
         # Initialize advanced NLP models
         self._initialize_models()
@@ -72,39 +68,38 @@ class AdvancedMedicalAI:
         
         # Load medical knowledge base
         self._load_medical_knowledge_base()
-        
+
+    @property
+    def llm_available(self) -> bool:
+        """Cached LLM availability from the shared core (probed on first use)"""
+        return self.medical_ai_core.llm_available
+
+    # Pipelines are looked up in the shared model registry on each use, so an evicted one can be freed
+    @property
+    def qa_pipeline(self):
+        return self.medical_ai_core.get_qa_pipeline()
+
+    @property
+    def summarizer(self):
+        return self.medical_ai_core.get_summarizer()
+
+    @property
+    def nlp_pipeline(self):
+        return self.medical_ai_core.get_nlp_pipeline()
+
     def _initialize_models(self):
         """
         Initialize advanced NLP models for medical understanding
+        
+        QA, summarization and NER come from the core's model registry, so they
+        are shared with MedicalAICore instead of being loaded a second time.
         """
-        try:
-            # Question answering pipeline for medical queries
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/roberta-base-squad2",
-                tokenizer="deepset/roberta-base-squad2"
-            )
-            
-            # Summarization pipeline for condensing medical information
-            self.summarizer = pipeline(
-                "summarization",
-                model="facebook/bart-large-cnn"
-            )
-            
-            # Named entity recognition for medical terms
-            self.nlp_pipeline = pipeline(
-                "ner",
-                model="dslim/bert-base-NER",
-                grouped_entities=True
-            )
-            
+        loaded = [name for name in ('qa', 'summarizer', 'ner') if self.medical_ai_core.get_pipeline(name) is not None]
+        if len(loaded) == 3:
             print("Advanced AI models initialized successfully")
-        except Exception as e:
-            print(f"Error initializing AI models: {e}")
-            # Fallback to simpler models
-            self.qa_pipeline = None
-            self.summarizer = None
-            self.nlp_pipeline = None
+        else:
+            # Handlers fall back to simpler logic when a pipeline is None
+            print(f"Error initializing AI models: only {loaded or 'none'} available")
     
     def _initialize_local_medical_knowledge(self):
         """
@@ -217,7 +212,7 @@ class AdvancedMedicalAI:
         result = self.agent_orchestrator.process_patient_input(symptoms, patient_context)
         
         # Check cache first
-        cache_key = f"patient_analysis:{user_id}:{hash(str(symptoms) + str(patient_context.__dict__))}"
+        cache_key = make_cache_key("patient_analysis", user_id, symptoms, patient_context)
         cached_result = self.cache_manager.get_cached_agent_response(cache_key)
         if cached_result:
             # Update user context with cached result
@@ -475,12 +470,13 @@ class AdvancedMedicalAI:
         Handle general requests that don't match specific intents
         """
         # Try to understand the request using QA model if available
-        if self.qa_pipeline:
+        qa_pipeline = self.qa_pipeline
+        if qa_pipeline:
             try:
                 # Create a context for the QA model
                 context_text = "Medical assistant for visually impaired users. Provides information about medicines, dosages, side effects, and warnings."
                 
-                result = self.qa_pipeline(question=command, context=context_text)
+                result = qa_pipeline(question=command, context=context_text)
                 
                 if result['score'] > 0.3:  # Confidence threshold
                     return {
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Admission policy trace replay
+Replays a daemon request log (or a synthetic one) against LRUCache with and
+without TinyLFU admission and prints the hit ratio at several capacities
+"""
+
+import sys
+import os
+import json
+import random
+import argparse
+from itertools import accumulate
+from bisect import bisect
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import LRUCache, make_cache_key
+
+DEFAULT_CAPACITIES = [50, 100, 200, 400]
+PAYLOAD_FIELDS = ('query', 'text', 'command', 'image_path', 'symptoms')
+
+
+def load_trace(path: str):
+    """Read daemon request JSON lines (as sent on stdin) into cache keys"""
+    keys = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            payload = [request.get(field) for field in PAYLOAD_FIELDS]
+            keys.append(make_cache_key(request.get('action', ''), *payload))
+    return keys
+
+
+def synthetic_trace(length: int, questions: int, one_off_share: float, seed: int):
+    """
+    Zipf-popular medicine questions interleaved with bursts of one-off chat queries,
+    like voice sessions where users ramble between repeat look-ups
+    """
+    rng = random.Random(seed)
+    cumulative = list(accumulate(1 / (rank ** 0.9) for rank in range(1, questions + 1)))
+    keys = []
+    one_off = 0
+    while len(keys) < length:
+        if rng.random() < one_off_share / 30:
+            burst = rng.randint(10, 50)
+            for _ in range(burst):
+                keys.append(f"chat:{one_off}")
+                one_off += 1
+        else:
+            rank = bisect(cumulative, rng.random() * cumulative[-1])
+            keys.append(f"question:{rank}")
+    return keys[:length]
+
+
+def replay(keys, capacity: int, admission) -> float:
+    """Return hit ratio (%) of a get-then-put-on-miss replay"""
+    cache = LRUCache(capacity=capacity, ttl=10 ** 9, admission=admission)
+    for key in keys:
+        if cache.get(key) is None:
+            cache.put(key, True)
+    stats = cache.get_stats()
+    return stats['hits'] / len(keys) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trace', type=str, help='Daemon request log (JSON lines); synthetic if omitted')
+    parser.add_argument('--length', type=int, default=200_000, help='Synthetic trace length')
+    parser.add_argument('--questions', type=int, default=2_000, help='Distinct repeat questions')
+    parser.add_argument('--one-off-share', type=float, default=0.4, help='Approximate share of one-off queries')
+    parser.add_argument('--capacities', type=int, nargs='+', default=DEFAULT_CAPACITIES)
+    args = parser.parse_args()
+
+    if args.trace:
+        keys = load_trace(args.trace)
+        source = args.trace
+    else:
+        keys = synthetic_trace(args.length, args.questions, args.one_off_share, seed=11)
+        source = "synthetic"
+
+    print(f"=== Hit Ratio: LRU vs TinyLFU ({source}, {len(keys):,} requests, {len(set(keys)):,} distinct) ===")
+    print(f"{'capacity':>10} | {'LRU':>8} | {'TinyLFU':>8}")
+    for capacity in args.capacities:
+        lru = replay(keys, capacity, None)
+        tinylfu = replay(keys, capacity, 'tinylfu')
+        print(f"{capacity:>10} | {lru:>7.2f}% | {tinylfu:>7.2f}%")
+
+
+if __name__ == "__main__":
+    main()
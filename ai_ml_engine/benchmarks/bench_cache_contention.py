@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for MedicalCacheManager
+Runs 1-32 threads doing mixed gets/puts and compares a single-lock cache with the sharded mode
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import MedicalCacheManager
+
+DEFAULT_THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+
+
+def run_workers(manager: MedicalCacheManager, threads: int, ops_per_thread: int, key_space: int) -> float:
+    """Run threads against the manager and return total operations per second"""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        keys = [f"drug{rng.randrange(key_space)}" for _ in range(ops_per_thread)]
+        barrier.wait()
+        for i, key in enumerate(keys):
+            # ~80% reads, matching a warm daemon serving repeat scans
+            if i % 5 == 0:
+                manager.cache_medicine_info(key, {"name": key})
+            elif manager.get_cached_medicine_info(key) is None:
+                manager.cache_medicine_info(key, {"name": key})
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return threads * ops_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=20_000, help='Operations per thread')
+    parser.add_argument('--key-space', type=int, default=400)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--threads', type=int, nargs='+', default=DEFAULT_THREAD_COUNTS)
+    args = parser.parse_args()
+
+    print("=== MedicalCacheManager Contention ===")
+    print(f"{'threads':>8} | {'single lock ops/s':>18} | {f'{args.shards} shards ops/s':>18} | {'hit rate':>8}")
+    for threads in args.threads:
+        single = MedicalCacheManager(num_shards=1)
+        sharded = MedicalCacheManager(num_shards=args.shards)
+        single_rate = run_workers(single, threads, args.ops, args.key_space)
+        sharded_rate = run_workers(sharded, threads, args.ops, args.key_space)
+        hit_rate = sharded.get_stats()['hit_rate_percent']
+        print(f"{threads:>8} | {single_rate:>18,.0f} | {sharded_rate:>18,.0f} | {hit_rate:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
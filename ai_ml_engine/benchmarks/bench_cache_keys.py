@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Cache key building benchmark
+Compares the old hash()/str() and json.dumps+SHA-256 keys with the stable BLAKE2b key builder
+"""
+
+import sys
+import os
+import json
+import time
+import hashlib
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import make_cache_key
+from medical_agents import PatientContext
+
+QUERY = "What is paracetamol used for and can I take it with ibuprofen?"
+OCR_TEXT = "[Angle 1] DOLO 650 Paracetamol Tablets IP 650mg [Angle 2] Micro Labs Ltd Batch 4821 " * 4
+SYMPTOMS = ["fever", "headache", "body ache"]
+CONTEXT = PatientContext(
+    patient_id="p-1042", age=54, gender="female", weight=68.0,
+    medical_history=["diabetes", "hypertension"],
+    current_medications=["metformin", "amlodipine"],
+    allergies=["penicillin"],
+    chief_complaint="fever for 3 days"
+)
+
+
+def legacy_hash_key(query, context):
+    """Old MedicalAICore key: salted per process, so not shareable"""
+    return f"medical_advice:{hash(query + str(context))}"
+
+
+def legacy_json_sha256_key(*args, **kwargs):
+    """Old MedicalCacheManager._generate_cache_key"""
+    key_data = {'args': args, 'kwargs': sorted(kwargs.items()) if kwargs else {}}
+    key_str = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+def time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=50_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    cases = [
+        ("text: hash(str)", lambda: f"medicine_text:{hash(OCR_TEXT)}"),
+        ("text: json+sha256", lambda: legacy_json_sha256_key(OCR_TEXT)),
+        ("text: make_cache_key", lambda: make_cache_key("medicine_text", OCR_TEXT)),
+        ("advice: hash(str(ctx))", lambda: legacy_hash_key(QUERY, CONTEXT)),
+        ("advice: json+sha256", lambda: legacy_json_sha256_key(QUERY, CONTEXT)),
+        ("advice: make_cache_key", lambda: make_cache_key("medical_advice", QUERY, CONTEXT)),
+        ("case: json+sha256", lambda: legacy_json_sha256_key(SYMPTOMS, CONTEXT.__dict__)),
+        ("case: make_cache_key", lambda: make_cache_key("case_analysis", "p-1042", SYMPTOMS, CONTEXT)),
+    ]
+
+    print("=== Cache Key Building Cost ===")
+    print(f"{'key builder':<26} | {'us/key':>8}")
+    for name, fn in cases:
+        print(f"{name:<26} | {time_per_call(fn, n):>8.2f}")
+
+    # json+sha256 stringifies the dataclass with default=str, so it is stable only
+    # as long as the repr is; make_cache_key encodes the fields structurally
+    print(f"\nexample stable key: {make_cache_key('medical_advice', QUERY, CONTEXT)}")
+
+
+if __name__ == "__main__":
+    main()
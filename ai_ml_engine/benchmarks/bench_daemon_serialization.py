@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Daemon serialization benchmark
+Compares encode+decode cost and wire size of JSON lines, length-prefixed JSON and msgpack frames
+for typical daemon responses
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import MedicalCacheManager
+from daemon_protocol import encode_frame, read_frame_sync, msgpack
+
+VISION_TEXT = (
+    'Medicine: "DOLO 650"\nActive ingredient: Paracetamol 650 mg\nManufacturer: Micro Labs Ltd\n'
+    'Usage: Relief of fever and mild to moderate pain.\n\t- Adults: 1 tablet every 4-6 hours\n'
+    '\t- Do not exceed 4 g/day\nWarnings: Avoid with alcohol; consult a doctor if "pain persists".\n'
+) * 6
+
+
+def sample_messages():
+    """Representative responses: a vision result and a large get_system_status payload"""
+    manager = MedicalCacheManager()
+    for i in range(500):
+        manager.cache_medicine_info(f"drug{i}", {"name": f"drug{i}"})
+        manager.get_cached_medicine_info(f"drug{i % 50}")
+    status = {
+        'success': True,
+        'result': {
+            'timestamp': '2025-01-01T00:00:00',
+            'cache_stats': manager.get_stats(),
+            'cache_metrics': manager.get_cache_metrics(),
+            'metrics': manager.export_prometheus()
+        },
+        'requestId': 'req-status'
+    }
+    image = {
+        'success': True,
+        'result': {'raw_response': VISION_TEXT, 'confidence': 0.82, 'model': 'gemma3:4b'},
+        'requestId': 'req-image'
+    }
+    advice = {
+        'success': True,
+        'result': {'response': VISION_TEXT[:400], 'query': 'What is paracetamol used for?'},
+        'requestId': 'req-advice'
+    }
+    return {'advice': advice, 'image': image, 'system_status': status}
+
+
+def jsonl_roundtrip(message):
+    data = (json.dumps(message) + "\n").encode('utf-8')
+    json.loads(io.BytesIO(data).readline())
+    return len(data)
+
+
+def frame_roundtrip(protocol):
+    def roundtrip(message):
+        data = encode_frame(message, protocol)
+        read_frame_sync(io.BytesIO(data), protocol)
+        return len(data)
+    return roundtrip
+
+
+def time_per_call(fn, message, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(message)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2_000)
+    args = parser.parse_args()
+
+    paths = {'jsonl': jsonl_roundtrip, 'json frames': frame_roundtrip('json')}
+    if msgpack is not None:
+        paths['msgpack frames'] = frame_roundtrip('msgpack')
+    else:
+        print("msgpack not installed; skipping msgpack frames (pip install msgpack)")
+
+    print("=== Daemon Message Encode+Decode ===")
+    print(f"{'message':<14} | {'path':<15} | {'bytes':>8} | {'us/msg':>8}")
+    for name, message in sample_messages().items():
+        for path, fn in paths.items():
+            size = fn(message)
+            print(f"{name:<14} | {path:<15} | {size:>8,} | {time_per_call(fn, message, args.iterations):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
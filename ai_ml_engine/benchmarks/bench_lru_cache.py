@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for LRUCache
+Measures put throughput into a full cache across capacities to confirm eviction is O(1)
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import LRUCache
+
+DEFAULT_CAPACITIES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def bench_put_full_cache(capacity: int, operations: int) -> float:
+    """Fill a cache to capacity, then time puts that each force an eviction"""
+    cache = LRUCache(capacity=capacity, ttl=3600)
+    for i in range(capacity):
+        cache.put(f"warm:{i}", i)
+
+    keys = [f"new:{i}" for i in range(operations)]
+    start = time.perf_counter()
+    for key in keys:
+        cache.put(key, key)
+    elapsed = time.perf_counter() - start
+
+    assert len(cache) == capacity, "Cache grew past its capacity"
+    return operations / elapsed
+
+
+def bench_get_hits(capacity: int, operations: int) -> float:
+    """Time get() hits spread over the whole key space"""
+    cache = LRUCache(capacity=capacity, ttl=3600)
+    for i in range(capacity):
+        cache.put(f"key:{i}", i)
+
+    step = max(1, capacity // operations)
+    keys = [f"key:{(i * step) % capacity}" for i in range(operations)]
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    elapsed = time.perf_counter() - start
+    return operations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operations', type=int, default=100_000, help='Timed operations per capacity')
+    parser.add_argument('--capacities', type=int, nargs='+', default=DEFAULT_CAPACITIES)
+    args = parser.parse_args()
+
+    print("=== LRUCache Throughput ===")
+    print(f"{'capacity':>10} | {'put/s (evicting)':>18} | {'get/s (hit)':>14}")
+    results = []
+    for capacity in args.capacities:
+        put_rate = bench_put_full_cache(capacity, args.operations)
+        get_rate = bench_get_hits(capacity, args.operations)
+        results.append(put_rate)
+        print(f"{capacity:>10} | {put_rate:>18,.0f} | {get_rate:>14,.0f}")
+
+    # Throughput should stay flat; a linear scan would fall off by orders of magnitude
+    spread = max(results) / min(results)
+    print(f"\nput throughput spread (max/min): {spread:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
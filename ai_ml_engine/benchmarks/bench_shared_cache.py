@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Shared cache benchmark
+Splits a fixed stream of repeat queries across 1-8 worker processes and compares the
+hit rate of per-process caches with one SharedMemoryCache tier shared by all workers
+"""
+
+import sys
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing as mp
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import MedicalCacheManager
+
+DEFAULT_WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def worker(shared_dir, requests: int, queries: int, llm_latency: float, seed: int, results):
+    """Serve requests like a daemon worker; a miss pays the simulated LLM latency"""
+    manager = MedicalCacheManager(shared_dir=shared_dir)
+    rng = random.Random(seed)
+    hits = 0
+    for _ in range(requests):
+        query = f"medicine {rng.randrange(queries)}"
+        if manager.get_cached_llm_response(query) is not None:
+            hits += 1
+        else:
+            time.sleep(llm_latency)
+            manager.cache_llm_response(query, f"answer to {query}")
+    results.put(hits)
+
+
+def run(workers: int, shared: bool, args) -> tuple:
+    """Return (hit rate %, requests per second) for one configuration"""
+    shared_dir = tempfile.mkdtemp(prefix="curavox-shm-") if shared else None
+    results = mp.Queue()
+    per_worker = args.requests // workers
+    procs = [
+        mp.Process(target=worker, args=(shared_dir, per_worker, args.queries, args.llm_latency, seed, results))
+        for seed in range(workers)
+    ]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    hits = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    if shared_dir:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    total = per_worker * workers
+    return hits / total * 100, total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=4000, help='Total requests, split across workers')
+    parser.add_argument('--queries', type=int, default=200, help='Distinct queries (fits the llm cache)')
+    parser.add_argument('--llm-latency', type=float, default=0.02, help='Simulated LLM latency on a miss, seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKER_COUNTS)
+    args = parser.parse_args()
+
+    print("=== Hit Rate vs Worker Processes ===")
+    print(f"{'workers':>8} | {'private hit rate':>16} | {'shared hit rate':>15} | {'private req/s':>13} | {'shared req/s':>12}")
+    for workers in args.workers:
+        private_rate, private_tput = run(workers, False, args)
+        shared_rate, shared_tput = run(workers, True, args)
+        print(f"{workers:>8} | {private_rate:>15.1f}% | {shared_rate:>14.1f}% | {private_tput:>13,.0f} | {shared_tput:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
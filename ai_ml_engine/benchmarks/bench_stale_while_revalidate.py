@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Stale-while-revalidate benchmark
+Replays repeat queries against an LLM-like slow function and prints a latency histogram
+with a hard-TTL-only cache versus soft/hard TTLs with background refresh
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caching_system import MedicalCacheManager
+
+BUCKETS_MS = [1, 10, 50, 100, 250, 500, 1000]
+
+
+def run(stale_while_revalidate: bool, requests: int, queries: int, ttl: float, llm_latency: float, seed: int):
+    """Issue requests over a small query set and return per-request latencies in ms"""
+    manager = MedicalCacheManager(stale_while_revalidate=stale_while_revalidate)
+    if stale_while_revalidate:
+        manager.llm_cache = manager._create_cache('llm', capacity=200, ttl=ttl * 4, soft_ttl=ttl)
+    else:
+        manager.llm_cache = manager._create_cache('llm', capacity=200, ttl=ttl)
+
+    def fake_ollama(query):
+        time.sleep(llm_latency)
+        return f"answer to {query}"
+
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(requests):
+        query = f"question {rng.randrange(queries)}"
+        start = time.perf_counter()
+        manager.get_or_compute(query, lambda: fake_ollama(query), cache='llm')
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(ttl / 20)  # spread requests so entries age past their TTL
+    return latencies
+
+
+def histogram(latencies):
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for value in latencies:
+        for i, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--queries', type=int, default=8, help='Distinct repeat queries')
+    parser.add_argument('--ttl', type=float, default=0.2, help='TTL (soft TTL in SWR mode), seconds')
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Simulated Ollama latency, seconds')
+    args = parser.parse_args()
+
+    results = {
+        'hard TTL only': run(False, args.requests, args.queries, args.ttl, args.llm_latency, seed=7),
+        'stale-while-revalidate': run(True, args.requests, args.queries, args.ttl, args.llm_latency, seed=7),
+    }
+
+    labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+    print("=== get_or_compute Latency Histogram ===")
+    print(f"{'mode':<24} | " + " | ".join(f"{label:>8}" for label in labels) + " |    p50 |    p99")
+    for mode, latencies in results.items():
+        counts = histogram(latencies)
+        row = " | ".join(f"{count:>8}" for count in counts)
+        print(f"{mode:<24} | {row} | {percentile(latencies, 50):>6.1f} | {percentile(latencies, 99):>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Startup import benchmark
+Runs `python -X importtime` on the daemon's entry modules, prints the slowest imports and fails
+when a heavy framework is imported eagerly or the import time exceeds a budget
+"""
+
+import sys
+import os
+import argparse
+import subprocess
+import statistics
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ['medical_ai_core']
+# Only the lazily built HF pipelines may pull these in
+FORBIDDEN_MODULES = ['torch', 'transformers', 'tensorflow']
+
+
+def import_profile(module: str):
+    """Import a module in a fresh interpreter; return {module: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ENGINE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Fail if the median cumulative import time exceeds this')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        median_ms = statistics.median(p[module][1] for p in profiles) / 1000
+
+        print(f"=== import {module}: median {median_ms:.1f} ms over {args.runs} runs ===")
+        print(f"{'module':<50} | {'self ms':>8} | {'cumulative ms':>13}")
+        last = profiles[-1]
+        for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"{name:<50} | {self_us / 1000:>8.1f} | {cumulative_us / 1000:>13.1f}")
+
+        eager = [name for name in FORBIDDEN_MODULES if name in last]
+        if eager:
+            print(f"FAIL: {', '.join(eager)} imported at startup")
+            failed = True
+        if args.budget_ms is not None and median_ms > args.budget_ms:
+            print(f"FAIL: {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+            failed = True
+        print()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,370 @@ Implements multiple caching strategies to optimize performance
 import time
 import hashlib
 import json
-from typing import Any, Optional, Dict
+import sys
+from typing import Any, Callable, Optional, Dict, Sequence, Tuple
 from datetime import datetime, timedelta
 from functools import wraps
+from operator import attrgetter
+from collections import OrderedDict, namedtuple, deque
+from dataclasses import fields, is_dataclass
+from enum import Enum
 import threading
 import pickle
 import os
+import queue
+import heapq
+import asyncio
+from concurrent.futures import Future
+import sqlite3
+import atexit
+import logging
+import mmap
+import struct
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+def deep_getsizeof(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate the in-memory footprint of an object graph
+    
+    Follows containers, instance __dict__ and __slots__ so dataclass results
+    (MedicineInfo, MedicalAnalysisResult) are measured with their contents.
+    Shared objects are only counted once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_getsizeof(k, _seen) + deep_getsizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_getsizeof(item, _seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_getsizeof(vars(obj), _seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_getsizeof(getattr(obj, slot), _seen)
+    return size
+
+def pickled_size(obj: Any) -> int:
+    """Measure an object by its serialized length (closer to what a disk tier stores)"""
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return deep_getsizeof(obj)
+
+_DATACLASS_FIELDS: Dict[type, tuple] = {}  # type -> (field names, prefix, getter)
+_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+def _is_plain(value: Any) -> bool:
+    """True for builtin scalars and flat lists/tuples of them (their repr is deterministic)"""
+    kind = type(value)
+    if kind in _SCALAR_TYPES:
+        return True
+    return (kind is list or kind is tuple) and all(type(item) in _SCALAR_TYPES for item in value)
+
+def _encode_canonical(obj: Any, out: list) -> None:
+    """
+    Append a type-tagged, order-independent encoding of obj to out
+    
+    Dict keys and set members are sorted, dataclasses are encoded field by
+    field and other objects by their attributes, so structurally equal values
+    always encode the same way in every process (unlike str() or hash()).
+    """
+    kind = type(obj)
+    if obj is _KWARGS_MARK:
+        out.append(b'K')
+    elif kind is str:
+        data = obj.encode('utf-8')
+        out.append(b's%d:' % len(data))
+        out.append(data)
+    elif obj is None or kind is bool:
+        out.append(b'N' if obj is None else (b'T' if obj else b'F'))
+    elif kind is int or kind is float:
+        out.append(b'n%r;' % obj)
+    elif kind is list or kind is tuple:
+        if all(type(item) in _SCALAR_TYPES for item in obj):
+            # repr of builtin scalars is deterministic, and much faster than recursing
+            out.append(b'L' + repr(tuple(obj)).encode('utf-8'))
+        else:
+            out.append(b'[%d:' % len(obj))
+            for item in obj:
+                _encode_canonical(item, out)
+            out.append(b']')
+    elif kind is dict:
+        if all(type(k) is str for k in obj):
+            keys = sorted(obj)
+        else:
+            keys = sorted(obj, key=lambda k: (0, k) if isinstance(k, str) else (1, stable_hash(k)))
+        out.append(b'{%d:' % len(obj))
+        for k in keys:
+            _encode_canonical(k, out)
+            _encode_canonical(obj[k], out)
+        out.append(b'}')
+    elif kind in _DATACLASS_FIELDS or is_dataclass(obj):
+        spec = _DATACLASS_FIELDS.get(kind)
+        if spec is None:
+            names = tuple(f.name for f in fields(obj))
+            prefix = b'D' + kind.__name__.encode() + repr(names).encode()
+            getter = attrgetter(*names) if len(names) > 1 else (lambda o, n=names: tuple(getattr(o, a) for a in n))
+            spec = _DATACLASS_FIELDS[kind] = (names, prefix, getter)
+        names, prefix, getter = spec
+        values = getter(obj)
+        out.append(prefix)
+        if all(_is_plain(value) for value in values):
+            # Typical for PatientContext: one repr instead of a recursive walk
+            out.append(repr(values).encode('utf-8'))
+        else:
+            _encode_canonical(tuple(values), out)
+    elif isinstance(obj, Enum):
+        out.append(b'e')
+        _encode_canonical(obj.value, out)
+    elif isinstance(obj, (str, int, float, list, tuple, dict)):
+        # Subclasses of builtins encode like their base type
+        base = next(b for b in (str, bool, int, float, list, tuple, dict) if isinstance(obj, b))
+        _encode_canonical(base(obj), out)
+    elif isinstance(obj, bytes):
+        out.append(b'b%d:' % len(obj))
+        out.append(obj)
+    elif isinstance(obj, (set, frozenset)):
+        out.append(b'<%d:' % len(obj))
+        for member in sorted(stable_hash(m) for m in obj):
+            out.append(member.encode())
+        out.append(b'>')
+    elif isinstance(obj, datetime):
+        out.append(b'd' + obj.isoformat().encode() + b';')
+    elif isinstance(obj, type):
+        out.append(b'c' + f"{obj.__module__}.{obj.__qualname__}".encode() + b';')
+    elif hasattr(obj, '__dict__'):
+        out.append(b'O' + kind.__name__.encode())
+        _encode_canonical(vars(obj), out)
+    else:
+        out.append(b'r')
+        _encode_canonical(repr(obj), out)
+
+def stable_hash(*parts: Any) -> str:
+    """
+    Stable 64-bit hash of arbitrary values, identical across processes and restarts
+    
+    Uses BLAKE2b with an 8-byte digest over a canonical encoding; cheap enough
+    for per-request keys and safe to share through disk/shared-memory tiers.
+    
+    Returns:
+        16-character hex digest
+    """
+    out = []
+    for part in parts:
+        _encode_canonical(part, out)
+    return hashlib.blake2b(b''.join(out), digest_size=8).hexdigest()
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    """Build a namespaced cache key such as 'medical_advice:3f2a...'"""
+    return f"{namespace}:{stable_hash(*parts)}"
+
+def fingerprint(obj: Any) -> str:
+    """Structural fingerprint of an object (e.g. a PatientContext) for use in keys"""
+    return stable_hash(obj)
+
+# Byte translation table that halves every counter in one pass
+_HALVE = bytes(i >> 1 for i in range(256))
+
+class FrequencySketch:
+    """
+    TinyLFU frequency estimator: a doorkeeper set in front of a count-min sketch
+    
+    The first access of a key only records its hash in the doorkeeper, so
+    one-off keys never reach the sketch. Counters saturate at 15 and, every
+    sample_size accesses, all counters are halved and the doorkeeper is
+    cleared so old popularity fades (which also bounds the doorkeeper).
+    
+    Keys are hashed with BLAKE2b rather than the salted hash(), so admission
+    decisions are the same in every process. Width and aging period have
+    floors: sized from a tiny capacity alone, collisions and halving would
+    dominate the counts.
+    """
+    
+    DEPTH = 4
+    MAX_COUNT = 15
+    MIN_WIDTH = 64
+    MIN_SAMPLE_SIZE = 256
+    
+    def __init__(self, capacity: int, sample_factor: int = 10):
+        """
+        Initialize the sketch
+        
+        Args:
+            capacity: Cache capacity the sketch is sized for
+            sample_factor: Accesses per aging period, as a multiple of capacity
+        """
+        width = 1
+        while width < max(self.MIN_WIDTH, capacity * 2):
+            width <<= 1
+        self.mask = width - 1
+        self.rows = [bytearray(width) for _ in range(self.DEPTH)]
+        self.doorkeeper = set()
+        self.sample_size = max(capacity * sample_factor, self.MIN_SAMPLE_SIZE)
+        self.samples = 0
+        self.resets = 0
+    
+    @staticmethod
+    def _hash(key: Any) -> int:
+        """Stable 64-bit hash of a key (cache keys are strings; anything else is canonically encoded)"""
+        data = key.encode('utf-8') if type(key) is str else stable_hash(key).encode()
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+    
+    def _slots(self, h: int):
+        """(row, index) pairs for a key hash, one per sketch row"""
+        step = (h >> 32) | 1
+        mask = self.mask
+        return [(row, (h + i * step) & mask) for i, row in enumerate(self.rows)]
+    
+    def increment(self, key: Any) -> None:
+        """Record one access of key"""
+        h = self._hash(key)
+        if h not in self.doorkeeper:
+            self.doorkeeper.add(h)
+        else:
+            # Conservative update: only raise the counters at the current minimum
+            slots = self._slots(h)
+            low = min(row[i] for row, i in slots)
+            if low < self.MAX_COUNT:
+                for row, i in slots:
+                    if row[i] == low:
+                        row[i] = low + 1
+        
+        self.samples += 1
+        if self.samples >= self.sample_size:
+            self._age()
+    
+    def frequency(self, key: Any) -> int:
+        """Estimated recent access count of key"""
+        h = self._hash(key)
+        return (h in self.doorkeeper) + min(row[i] for row, i in self._slots(h))
+    
+    def _age(self) -> None:
+        """Halve every counter and clear the doorkeeper"""
+        self.rows = [bytearray(row.translate(_HALVE)) for row in self.rows]
+        self.doorkeeper.clear()
+        self.samples //= 2
+        self.resets += 1
 
 class LRUCache:
     """
     Least Recently Used Cache implementation for medical data
+    
+    Entries live in an OrderedDict kept in recency order (oldest first), so
+    lookups, inserts and evictions are all O(1) regardless of capacity.
+    Optionally bounded by an approximate byte budget as well as entry count.
+    
+    Expiry is tracked in a min-heap of deadlines. Heap entries are checked
+    lazily: an entry refreshed by a read is re-pushed with its new deadline
+    instead of being updated in place, so reclaiming is amortized O(log n).
+    
+    With admission='tinylfu', a new key that would force an eviction is only
+    admitted if a FrequencySketch says it is requested more often than the LRU
+    victim, so bursts of one-off keys can't flush the popular ones.
     """
     
-    def __init__(self, capacity: int = 1000, ttl: int = 3600):
+    ADMISSION_POLICIES = (None, 'tinylfu')
+    
+    def __init__(self, capacity: int = 1000, ttl: int = 3600,
+                 max_bytes: Optional[int] = None,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 soft_ttl: Optional[float] = None,
+                 admission: Optional[str] = None):
         """
         Initialize LRU Cache
         
         Args:
             capacity: Maximum number of items to store
-            ttl: Time to live in seconds
+            ttl: Time to live in seconds (hard TTL; the entry is dropped after this)
+            max_bytes: Optional memory budget; LRU items are evicted until new values fit
+            sizer: Function returning the size of a value in bytes (e.g. deep_getsizeof
+                   or pickled_size). Defaults to deep_getsizeof when max_bytes is set.
+            soft_ttl: Optional seconds since the value was written after which it is
+                      still served but reported stale by get_with_staleness()
+            admission: None for plain LRU, or 'tinylfu' to filter new keys by
+                       estimated access frequency (counted on every get)
         """
+        if admission not in self.ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy: {admission}")
         self.capacity = capacity
+        self.admission = admission
+        self.sketch = FrequencySketch(capacity) if admission == 'tinylfu' else None
         self.ttl = ttl
-        self.cache = {}
+        self.soft_ttl = soft_ttl
+        self.max_bytes = max_bytes
+        self.sizer = sizer or (deep_getsizeof if max_bytes is not None else None)
+        self.cache = OrderedDict()
         self.access_times = {}
+        self.write_times = {}
+        self.sizes = {}
+        self.current_bytes = 0
+        self.expiry_heap = []  # (deadline, key); may hold stale entries
         self.lock = threading.Lock()
+        
+        # Counters are updated under self.lock, so no extra lock is needed
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'stale_hits': 0,
+            'rejections': 0
+        }
+    
+    def _remove(self, key: str) -> None:
+        """Drop an entry and its bookkeeping (caller holds the lock)"""
+        del self.cache[key]
+        del self.access_times[key]
+        del self.write_times[key]
+        self.current_bytes -= self.sizes.pop(key, 0)
+    
+    def _expire_due(self, now: float) -> int:
+        """Pop every heap entry whose deadline has passed (caller holds the lock)"""
+        expired = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            if key not in self.cache:
+                continue  # Already evicted or deleted
+            deadline = self.access_times[key] + self.ttl
+            if deadline <= now:
+                self._remove(key)
+                expired += 1
+            else:
+                # Read since it was pushed; check again at its new deadline
+                heapq.heappush(heap, (deadline, key))
+        
+        # Overwrites and evictions leave stale entries behind; rebuild before they pile up
+        if len(heap) > 2 * len(self.cache) + 64:
+            self.expiry_heap = [(self.access_times[k] + self.ttl, k) for k in self.cache]
+            heapq.heapify(self.expiry_heap)
+        
+        self.stats['expirations'] += expired
+        return expired
+    
+    def expire(self) -> int:
+        """
+        Reclaim all entries past their TTL
+        
+        Returns:
+            Number of entries removed
+        """
+        with self.lock:
+            return self._expire_due(time.time())
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -42,42 +381,91 @@ class LRUCache:
         Returns:
             Cached value or None if not found/expired
         """
+        return self.get_with_staleness(key)[0]
+    
+    def get_with_staleness(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get value from cache along with whether it is past its soft TTL
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            (value, stale) - value is None if not found/expired
+        """
         with self.lock:
+            if self.sketch is not None:
+                self.sketch.increment(key)
             if key not in self.cache:
-                return None
+                self.stats['misses'] += 1
+                return None, False
             
             # Check if expired
-            if time.time() - self.access_times[key] > self.ttl:
-                del self.cache[key]
-                del self.access_times[key]
-                return None
+            now = time.time()
+            if now - self.access_times[key] > self.ttl:
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None, False
             
-            # Update access time (LRU behavior)
-            self.access_times[key] = time.time()
-            return self.cache[key]
+            # Update access time and recency order (LRU behavior)
+            self.access_times[key] = now
+            self.cache.move_to_end(key)
+            self.stats['hits'] += 1
+            stale = self.soft_ttl is not None and now - self.write_times[key] > self.soft_ttl
+            if stale:
+                self.stats['stale_hits'] += 1
+            return self.cache[key], stale
     
-    def put(self, key: str, value: Any) -> None:
+    def put(self, key: str, value: Any, written_at: Optional[float] = None) -> None:
         """
         Put value in cache
         
         Args:
             key: Cache key
             value: Value to cache
+            written_at: When the value was originally computed (defaults to now); entries
+                        restored from disk keep their age so the soft TTL still applies
         """
+        # Size outside the lock; deep sizing a large result can take a while
+        size = self.sizer(value) if self.sizer else 0
+        
         with self.lock:
-            # Check if we need to evict items
-            if len(self.cache) >= self.capacity:
-                # Find oldest accessed item
-                oldest_key = min(self.access_times.keys(), 
-                               key=lambda k: self.access_times[k])
-                
-                # Check if it's expired
-                if time.time() - self.access_times[oldest_key] > self.ttl:
-                    del self.cache[oldest_key]
-                    del self.access_times[oldest_key]
+            now = time.time()
+            self._expire_due(now)
+            
+            if key in self.cache:
+                self._remove(key)
+            
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Larger than the whole budget; caching it would flush everything else
+                return
+            
+            if self.sketch is not None and self.cache and (
+                len(self.cache) >= self.capacity or
+                (self.max_bytes is not None and self.current_bytes + size > self.max_bytes)
+            ):
+                # Only displace the LRU victim for a key that is requested more often
+                victim = next(iter(self.cache))
+                if self.sketch.frequency(key) <= self.sketch.frequency(victim):
+                    self.stats['rejections'] += 1
+                    return
+            
+            # Least recently used items are always at the front
+            while self.cache and (
+                len(self.cache) >= self.capacity or
+                (self.max_bytes is not None and self.current_bytes + size > self.max_bytes)
+            ):
+                self._remove(next(iter(self.cache)))
+                self.stats['evictions'] += 1
             
             self.cache[key] = value
-            self.access_times[key] = time.time()
+            self.access_times[key] = now
+            self.write_times[key] = now if written_at is None else min(written_at, now)
+            heapq.heappush(self.expiry_heap, (now + self.ttl, key))
+            if self.sizer:
+                self.sizes[key] = size
+                self.current_bytes += size
     
     def delete(self, key: str) -> bool:
         """
@@ -91,8 +479,7 @@ class LRUCache:
         """
         with self.lock:
             if key in self.cache:
-                del self.cache[key]
-                del self.access_times[key]
+                self._remove(key)
                 return True
             return False
     
@@ -101,6 +488,749 @@ class LRUCache:
         with self.lock:
             self.cache.clear()
             self.access_times.clear()
+            self.write_times.clear()
+            self.sizes.clear()
+            self.expiry_heap.clear()
+            self.current_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get a snapshot of this cache's counters"""
+        with self.lock:
+            return dict(self.stats, bytes=self.current_bytes)
+
+class ShardedLRUCache:
+    """
+    Lock-striped LRU cache made of independent LRUCache shards
+    
+    Keys are routed to a shard by hash, so concurrent threads touching
+    different keys rarely contend on the same lock. Capacity is split evenly
+    across shards and LRU order is maintained per shard.
+    """
+    
+    def __init__(self, capacity: int = 1000, ttl: int = 3600, num_shards: int = 16,
+                 max_bytes: Optional[int] = None,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 soft_ttl: Optional[float] = None,
+                 admission: Optional[str] = None):
+        """
+        Initialize Sharded LRU Cache
+        
+        Args:
+            capacity: Maximum number of items to store across all shards
+            ttl: Time to live in seconds
+            num_shards: Number of independent shards (each with its own lock)
+            max_bytes: Optional memory budget across all shards
+            sizer: Function returning the size of a value in bytes
+            soft_ttl: Optional soft TTL (see LRUCache)
+            admission: Optional admission policy per shard (see LRUCache)
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.soft_ttl = soft_ttl
+        self.max_bytes = max_bytes
+        self.num_shards = max(1, num_shards)
+        shard_capacity = max(1, -(-capacity // self.num_shards))
+        shard_bytes = -(-max_bytes // self.num_shards) if max_bytes is not None else None
+        self.shards = [
+            LRUCache(capacity=shard_capacity, ttl=ttl, max_bytes=shard_bytes, sizer=sizer,
+                     soft_ttl=soft_ttl, admission=admission)
+            for _ in range(self.num_shards)
+        ]
+    
+    def _shard_for(self, key: str) -> LRUCache:
+        return self.shards[hash(key) % self.num_shards]
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from the shard owning key"""
+        return self._shard_for(key).get(key)
+    
+    def get_with_staleness(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Get (value, stale) from the shard owning key"""
+        return self._shard_for(key).get_with_staleness(key)
+    
+    def put(self, key: str, value: Any, written_at: Optional[float] = None) -> None:
+        """Put value in the shard owning key"""
+        self._shard_for(key).put(key, value, written_at)
+    
+    def delete(self, key: str) -> bool:
+        """Delete item from the shard owning key"""
+        return self._shard_for(key).delete(key)
+    
+    def clear(self) -> None:
+        """Clear all shards"""
+        for shard in self.shards:
+            shard.clear()
+    
+    def expire(self) -> int:
+        """Reclaim expired entries in every shard"""
+        return sum(shard.expire() for shard in self.shards)
+    
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Merge per-shard counters into one snapshot"""
+        merged = {}
+        for shard in self.shards:
+            for name, value in shard.get_stats().items():
+                merged[name] = merged.get(name, 0) + value
+        return merged
+
+class DiskCache:
+    """
+    Persistent SQLite store used as the second level behind the memory caches
+    
+    Writes are queued and flushed in batches by a background thread
+    (write-behind), so callers never wait on disk I/O. Each row carries the
+    cache it belongs to and an absolute expiry time.
+    """
+    
+    def __init__(self, path: str, flush_interval: float = 1.0, compact_interval: float = 3600.0):
+        """
+        Initialize the disk tier
+        
+        Args:
+            path: SQLite database file
+            flush_interval: Max seconds a queued write waits before being flushed
+            compact_interval: Seconds between background compaction passes
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY,"
+            " cache_name TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_name"
+            " ON cache_entries (cache_name, created_at)"
+        )
+        self.db_lock = threading.Lock()
+        
+        # Queued writes are also visible to readers before they hit disk
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.write_queue = queue.Queue()
+        self.stats = {
+            'disk_hits': 0,
+            'disk_writes': 0,
+            'compacted_rows': 0
+        }
+        
+        self.compact()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="cache-disk-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Read a value from disk (or the pending write queue) if not expired"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+    
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Read (value, created_at) from disk (or the pending write queue) if not expired"""
+        now = time.time()
+        with self.pending_lock:
+            pending = self.pending.get(key)
+        if pending is not None:
+            op, _, blob, created_at, expires_at = pending
+            if op == 'delete' or expires_at < now:
+                return None
+        else:
+            with self.db_lock:
+                row = self.conn.execute(
+                    "SELECT value, created_at, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or row[2] < now:
+                return None
+            blob, created_at = row[0], row[1]
+        
+        try:
+            value = pickle.loads(blob)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable disk cache entry {key}: {e}")
+            self.delete(key)
+            return None
+        with self.pending_lock:
+            self.stats['disk_hits'] += 1
+        return value, created_at
+    
+    def put(self, cache_name: str, key: str, value: Any, ttl: float) -> None:
+        """Queue a value for write-behind persistence"""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Value for {key} is not picklable, keeping it in memory only: {e}")
+            return
+        now = time.time()
+        self._enqueue(key, ('put', cache_name, blob, now, now + ttl))
+    
+    def delete(self, key: str) -> None:
+        """Queue removal of a key"""
+        self._enqueue(key, ('delete', None, None, 0, 0))
+    
+    def clear(self, cache_name: Optional[str] = None) -> None:
+        """Remove all rows (or all rows of one cache) synchronously"""
+        self.flush()
+        with self.db_lock:
+            if cache_name is None:
+                self.conn.execute("DELETE FROM cache_entries")
+            else:
+                self.conn.execute("DELETE FROM cache_entries WHERE cache_name = ?", (cache_name,))
+    
+    def load_recent(self, cache_name: str, limit: int):
+        """
+        Return up to limit unexpired (key, value, created_at) tuples for a cache, oldest
+        first, so replaying them into an LRU leaves the newest entries most recent
+        """
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT key, value, created_at FROM cache_entries"
+                " WHERE cache_name = ? AND expires_at >= ?"
+                " ORDER BY created_at DESC LIMIT ?",
+                (cache_name, time.time(), limit)
+            ).fetchall()
+        entries = []
+        for key, blob, created_at in reversed(rows):
+            try:
+                entries.append((key, pickle.loads(blob), created_at))
+            except Exception:
+                continue
+        return entries
+    
+    def compact(self) -> int:
+        """Delete expired rows and reclaim file space; returns rows removed"""
+        with self.db_lock:
+            removed = self.conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)
+            ).rowcount
+            if removed:
+                self.conn.execute("VACUUM")
+        with self.pending_lock:
+            self.stats['compacted_rows'] += removed
+        return removed
+    
+    def flush(self) -> None:
+        """Block until all queued writes are on disk"""
+        self.write_queue.join()
+    
+    def close(self) -> None:
+        """Flush outstanding writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self.write_queue.put(None)
+        self._writer.join(timeout=10)
+        with self.db_lock:
+            self.conn.close()
+    
+    def _enqueue(self, key: str, record: tuple) -> None:
+        with self.pending_lock:
+            self.pending[key] = record
+        self.write_queue.put(key)
+    
+    def _write_loop(self) -> None:
+        last_compaction = time.time()
+        while True:
+            keys = []
+            try:
+                keys.append(self.write_queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            
+            # Drain whatever else is queued so it lands in one transaction
+            while True:
+                try:
+                    keys.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = None in keys
+            self._write_batch([k for k in keys if k is not None])
+            for _ in keys:
+                self.write_queue.task_done()
+            if stop:
+                return
+            
+            if time.time() - last_compaction > self.compact_interval:
+                last_compaction = time.time()
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.warning(f"Disk cache compaction failed: {e}")
+    
+    def _write_batch(self, keys) -> None:
+        if not keys:
+            return
+        with self.pending_lock:
+            records = {key: self.pending.pop(key) for key in set(keys) if key in self.pending}
+        if not records:
+            return
+        
+        upserts = [(key, name, blob, created, expires)
+                   for key, (op, name, blob, created, expires) in records.items() if op == 'put']
+        deletes = [(key,) for key, record in records.items() if record[0] == 'delete']
+        try:
+            with self.db_lock:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO cache_entries"
+                    " (key, cache_name, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    upserts
+                )
+                self.conn.executemany("DELETE FROM cache_entries WHERE key = ?", deletes)
+                self.conn.execute("COMMIT")
+            with self.pending_lock:
+                self.stats['disk_writes'] += len(upserts)
+        except Exception as e:
+            logger.warning(f"Disk cache write failed: {e}")
+            with self.db_lock:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+
+class TieredCache:
+    """
+    Two-level cache: an in-memory LRU in front of a shared DiskCache
+    
+    Memory misses fall through to disk and hits are promoted back into memory.
+    Puts go to memory immediately and to disk via write-behind. Promoted and
+    warm-loaded entries keep their original write time, so the soft TTL (and
+    with it stale-while-revalidate) survives a restart.
+    """
+    
+    def __init__(self, name: str, memory, disk: DiskCache):
+        """
+        Initialize the tiered cache
+        
+        Args:
+            name: Cache name used to partition rows in the disk store
+            memory: LRUCache or ShardedLRUCache serving the first level
+            disk: Shared DiskCache serving the second level
+        """
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self.capacity = memory.capacity
+        self.ttl = memory.ttl
+        self.soft_ttl = memory.soft_ttl
+        self.disk_hits = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get from memory, falling back to disk"""
+        return self.get_with_staleness(key)[0]
+    
+    def get_with_staleness(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Get (value, stale) from memory, falling back to disk"""
+        value, stale = self.memory.get_with_staleness(key)
+        if value is not None:
+            return value, stale
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return None, False
+        value, created_at = entry
+        with self.lock:
+            self.disk_hits += 1
+        self.memory.put(key, value, written_at=created_at)
+        return value, self.soft_ttl is not None and time.time() - created_at > self.soft_ttl
+    
+    def put(self, key: str, value: Any) -> None:
+        """Put into memory and queue the disk write"""
+        self.memory.put(key, value)
+        self.disk.put(self.name, key, value, self.ttl)
+    
+    def delete(self, key: str) -> bool:
+        """Delete from both tiers"""
+        self.disk.delete(key)
+        return self.memory.delete(key)
+    
+    def clear(self) -> None:
+        """Clear both tiers"""
+        self.memory.clear()
+        self.disk.clear(self.name)
+    
+    def expire(self) -> int:
+        """Reclaim expired memory entries (the disk tier is compacted separately)"""
+        return self.memory.expire()
+    
+    def warm_load(self) -> int:
+        """Populate memory from the newest unexpired disk entries; returns entries loaded"""
+        entries = self.disk.load_recent(self.name, self.capacity)
+        for key, value, created_at in entries:
+            self.memory.put(key, value, written_at=created_at)
+        return len(entries)
+    
+    def __len__(self) -> int:
+        return len(self.memory)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Memory counters, with disk hits counted as hits rather than misses"""
+        stats = self.memory.get_stats()
+        stats['hits'] += self.disk_hits
+        stats['misses'] -= self.disk_hits
+        stats['disk_hits'] = self.disk_hits
+        return stats
+
+class _InterProcessLock:
+    """
+    Mutex shared by every process that opens the same lock file
+    
+    A threading.Lock serializes threads in this process first, because
+    flock/msvcrt locks are held per file handle rather than per thread.
+    """
+    
+    def __init__(self, path: str):
+        self.thread_lock = threading.Lock()
+        self.handle = open(path, 'a+b')
+    
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.thread_lock.release()
+    
+    def close(self) -> None:
+        self.handle.close()
+
+class SharedMemoryCache:
+    """
+    Fixed-size hash table in a memory-mapped file, shared by every process that opens it
+    
+    Lets several daemon workers share one cache: a value put by one worker is
+    a hit for all of them. Slots have a fixed size, so an entry's key plus its
+    pickled value must fit in slot_size bytes; larger values are not cached.
+    
+    Keys hash to a window of PROBE_WINDOW consecutive slots. When the window
+    is full, the least recently accessed entry in it is evicted (sampled LRU),
+    so capacity is approximate but eviction stays O(1). The table has 25% more
+    slots than capacity to keep such collisions rare. Counters live in the
+    file header and are therefore global across processes.
+    """
+    
+    MAGIC = b'CVXSHM01'
+    PROBE_WINDOW = 16
+    # magic, num_slots, slot_size, hits, misses, evictions, expirations, stale_hits, entries, bytes
+    HEADER = struct.Struct('<8sII7Q')
+    # state, key hash, written_at, accessed_at, key length, value length
+    SLOT = struct.Struct('<B7xQddII')
+    EMPTY, USED, DELETED = 0, 1, 2
+    COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'stale_hits', 'entries', 'bytes')
+    
+    def __init__(self, path: str, capacity: int = 1000, ttl: int = 3600,
+                 slot_size: int = 4096, soft_ttl: Optional[float] = None):
+        """
+        Open (or create) a shared cache file
+        
+        Args:
+            path: Backing file; every process using the same path shares the cache.
+                  Put it on a tmpfs such as /dev/shm to keep it out of the page-cache writeback.
+            capacity: Target number of entries
+            ttl: Time to live in seconds since the last access (hard TTL, as in LRUCache)
+            slot_size: Bytes per slot, including the key and the pickled value
+            soft_ttl: Optional seconds since the write after which entries are reported stale
+        """
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.soft_ttl = soft_ttl
+        self.slot_size = slot_size
+        self.payload_size = slot_size - self.SLOT.size
+        if self.payload_size <= 0:
+            raise ValueError(f"slot_size must exceed {self.SLOT.size} bytes")
+        self.num_slots = capacity + capacity // 4
+        self.size = self.HEADER.size + self.num_slots * slot_size
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = _InterProcessLock(path + '.lock')
+        with self.lock:
+            with open(path, 'a+b') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() != self.size:
+                    f.truncate(self.size)
+            self.file = open(path, 'r+b')
+            self.mm = mmap.mmap(self.file.fileno(), self.size)
+            magic, num_slots, stored_slot_size = self.HEADER.unpack_from(self.mm, 0)[:3]
+            if (magic, num_slots, stored_slot_size) != (self.MAGIC, self.num_slots, slot_size):
+                # New file, or another geometry: start from an empty table
+                self._reset()
+    
+    def _reset(self) -> None:
+        """Zero every slot and counter (caller holds the lock)"""
+        self.mm[:] = bytes(self.size)
+        self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.num_slots, self.slot_size, *([0] * 7))
+    
+    def _bump(self, counter: str, delta: int = 1) -> None:
+        """Add to a header counter (caller holds the lock)"""
+        offset = 16 + 8 * self.COUNTERS.index(counter)
+        value = struct.unpack_from('<Q', self.mm, offset)[0]
+        struct.pack_into('<Q', self.mm, offset, max(0, value + delta))
+    
+    def _slot_offset(self, index: int) -> int:
+        return self.HEADER.size + index * self.slot_size
+    
+    def _window(self, key_hash: int):
+        start = key_hash % self.num_slots
+        for i in range(min(self.PROBE_WINDOW, self.num_slots)):
+            yield (start + i) % self.num_slots
+    
+    def _find(self, key_hash: int, key_bytes: bytes):
+        """Return (offset, slot fields) of the key's slot, or (None, None) (caller holds the lock)"""
+        for index in self._window(key_hash):
+            offset = self._slot_offset(index)
+            slot = self.SLOT.unpack_from(self.mm, offset)
+            if slot[0] == self.EMPTY:
+                break
+            if slot[0] == self.USED and slot[1] == key_hash and slot[4] == len(key_bytes):
+                start = offset + self.SLOT.size
+                if self.mm[start:start + slot[4]] == key_bytes:
+                    return offset, slot
+        return None, None
+    
+    def _free(self, offset: int, slot: tuple, counter: Optional[str]) -> None:
+        """Turn a used slot into a tombstone (caller holds the lock)"""
+        self.mm[offset] = self.DELETED
+        self._bump('entries', -1)
+        self._bump('bytes', -slot[5])
+        if counter:
+            self._bump(counter)
+    
+    @staticmethod
+    def _key_hash(key_bytes: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little')
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get item from the shared cache"""
+        return self.get_with_staleness(key)[0]
+    
+    def get_with_staleness(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Get (value, stale) like LRUCache.get_with_staleness"""
+        key_bytes = key.encode()
+        key_hash = self._key_hash(key_bytes)
+        current_time = time.time()
+        with self.lock:
+            offset, slot = self._find(key_hash, key_bytes)
+            if offset is None:
+                self._bump('misses')
+                return None, False
+            
+            # Same semantics as LRUCache: the TTL slides from the last access,
+            # staleness counts from the write, and stale hits are a subset of hits
+            if current_time - slot[3] > self.ttl:
+                self._free(offset, slot, 'expirations')
+                self._bump('misses')
+                return None, False
+            
+            self.SLOT.pack_into(self.mm, offset, self.USED, key_hash, slot[2], current_time, slot[4], slot[5])
+            start = offset + self.SLOT.size + slot[4]
+            payload = self.mm[start:start + slot[5]]
+            stale = self.soft_ttl is not None and current_time - slot[2] > self.soft_ttl
+            self._bump('hits')
+            if stale:
+                self._bump('stale_hits')
+        
+        return pickle.loads(payload), stale
+    
+    def put(self, key: str, value: Any, written_at: Optional[float] = None) -> None:
+        """Put item into the shared cache; values that don't fit a slot are skipped"""
+        key_bytes = key.encode()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(key_bytes) + len(payload) > self.payload_size:
+            logger.debug(f"Value for {key!r} exceeds the {self.payload_size} byte shared slot; not cached")
+            return
+        
+        key_hash = self._key_hash(key_bytes)
+        current_time = time.time()
+        with self.lock:
+            offset, slot = self._find(key_hash, key_bytes)
+            if offset is not None:
+                self._free(offset, slot, None)
+            else:
+                # First free slot in the window, else the least recently accessed one
+                victim = None
+                for index in self._window(key_hash):
+                    candidate = self._slot_offset(index)
+                    candidate_slot = self.SLOT.unpack_from(self.mm, candidate)
+                    if candidate_slot[0] != self.USED:
+                        offset = candidate
+                        break
+                    if victim is None or candidate_slot[3] < victim[1][3]:
+                        victim = (candidate, candidate_slot)
+                else:
+                    offset, slot = victim
+                    expired = current_time - slot[3] > self.ttl
+                    self._free(offset, slot, 'expirations' if expired else 'evictions')
+            
+            written = current_time if written_at is None else min(written_at, current_time)
+            self.SLOT.pack_into(self.mm, offset, self.USED, key_hash, written, current_time,
+                                len(key_bytes), len(payload))
+            start = offset + self.SLOT.size
+            self.mm[start:start + len(key_bytes)] = key_bytes
+            self.mm[start + len(key_bytes):start + len(key_bytes) + len(payload)] = payload
+            self._bump('entries')
+            self._bump('bytes', len(payload))
+    
+    def delete(self, key: str) -> bool:
+        """Remove an item; returns True if it was present"""
+        key_bytes = key.encode()
+        with self.lock:
+            offset, slot = self._find(self._key_hash(key_bytes), key_bytes)
+            if offset is None:
+                return False
+            self._free(offset, slot, None)
+            return True
+    
+    def clear(self) -> None:
+        """Clear entries for every process; counters are kept"""
+        with self.lock:
+            counters = self.HEADER.unpack_from(self.mm, 0)[3:]
+            self._reset()
+            self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.num_slots, self.slot_size,
+                                  *counters[:5], 0, 0)
+    
+    def expire(self) -> int:
+        """Reclaim every expired slot; returns the number removed"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        with self.lock:
+            for index in range(self.num_slots):
+                offset = self._slot_offset(index)
+                slot = self.SLOT.unpack_from(self.mm, offset)
+                if slot[0] == self.USED and slot[3] < cutoff:
+                    self._free(offset, slot, 'expirations')
+                    removed += 1
+        return removed
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.HEADER.unpack_from(self.mm, 0)[8]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Counters across all processes sharing the file"""
+        with self.lock:
+            counters = dict(zip(self.COUNTERS, self.HEADER.unpack_from(self.mm, 0)[3:]))
+        counters.pop('entries')
+        return counters
+    
+    def close(self) -> None:
+        """Unmap the file (other processes keep their mappings)"""
+        self.mm.close()
+        self.file.close()
+        self.lock.close()
+
+# Default bytes per SharedMemoryCache slot (key + pickled value)
+SHARED_SLOT_SIZES = {
+    'medicine': 8 * 1024,
+    'ocr': 16 * 1024,
+    'llm': 16 * 1024,
+    'agent': 32 * 1024,
+    'user_context': 8 * 1024
+}
+
+# Caches persisted by the disk tier by default; agent case analyses and user contexts
+# hold patient data and stay in memory unless explicitly listed
+DISK_TIER_CACHES = ('medicine', 'ocr', 'llm')
+
+class _LatencyBuffer:
+    """One thread's latency samples and running totals (written only by that thread)"""
+    
+    __slots__ = ('samples', 'count', 'total')
+    
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+class LatencyRecorder:
+    """
+    Tracks operation latencies: exact count/sum plus a window of recent samples for percentiles
+    
+    Each thread records into its own buffer, so record() takes no lock and the
+    sharded cache read path stays free of a shared lock. Buffers are merged
+    when snapshot() is called. Those of finished threads are folded into one
+    whenever a new thread registers or a snapshot is taken, so short-lived
+    worker threads never pile up buffers between snapshots.
+    """
+    
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._local = threading.local()
+        self._buffers = []  # (thread, _LatencyBuffer) for every thread that recorded
+        self._retired = _LatencyBuffer(window)
+        self.lock = threading.Lock()  # Guards the buffer list; taken once per thread, not per record
+    
+    def _register(self) -> _LatencyBuffer:
+        buffer = self._local.buffer = _LatencyBuffer(self.window)
+        with self.lock:
+            self._fold_finished()
+            self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+    
+    def _fold_finished(self) -> None:
+        """Merge buffers of threads that have exited into _retired (caller holds the lock)"""
+        live = []
+        for thread, buffer in self._buffers:
+            if thread.is_alive():
+                live.append((thread, buffer))
+                continue
+            self._retired.samples.extend(buffer.samples)
+            self._retired.count += buffer.count
+            self._retired.total += buffer.total
+        self._buffers = live
+    
+    def record(self, seconds: float) -> None:
+        buffer = getattr(self._local, 'buffer', None) or self._register()
+        buffer.samples.append(seconds)
+        buffer.count += 1
+        buffer.total += seconds
+    
+    def snapshot(self, quantiles=(0.5, 0.9, 0.99)) -> Dict[str, Any]:
+        """Return count, sum (seconds) and the requested quantiles (seconds) of recent samples"""
+        with self.lock:
+            self._fold_finished()
+            samples = list(self._retired.samples)
+            count, total = self._retired.count, self._retired.total
+            for _, buffer in self._buffers:
+                # deque.copy() runs without releasing the GIL, so a concurrent append can't break it
+                samples.extend(buffer.samples.copy())
+                count += buffer.count
+                total += buffer.total
+        ordered = sorted(samples)
+        values = {}
+        for q in quantiles:
+            values[q] = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        return {'count': count, 'sum': total, 'quantiles': values}
 
 class MedicalCacheManager:
     """
@@ -108,20 +1238,182 @@ class MedicalCacheManager:
     Handles different types of medical data with appropriate caching strategies
     """
     
-    def __init__(self):
-        # Different caches for different data types
-        self.medicine_cache = LRUCache(capacity=500, ttl=7200)  # 2 hours for medicine info
-        self.ocr_cache = LRUCache(capacity=1000, ttl=1800)      # 30 mins for OCR results
-        self.llm_cache = LRUCache(capacity=200, ttl=3600)       # 1 hour for LLM responses
-        self.agent_cache = LRUCache(capacity=300, ttl=3600)     # 1 hour for agent responses
-        self.user_context_cache = LRUCache(capacity=1000, ttl=14400)  # 4 hours for user contexts
+    def __init__(self, num_shards: int = 1,
+                 memory_budgets: Optional[Dict[str, int]] = None,
+                 sizer: Callable[[Any], int] = deep_getsizeof,
+                 disk_path: Optional[str] = None,
+                 stale_while_revalidate: bool = False,
+                 shared_dir: Optional[str] = None,
+                 admission: Optional[Dict[str, str]] = None):
+        """
+        Initialize the cache manager
+        
+        Args:
+            num_shards: Shards per cache; values above 1 enable lock-striped
+                        caches for multi-threaded callers
+            memory_budgets: Optional byte budget per cache name
+                            (e.g. {'llm': 64 * 1024 * 1024})
+            sizer: Function used to measure cached values in bytes
+            disk_path: Optional SQLite file for a persistent second tier
+                       (see enable_disk_tier)
+            stale_while_revalidate: Opt in to a 1 hour soft TTL for the LLM and agent
+                                    caches, with the hard TTL raised to 4 hours; between
+                                    the two, get_or_compute serves the cached answer and
+                                    refreshes it in the background
+            shared_dir: Optional directory of memory-mapped cache files shared with
+                        other processes (see enable_shared_tier)
+            admission: Admission policy per cache name; defaults to TinyLFU for the
+                       small LLM cache so one-off chat queries can't flush it
+        """
+        self.num_shards = num_shards
+        self.shared_dir = shared_dir
+        self.admission = {'llm': 'tinylfu'} if admission is None else admission
+        self.memory_budgets = memory_budgets or {}
+        self.sizer = sizer
+        self.disk_cache = None
+        
+        # LLM-backed answers stay servable for 3 more hours past their 1 hour soft TTL
+        swr_soft_ttl = 3600 if stale_while_revalidate else None
+        swr_hard_ttl = 4 * 3600 if stale_while_revalidate else 3600
+        
+        # Different caches for different data types: name -> (capacity, ttl, soft_ttl)
+        self._cache_specs = {
+            'medicine': (500, 7200, None),                      # 2 hours for medicine info
+            'ocr': (1000, 1800, None),                          # 30 mins for OCR results
+            'llm': (200, swr_hard_ttl, swr_soft_ttl),           # 1 hour for LLM responses
+            'agent': (300, swr_hard_ttl, swr_soft_ttl),         # 1 hour for agent responses
+            'user_context': (1000, 14400, None)                 # 4 hours for user contexts
+        }
+        self._build_caches()
         
+        # Hit/miss counters live on each cache (per shard) and are merged in get_stats();
+        # the manager only counts what the caches can't see
         self.stats = {
-            'hits': 0,
-            'misses': 0,
-            'evictions': 0
+            'cleared': 0,
+            'background_refreshes': 0
         }
         self.stats_lock = threading.Lock()
+        self.latency = {
+            name: {'get': LatencyRecorder(), 'put': LatencyRecorder()}
+            for name in self._caches()
+        }
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
+        
+        # Single-flight: one in-flight Future per cache key, shared by threads and event loops
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._tasks = set()  # Async computations owned by the manager, not by any one caller
+        
+        if disk_path:
+            self.enable_disk_tier(disk_path)
+    
+    def expire_all(self) -> Dict[str, int]:
+        """Reclaim expired entries in every cache; returns count removed per cache"""
+        return {name: cache.expire() for name, cache in self._caches().items()}
+    
+    def start_expiry_sweeper(self, interval: float = 60.0) -> None:
+        """
+        Start a background thread that reclaims expired entries periodically,
+        so idle caches release memory without waiting for reads or inserts
+        
+        Args:
+            interval: Seconds between sweeps
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+        
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                try:
+                    self.expire_all()
+                except Exception as e:
+                    logger.warning(f"Cache expiry sweep failed: {e}")
+        
+        self._sweeper = threading.Thread(target=sweep, name="cache-expiry-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_expiry_sweeper(self) -> None:
+        """Stop the background expiry thread"""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+    
+    def enable_disk_tier(self, path: str, caches: Sequence[str] = DISK_TIER_CACHES) -> Dict[str, int]:
+        """
+        Put a persistent SQLite tier behind the given caches and warm-load memory from it
+        
+        Values are stored unencrypted, so caches holding patient data ('agent',
+        'user_context') are left out unless listed in caches.
+        
+        Args:
+            path: SQLite database file (created if missing)
+            caches: Names of the caches to persist
+            
+        Returns:
+            Number of entries warm-loaded per cache
+        """
+        if self.disk_cache is not None:
+            return {}
+        
+        self.disk_cache = DiskCache(path)
+        loaded = {}
+        for name, cache in self._caches().items():
+            if name not in caches:
+                continue
+            tiered = TieredCache(name, cache, self.disk_cache)
+            setattr(self, f"{name}_cache", tiered)
+            loaded[name] = tiered.warm_load()
+        
+        logger.info(f"Disk cache tier enabled at {path}; warm-loaded {sum(loaded.values())} entries")
+        return loaded
+    
+    def enable_shared_tier(self, directory: str) -> None:
+        """
+        Back every cache with a SharedMemoryCache file so worker processes share entries
+        
+        Must be called before enable_disk_tier; current in-process entries are dropped.
+        
+        Args:
+            directory: Directory holding one mapped file per cache (e.g. /dev/shm/curavox)
+        """
+        if self.disk_cache is not None:
+            raise RuntimeError("Enable the shared tier before the disk tier")
+        self.shared_dir = directory
+        self._build_caches()
+        logger.info(f"Shared memory cache tier enabled at {directory}")
+    
+    def _build_caches(self) -> None:
+        """(Re)create the five caches from their specs"""
+        for name, (capacity, ttl, soft_ttl) in self._cache_specs.items():
+            setattr(self, f"{name}_cache", self._create_cache(name, capacity, ttl, soft_ttl))
+    
+    def _create_cache(self, name: str, capacity: int, ttl: int, soft_ttl: Optional[float] = None):
+        """Create a shared, plain or sharded LRU cache depending on configuration"""
+        max_bytes = self.memory_budgets.get(name)
+        if self.shared_dir:
+            # A byte budget becomes the slot size; otherwise use the per-cache default
+            slot_size = max(1024, max_bytes // capacity) if max_bytes else SHARED_SLOT_SIZES[name]
+            return SharedMemoryCache(os.path.join(self.shared_dir, f"{name}.cache"), capacity=capacity,
+                                     ttl=ttl, slot_size=slot_size, soft_ttl=soft_ttl)
+        if self.num_shards > 1:
+            return ShardedLRUCache(capacity=capacity, ttl=ttl, num_shards=self.num_shards,
+                                   max_bytes=max_bytes, sizer=self.sizer, soft_ttl=soft_ttl,
+                                   admission=self.admission.get(name))
+        return LRUCache(capacity=capacity, ttl=ttl, max_bytes=max_bytes, sizer=self.sizer,
+                        soft_ttl=soft_ttl, admission=self.admission.get(name))
+    
+    def _caches(self) -> Dict[str, Any]:
+        """Named view of all managed caches"""
+        return {
+            'medicine': self.medicine_cache,
+            'ocr': self.ocr_cache,
+            'llm': self.llm_cache,
+            'agent': self.agent_cache,
+            'user_context': self.user_context_cache
+        }
     
     def _generate_cache_key(self, *args, **kwargs) -> str:
         """
@@ -134,120 +1426,342 @@ class MedicalCacheManager:
         Returns:
             Hashed string key
         """
-        key_data = {
-            'args': args,
-            'kwargs': sorted(kwargs.items()) if kwargs else {}
-        }
-        key_str = json.dumps(key_data, sort_keys=True, default=str)
-        return hashlib.sha256(key_str.encode()).hexdigest()
+        return stable_hash(args, kwargs)
+    
+    def _lookup(self, name: str, key: str) -> Tuple[Optional[Any], bool]:
+        """Timed (value, stale) lookup in a named cache"""
+        start = time.perf_counter()
+        result = getattr(self, f"{name}_cache").get_with_staleness(key)
+        self.latency[name]['get'].record(time.perf_counter() - start)
+        return result
+    
+    def _put(self, name: str, key: str, value: Any) -> None:
+        """Timed insert into a named cache"""
+        start = time.perf_counter()
+        getattr(self, f"{name}_cache").put(key, value)
+        self.latency[name]['put'].record(time.perf_counter() - start)
+    
+    def _get_fresh(self, name: str, key: str) -> Optional[Any]:
+        """Plain lookups treat entries past their soft TTL as misses, so callers recompute"""
+        value, stale = self._lookup(name, key)
+        return None if stale else value
     
     def cache_medicine_info(self, medicine_name: str, info: Any) -> None:
         """Cache medicine information"""
         key = f"medicine:{medicine_name.lower()}"
-        self.medicine_cache.put(key, info)
+        self._put('medicine', key, info)
     
     def get_cached_medicine_info(self, medicine_name: str) -> Optional[Any]:
         """Get cached medicine information"""
         key = f"medicine:{medicine_name.lower()}"
-        result = self.medicine_cache.get(key)
-        if result is not None:
-            with self.stats_lock:
-                self.stats['hits'] += 1
-        else:
-            with self.stats_lock:
-                self.stats['misses'] += 1
-        return result
+        return self._get_fresh('medicine', key)
     
     def cache_ocr_result(self, image_hash: str, result: Any) -> None:
         """Cache OCR results"""
         key = f"ocr:{image_hash}"
-        self.ocr_cache.put(key, result)
+        self._put('ocr', key, result)
     
     def get_cached_ocr_result(self, image_hash: str) -> Optional[Any]:
         """Get cached OCR results"""
         key = f"ocr:{image_hash}"
-        result = self.ocr_cache.get(key)
-        if result is not None:
-            with self.stats_lock:
-                self.stats['hits'] += 1
-        else:
-            with self.stats_lock:
-                self.stats['misses'] += 1
-        return result
+        return self._get_fresh('ocr', key)
     
     def cache_llm_response(self, prompt_hash: str, response: Any) -> None:
         """Cache LLM responses"""
         key = f"llm:{prompt_hash}"
-        self.llm_cache.put(key, response)
+        self._put('llm', key, response)
     
     def get_cached_llm_response(self, prompt_hash: str) -> Optional[Any]:
         """Get cached LLM response"""
         key = f"llm:{prompt_hash}"
-        result = self.llm_cache.get(key)
-        if result is not None:
-            with self.stats_lock:
-                self.stats['hits'] += 1
-        else:
-            with self.stats_lock:
-                self.stats['misses'] += 1
-        return result
+        return self._get_fresh('llm', key)
     
     def cache_agent_response(self, query_hash: str, response: Any) -> None:
         """Cache agent responses"""
         key = f"agent:{query_hash}"
-        self.agent_cache.put(key, response)
+        self._put('agent', key, response)
     
     def get_cached_agent_response(self, query_hash: str) -> Optional[Any]:
         """Get cached agent response"""
         key = f"agent:{query_hash}"
-        result = self.agent_cache.get(key)
-        if result is not None:
-            with self.stats_lock:
-                self.stats['hits'] += 1
-        else:
-            with self.stats_lock:
-                self.stats['misses'] += 1
-        return result
+        return self._get_fresh('agent', key)
     
     def cache_user_context(self, user_id: str, context: Any) -> None:
         """Cache user context"""
         key = f"user:{user_id}"
-        self.user_context_cache.put(key, context)
+        self._put('user_context', key, context)
     
     def get_cached_user_context(self, user_id: str) -> Optional[Any]:
         """Get cached user context"""
         key = f"user:{user_id}"
-        result = self.user_context_cache.get(key)
-        if result is not None:
-            with self.stats_lock:
-                self.stats['hits'] += 1
+        return self._get_fresh('user_context', key)
+    
+    def _resolve(self, cache: str, key: str) -> str:
+        """Map a cache name and caller key to the full key used by the cache_* helpers"""
+        prefixes = {'medicine': 'medicine', 'ocr': 'ocr', 'llm': 'llm', 'agent': 'agent', 'user_context': 'user'}
+        if cache not in prefixes:
+            raise ValueError(f"Unknown cache: {cache}")
+        if cache == 'medicine':
+            key = key.lower()
+        return f"{prefixes[cache]}:{key}"
+    
+    def _claim(self, key: str):
+        """Return (future, is_leader) for an in-flight computation of key"""
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+    
+    def _settle(self, cache: str, key: str, future: Future, value: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        """Cache a leader's result and wake every waiter"""
+        if error is None and value is not None:
+            self._put(cache, key, value)
+        with self._in_flight_lock:
+            self._in_flight.pop(key, None)
+        if error is None:
+            future.set_result(value)
         else:
-            with self.stats_lock:
-                self.stats['misses'] += 1
-        return result
+            future.set_exception(error)
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+    def _count_refresh(self) -> None:
         with self.stats_lock:
-            total_requests = self.stats['hits'] + self.stats['misses']
-            hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+            self.stats['background_refreshes'] += 1
+    
+    def _refresh_in_background(self, cache: str, key: str, compute: Callable[[], Any]) -> None:
+        """Recompute a stale entry on a worker thread unless a computation is already running"""
+        future, is_leader = self._claim(key)
+        if not is_leader:
+            return
+        self._count_refresh()
+        
+        def refresh():
+            try:
+                value = compute()
+            except BaseException as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+                self._settle(cache, key, future, error=e)
+                return
+            self._settle(cache, key, future, value)
+        
+        threading.Thread(target=refresh, name="cache-refresh", daemon=True).start()
+    
+    def _arefresh_in_background(self, cache: str, key: str, compute: Callable[[], Any]) -> None:
+        """Recompute a stale entry as a task on the running loop unless one is already running"""
+        future, is_leader = self._claim(key)
+        if not is_leader:
+            return
+        self._count_refresh()
+        self._aspawn(cache, key, future, compute, background=True)
+    
+    def _aspawn(self, cache: str, key: str, future: Future, compute: Callable[[], Any],
+                background: bool = False) -> None:
+        """Run compute() as a task owned by the manager and settle future with its outcome"""
+        async def run():
+            try:
+                value = await compute()
+            except asyncio.CancelledError as e:
+                # Loop shutting down; release waiters without logging a failure
+                self._settle(cache, key, future, error=e)
+                raise
+            except BaseException as e:
+                if background:
+                    logger.warning(f"Background refresh of {key} failed: {e}")
+                self._settle(cache, key, future, error=e)
+                return
+            self._settle(cache, key, future, value)
+        
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Any], cache: str = 'llm') -> Any:
+        """
+        Return the cached value for key, computing it at most once across concurrent callers
+        
+        Concurrent misses for the same key wait on the first caller's computation
+        instead of repeating it (e.g. two identical Ollama requests). Errors are
+        propagated to every waiter and nothing is cached. Entries past their soft
+        TTL are returned immediately while compute() refreshes them in the background.
+        
+        Args:
+            key: Cache key (same form as passed to the cache_* helpers)
+            compute: Zero-argument function producing the value on a miss
+            cache: Name of the cache to use
             
-            return {
-                'total_requests': total_requests,
-                'hits': self.stats['hits'],
-                'misses': self.stats['misses'],
-                'hit_rate_percent': round(hit_rate, 2),
-                'cache_sizes': {
-                    'medicine': len(self.medicine_cache.cache),
-                    'ocr': len(self.ocr_cache.cache),
-                    'llm': len(self.llm_cache.cache),
-                    'agent': len(self.agent_cache.cache),
-                    'user_context': len(self.user_context_cache.cache)
+        Returns:
+            Cached or freshly computed value
+        """
+        full_key = self._resolve(cache, key)
+        value, stale = self._lookup(cache, full_key)
+        if value is not None:
+            if stale:
+                self._refresh_in_background(cache, full_key, compute)
+            return value
+        
+        future, is_leader = self._claim(full_key)
+        if not is_leader:
+            return future.result()
+        
+        try:
+            value = compute()
+        except BaseException as e:
+            self._settle(cache, full_key, future, error=e)
+            raise
+        self._settle(cache, full_key, future, value)
+        return value
+    
+    async def aget_or_compute(self, key: str, compute: Callable[[], Any], cache: str = 'llm') -> Any:
+        """
+        Async variant of get_or_compute
+        
+        The computation runs as a task owned by the manager and every caller,
+        the first one included, awaits it through asyncio.shield: cancelling a
+        caller (e.g. on its request deadline) leaves the shared computation
+        running for the others.
+        
+        Args:
+            key: Cache key (same form as passed to the cache_* helpers)
+            compute: Zero-argument coroutine function producing the value on a miss
+            cache: Name of the cache to use
+            
+        Returns:
+            Cached or freshly computed value
+        """
+        full_key = self._resolve(cache, key)
+        value, stale = self._lookup(cache, full_key)
+        if value is not None:
+            if stale:
+                self._arefresh_in_background(cache, full_key, compute)
+            return value
+        
+        future, is_leader = self._claim(full_key)
+        if is_leader:
+            self._aspawn(cache, full_key, future, compute)
+        # wrap_future works whether the leader is a thread or a coroutine on another loop
+        return await asyncio.shield(asyncio.wrap_future(future))
+    
+    def get_cache_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-cache counters, sizes and get/put latency percentiles
+        
+        Returns:
+            {cache name: {hits, misses, evictions, expirations, stale_hits, entries,
+                          bytes, max_bytes, get_latency_ms, put_latency_ms, ...}}
+        """
+        metrics = {}
+        for name, cache in self._caches().items():
+            cache_stats = cache.get_stats()
+            lookups = cache_stats['hits'] + cache_stats['misses']
+            entry = dict(cache_stats)
+            entry['entries'] = len(cache)
+            entry['capacity'] = cache.capacity
+            entry['max_bytes'] = self.memory_budgets.get(name)
+            entry['hit_rate_percent'] = round(cache_stats['hits'] / lookups * 100, 2) if lookups else 0
+            for op, recorder in self.latency[name].items():
+                snapshot = recorder.snapshot()
+                entry[f'{op}_latency_ms'] = {
+                    f"p{int(q * 100)}": round(v * 1000, 4) for q, v in snapshot['quantiles'].items()
                 }
-            }
+                entry[f'{op}_count'] = snapshot['count']
+            metrics[name] = entry
+        return metrics
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (per-cache counters are merged lazily here)"""
+        per_cache = self.get_cache_metrics()
+        totals = {
+            counter: sum(m[counter] for m in per_cache.values())
+            for counter in ('hits', 'misses', 'evictions', 'expirations', 'stale_hits')
+        }
+        
+        total_requests = totals['hits'] + totals['misses']
+        hit_rate = (totals['hits'] / total_requests * 100) if total_requests > 0 else 0
+        with self.stats_lock:
+            manager_stats = dict(self.stats)
+        
+        return {
+            'total_requests': total_requests,
+            'hits': totals['hits'],
+            'misses': totals['misses'],
+            'hit_rate_percent': round(hit_rate, 2),
+            'evictions': totals['evictions'],
+            'expirations': totals['expirations'],
+            'stale_hits': totals['stale_hits'],
+            'cleared': manager_stats['cleared'],
+            'background_refreshes': manager_stats['background_refreshes'],
+            'cache_sizes': {name: m['entries'] for name, m in per_cache.items()},
+            'cache_bytes': {name: m['bytes'] for name, m in per_cache.items()},
+            'memory_budgets': dict(self.memory_budgets),
+            'per_cache': per_cache,
+            'disk_tier': dict(self.disk_cache.stats, path=self.disk_cache.path) if self.disk_cache else None
+        }
+    
+    def export_prometheus(self, prefix: str = 'curavox_cache') -> str:
+        """
+        Render cache metrics in the Prometheus text exposition format
+        
+        Args:
+            prefix: Metric name prefix
+            
+        Returns:
+            Text suitable for a /metrics endpoint or file-based collector
+        """
+        per_cache = self.get_cache_metrics()
+        lines = []
+        
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_str}}} {value}")
+        
+        counters = [
+            ('hits_total', 'hits', 'Cache lookups that returned a value'),
+            ('misses_total', 'misses', 'Cache lookups that returned nothing'),
+            ('evictions_total', 'evictions', 'Entries evicted by capacity or byte budget'),
+            ('expirations_total', 'expirations', 'Entries removed after their TTL'),
+            ('stale_hits_total', 'stale_hits', 'Hits served past the soft TTL'),
+            ('admission_rejections_total', 'rejections', 'New entries turned away by the admission policy'),
+        ]
+        for metric, field, help_text in counters:
+            family(metric, 'counter', help_text,
+                   [({'cache': name}, m.get(field, 0)) for name, m in per_cache.items()])
+        family('entries', 'gauge', 'Entries currently cached',
+               [({'cache': name}, m['entries']) for name, m in per_cache.items()])
+        family('bytes', 'gauge', 'Approximate bytes currently cached',
+               [({'cache': name}, m['bytes']) for name, m in per_cache.items()])
+        
+        lines.append(f"# HELP {prefix}_operation_latency_seconds Cache operation latency")
+        lines.append(f"# TYPE {prefix}_operation_latency_seconds summary")
+        for name, ops in self.latency.items():
+            for op, recorder in ops.items():
+                snapshot = recorder.snapshot()
+                labels = f'cache="{name}",op="{op}"'
+                for q, v in snapshot['quantiles'].items():
+                    lines.append(f'{prefix}_operation_latency_seconds{{{labels},quantile="{q}"}} {v:.9f}')
+                lines.append(f"{prefix}_operation_latency_seconds_sum{{{labels}}} {snapshot['sum']:.9f}")
+                lines.append(f"{prefix}_operation_latency_seconds_count{{{labels}}} {snapshot['count']}")
+        
+        with self.stats_lock:
+            manager_stats = dict(self.stats)
+        lines.append(f"# HELP {prefix}_background_refreshes_total Stale-while-revalidate refreshes started")
+        lines.append(f"# TYPE {prefix}_background_refreshes_total counter")
+        lines.append(f"{prefix}_background_refreshes_total {manager_stats['background_refreshes']}")
+        lines.append(f"# HELP {prefix}_cleared_total Entries dropped by clear_all_caches")
+        lines.append(f"# TYPE {prefix}_cleared_total counter")
+        lines.append(f"{prefix}_cleared_total {manager_stats['cleared']}")
+        return "\n".join(lines) + "\n"
     
     def clear_all_caches(self) -> None:
         """Clear all caches"""
+        # Count before clearing; counting afterwards always added 0
+        cleared = sum(len(cache) for cache in self._caches().values())
+        
         self.medicine_cache.clear()
         self.ocr_cache.clear()
         self.llm_cache.clear()
@@ -255,53 +1769,194 @@ class MedicalCacheManager:
         self.user_context_cache.clear()
         
         with self.stats_lock:
-            self.stats['evictions'] += sum([
-                len(self.medicine_cache.cache),
-                len(self.ocr_cache.cache),
-                len(self.llm_cache.cache),
-                len(self.agent_cache.cache),
-                len(self.user_context_cache.cache)
-            ])
+            self.stats['cleared'] += cleared
 
-def cache_memoize(ttl: int = 3600, cache_instance: MedicalCacheManager = None):
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'stale_hits', 'maxsize', 'currsize'])
+
+# Separates positional from keyword arguments; a constant, so shared-store keys
+# hash the same in every process (an object() sentinel would encode its address)
+# Separates positional from keyword arguments in memoize keys. A private object can
+# never equal a caller's argument; _encode_canonical gives it a tag of its own
+_KWARGS_MARK = object()
+
+def _type_name(value: Any) -> str:
+    kind = type(value)
+    return f"{kind.__module__}.{kind.__qualname__}"
+
+def _memoize_key(args: tuple, kwargs: Dict[str, Any], typed: bool):
+    """
+    Build an exact (collision-free) key from call arguments
+    
+    Hashable arguments are used as a tuple key directly, like functools.lru_cache.
+    Unhashable ones (lists, dicts, dataclasses) fall back to their full canonical
+    encoding, which is compared byte for byte rather than by a truncated hash.
+    With typed=True the argument types are added by qualified name.
+    """
+    key = args
+    if kwargs:
+        items = tuple(sorted(kwargs.items(), key=lambda kv: kv[0]))
+        key += (_KWARGS_MARK,) + items
+    if typed:
+        key += tuple(_type_name(v) for v in args)
+        if kwargs:
+            key += tuple(_type_name(v) for _, v in items)
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        out = []
+        _encode_canonical(key, out)
+        return b''.join(out)
+
+def cache_memoize(ttl: int = 3600, cache_instance: Any = None, maxsize: int = 128,
+                  typed: bool = False, stale_ttl: int = 0):
     """
     Decorator for function memoization with TTL
     
+    Works on plain and ``async def`` functions. Each decorated function gets its
+    own bounded LRU (or uses a shared cache), and exposes ``cache_info()`` and
+    ``cache_clear()`` like functools.lru_cache.
+    
     Args:
-        ttl: Time to live in seconds
-        cache_instance: Cache manager instance
+        ttl: Seconds a result is fresh
+        cache_instance: Optional shared store with get/put (LRUCache, TieredCache, ...);
+                        a MedicalCacheManager uses its llm_cache. Keys are then
+                        stable hashes so they work across processes.
+        maxsize: Capacity of the per-function LRU when no cache_instance is given
+        typed: Cache arguments of different types separately (f(1) vs f(1.0))
+        stale_ttl: Extra seconds after ttl during which the stale result is returned
+                   immediately while one background call refreshes it
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generate cache key from function name and arguments
-            cache_key = f"{func.__name__}:{hash(str(args) + str(sorted(kwargs.items()))) % 1000000}"
-            
-            # Use provided cache instance or create a temporary one
-            cache = cache_instance or getattr(wrapper, '_temp_cache', None)
-            if cache is None:
-                # Create a simple in-memory cache for this function
-                if not hasattr(wrapper, '_temp_cache'):
-                    setattr(wrapper, '_temp_cache', {})
-                cache = wrapper._temp_cache
+        is_async = asyncio.iscoroutinefunction(func)
+        if cache_instance is None:
+            store = LRUCache(capacity=maxsize, ttl=ttl + stale_ttl)
+            shared = False
+        else:
+            store = cache_instance.llm_cache if isinstance(cache_instance, MedicalCacheManager) else cache_instance
+            shared = True
+        
+        qualified_name = f"{func.__module__}.{func.__qualname__}"
+        counters = {'hits': 0, 'misses': 0, 'stale_hits': 0}
+        state = {'generation': 0}
+        refreshing = set()
+        background_tasks = set()
+        lock = threading.Lock()
+        
+        def make_key(args, kwargs):
+            key = _memoize_key(args, kwargs, typed)
+            if shared:
+                # Shared stores need string keys; the generation makes cache_clear() O(1)
+                return f"memoize:{qualified_name}:{state['generation']}:{stable_hash(key)}"
+            return key
+        
+        def lookup(key):
+            """Return (value, found, stale)"""
+            entry = store.get(key)
+            if entry is None:
+                return None, False, False
+            value, computed_at = entry
+            age = time.time() - computed_at
+            if age < ttl:
+                return value, True, False
+            if age < ttl + stale_ttl:
+                return value, True, True
+            return None, False, False
+        
+        def record(counter):
+            with lock:
+                counters[counter] += 1
+        
+        def claim_refresh(key) -> bool:
+            with lock:
+                if key in refreshing:
+                    return False
+                refreshing.add(key)
+                return True
+        
+        def release_refresh(key):
+            with lock:
+                refreshing.discard(key)
+        
+        if is_async:
+            async def refresh_async(key, args, kwargs):
+                try:
+                    store.put(key, (await func(*args, **kwargs), time.time()))
+                except Exception as e:
+                    logger.warning(f"Background refresh of {qualified_name} failed: {e}")
+                finally:
+                    release_refresh(key)
             
-            # Check if result is in cache
-            current_time = time.time()
-            if cache_key in cache:
-                result, timestamp = cache[cache_key]
-                if current_time - timestamp < ttl:
-                    return result
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                value, found, stale = lookup(key)
+                if found:
+                    record('stale_hits' if stale else 'hits')
+                    if stale and claim_refresh(key):
+                        task = asyncio.ensure_future(refresh_async(key, args, kwargs))
+                        background_tasks.add(task)
+                        task.add_done_callback(background_tasks.discard)
+                    return value
+                
+                record('misses')
+                value = await func(*args, **kwargs)
+                store.put(key, (value, time.time()))
+                return value
+        else:
+            def refresh(key, args, kwargs):
+                try:
+                    store.put(key, (func(*args, **kwargs), time.time()))
+                except Exception as e:
+                    logger.warning(f"Background refresh of {qualified_name} failed: {e}")
+                finally:
+                    release_refresh(key)
             
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            cache[cache_key] = (result, current_time)
-            return result
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                value, found, stale = lookup(key)
+                if found:
+                    record('stale_hits' if stale else 'hits')
+                    if stale and claim_refresh(key):
+                        threading.Thread(target=refresh, args=(key, args, kwargs),
+                                         name=f"refresh-{func.__name__}", daemon=True).start()
+                    return value
+                
+                record('misses')
+                value = func(*args, **kwargs)
+                store.put(key, (value, time.time()))
+                return value
+        
+        def cache_info() -> CacheInfo:
+            """Report hit/miss statistics for this function"""
+            with lock:
+                return CacheInfo(
+                    hits=counters['hits'],
+                    misses=counters['misses'],
+                    stale_hits=counters['stale_hits'],
+                    maxsize=None if shared else maxsize,
+                    currsize=None if shared else len(store)
+                )
+        
+        def cache_clear() -> None:
+            """Drop this function's cached results and reset statistics"""
+            with lock:
+                for counter in counters:
+                    counters[counter] = 0
+                state['generation'] += 1
+            if not shared:
+                store.clear()
         
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
         return wrapper
     return decorator
 
-# Global cache manager instance
-cache_manager = MedicalCacheManager()
+# Global cache manager instance (CURAVOX_CACHE_SHARDS > 1 enables lock striping)
+cache_manager = MedicalCacheManager(num_shards=int(os.environ.get('CURAVOX_CACHE_SHARDS', '1')),
+                                    shared_dir=os.environ.get('CURAVOX_CACHE_SHARED_DIR') or None,
+                                    stale_while_revalidate=os.environ.get('CURAVOX_STALE_WHILE_REVALIDATE') == '1')
 
 # Example usage functions
 def get_medicine_info_cached(medicine_name: str) -> Optional[Dict]:
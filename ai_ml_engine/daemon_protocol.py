@@ -0,0 +1,112 @@
+"""
+Daemon Protocol for Medical AI Assistant
+Message framing and protocol negotiation shared by the daemon, the socket server and their clients
+"""
+
+import json
+import struct
+import asyncio
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 4-byte big-endian payload length, then the payload in the negotiated encoding
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Newline-delimited JSON: the stdin daemon's default, not framed
+LINE_PROTOCOL = 'jsonl'
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed or oversized frame"""
+
+
+class MessageError(ProtocolError):
+    """A complete frame whose payload is not a message object; the stream is still in sync"""
+
+
+def available_protocols(framed_only: bool = False) -> List[str]:
+    """Protocols this process can speak, in order of preference for clients that don't care"""
+    protocols = [] if framed_only else [LINE_PROTOCOL]
+    protocols.append('json')
+    if msgpack is not None:
+        protocols.append('msgpack')
+    return protocols
+
+
+def choose_protocol(requested: Optional[str], offered: List[str]) -> str:
+    """Validate a client's hello; raises ProtocolError for protocols not offered"""
+    if requested not in offered:
+        raise ProtocolError(f"Unsupported protocol {requested!r}; offered {offered}")
+    return requested
+
+
+def encode_frame(message: Dict[str, Any], protocol: str = 'json') -> bytes:
+    """Serialize a message into one length-prefixed frame"""
+    if protocol == 'msgpack':
+        payload = msgpack.packb(message, use_bin_type=True)
+    else:
+        payload = json.dumps(message).encode('utf-8')
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME_SIZE}")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_frame(payload: bytes, protocol: str = 'json') -> Dict[str, Any]:
+    """Parse a frame payload (without its length prefix)"""
+    try:
+        if protocol == 'msgpack':
+            message = msgpack.unpackb(payload, raw=False)
+        else:
+            message = json.loads(payload)
+    except Exception as e:  # msgpack raises several unrelated exception types
+        raise MessageError(f"Invalid frame payload: {e}") from e
+    if not isinstance(message, dict):
+        raise MessageError(f"Frame payload must be an object, got {type(message).__name__}")
+    return message
+
+
+def _check_length(header: bytes) -> int:
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_SIZE}")
+    return length
+
+
+async def read_frame(reader: asyncio.StreamReader, protocol: str = 'json') -> Optional[Dict[str, Any]]:
+    """
+    Read one frame from a stream
+
+    Returns:
+        The decoded message, or None when the peer closed the connection between frames
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Connection closed inside a frame header") from e
+        return None
+    length = _check_length(header)
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError("Connection closed inside a frame") from e
+    return decode_frame(payload, protocol)
+
+
+def read_frame_sync(stream: BinaryIO, protocol: str = 'json') -> Optional[Dict[str, Any]]:
+    """Blocking read_frame for a buffered binary stream such as sys.stdin.buffer"""
+    header = stream.read(FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) < FRAME_HEADER.size:
+        raise ProtocolError("Stream ended inside a frame header")
+    length = _check_length(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ProtocolError("Stream ended inside a frame")
+    return decode_frame(payload, protocol)
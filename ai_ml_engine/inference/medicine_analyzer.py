@@ -7,11 +7,16 @@ import json
 import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-import torch
 import numpy as np
 from datetime import datetime
 
+try:
+    from ..model_registry import model_registry, ModelLoadError
+except ImportError:
+    from model_registry import model_registry, ModelLoadError
+
+NER_MODEL = "dmis-lab/biobert-base-cased-v1.1-squad"
+
 @dataclass
 class MedicineInfo:
     """Data class to hold medicine information"""
@@ -38,32 +43,45 @@ class MedicineAnalyzer:
         """
         Initialize the medicine analyzer with pre-trained models
         """
-        self.medicine_ner_model = None
         self.classification_pipeline = None
         self.qa_pipeline = None
         
         # Initialize models
         self._load_models()
     
+    @property
+    def medicine_ner_model(self):
+        """BioBERT NER from the process-wide model registry (reloaded if it was evicted), or None"""
+        try:
+            return model_registry.get(NER_MODEL, self._build_ner_model)
+        except ModelLoadError:
+            # Failed recently; the registry retries after its backoff. Rule-based extraction meanwhile
+            return None
+        except Exception as e:
+            print(f"Error loading models: {e}")
+            # Fallback to simple rule-based extraction
+            return None
+    
+    @staticmethod
+    def _build_ner_model():
+        # Deferred: importing transformers pulls in torch, which costs seconds
+        from transformers import pipeline
+        
+        # Named Entity Recognition model for identifying medicine-related entities
+        # Using a pre-trained biomedical NER model
+        return pipeline(
+            "ner", 
+            model=NER_MODEL,
+            tokenizer=NER_MODEL,
+            aggregation_strategy="simple"
+        )
+    
     def _load_models(self):
         """
         Load pre-trained models for medicine analysis
         """
-        try:
-            # Named Entity Recognition model for identifying medicine-related entities
-            # Using a pre-trained biomedical NER model
-            self.medicine_ner_model = pipeline(
-                "ner", 
-                model="dmis-lab/biobert-base-cased-v1.1-squad",
-                tokenizer="dmis-lab/biobert-base-cased-v1.1-squad",
-                aggregation_strategy="simple"
-            )
-            
+        if self.medicine_ner_model is not None:
             print("Models loaded successfully")
-        except Exception as e:
-            print(f"Error loading models: {e}")
-            # Fallback to simple rule-based extraction
-            self.medicine_ner_model = None
     
     def analyze_medicine_from_text(self, text: str) -> MedicineInfo:
         """
@@ -103,13 +121,14 @@ class MedicineAnalyzer:
         Returns:
             Dict[str, List[str]]: Dictionary of extracted entities
         """
-        if not self.medicine_ner_model:
+        ner_model = self.medicine_ner_model
+        if not ner_model:
             return {}
         
         try:
             # BioBERT NER model doesn't have medicine-specific entities
             # So we'll use a rule-based approach combined with the model
-            entities = self.medicine_ner_model(text)
+            entities = ner_model(text)
             
             # Group entities by type
             grouped_entities = {}
@@ -6,10 +6,13 @@ Advanced NLP-based medicine analysis with local LLM integration
 import re
 import json
 import time
+import logging
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class MedicineInfo:
     """
@@ -285,7 +288,7 @@ class OptimizedMedicineAnalyzer:
             # Get close matches (cutoff=0.8 means 80% similarity required)
             matches = difflib.get_close_matches(token, known_medicines, n=1, cutoff=0.75)
             if matches:
-                print(f"[Fuzzy Match] Corrected '{token}' to '{matches[0]}'") # Debug log
+                logger.debug(f"[Fuzzy Match] Corrected '{token}' to '{matches[0]}'")
                 return matches[0].capitalize()
         
         # If not found in knowledge base, use regex patterns
@@ -4,11 +4,28 @@ Integrates with local LLM (Ollama) for medical knowledge processing
 """
 
 import time
+import base64
+import asyncio
+import logging
+import threading
 import requests
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import json
 
+# Async HTTP client for the asyncio daemon; the blocking API only needs requests
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "llama2-medical"
+# Seconds between background health probes while Ollama is up, and while it is down
+HEALTH_CHECK_INTERVAL = 30.0
+HEALTH_RETRY_INTERVAL = 5.0
+
 @dataclass
 class LLMResponse:
     """Data class for LLM response"""
@@ -33,15 +50,155 @@ class LocalMedicalLLM:
         """
         self.host = host
         self.timeout = 30  # Timeout for LLM requests
+        self.vision_timeout = 120  # Vision can take longer (Initial Load)
+        self.health_timeout = 5
+        self._async_client = None
+        
+        # No HTTP here: Ollama is probed on first use or by the health monitor
+        self.model = DEFAULT_MODEL
+        self.vision_model = "gemma3:4b"
+        self.available_models = []
+        self.last_health_check = None
+        self._connected = False
+        self._probed = threading.Event()
+        self._probe_lock = threading.Lock()  # Single-flight for the first probe
+        self._health_lock = threading.Lock()  # Guards the cached state (never held across HTTP)
+        self._on_health_change = None
+        self._health_announced = False
+        self._health_monitor = None
+        self._stop_health_monitor = threading.Event()
+    
+    @property
+    def connected(self) -> bool:
+        """Cached Ollama reachability; the first read probes if nothing else has yet"""
+        if not self._probed.is_set():
+            self.ensure_probed()
+        return self._connected
+    
+    def ensure_probed(self) -> None:
+        """Block until Ollama has been probed once (concurrent first callers share one probe)"""
+        with self._probe_lock:
+            if self._probed.is_set():
+                return
+            models = self._fetch_models()
+            with self._health_lock:
+                if not self._probed.is_set():  # The health monitor may have answered meanwhile
+                    self._apply_health(models)
+    
+    async def aensure_probed(self) -> None:
+        """Async variant of ensure_probed; keeps the event loop free while the probe runs"""
+        if not self._probed.is_set():
+            await asyncio.to_thread(self.ensure_probed)
+    
+    def _fetch_models(self) -> Optional[List[str]]:
+        """Model names from /api/tags, or None when Ollama is unreachable"""
+        try:
+            response = requests.get(f"{self.host}/api/tags", timeout=self.health_timeout)
+            if response.status_code == 200:
+                return [model['name'] for model in response.json().get('models', [])]
+        except Exception:
+            pass
+        return None
+    
+    async def _afetch_models(self) -> Optional[List[str]]:
+        try:
+            response = await self._get_async_client().get("/api/tags", timeout=self.health_timeout)
+            if response.status_code == 200:
+                return [model['name'] for model in response.json().get('models', [])]
+        except Exception:
+            pass
+        return None
+    
+    def _apply_health(self, models: Optional[List[str]]) -> None:
+        """Record a probe result (caller holds _health_lock) and notify on availability or model changes"""
+        connected = models is not None
+        before = (self._connected, self.model)
+        self._connected = connected
+        self.available_models = models or []
+        if connected:
+            self.model = self._select_best_model(self.available_models)
+        self.last_health_check = time.time()
+        changed = not self._probed.is_set() or (self._connected, self.model) != before
+        self._probed.set()
+        
+        if changed:
+            logger.info(f"Local LLM {'available' if connected else 'unavailable'} (model {self.model})")
+        if self._on_health_change is not None and (changed or not self._health_announced):
+            self._health_announced = True
+            try:
+                self._on_health_change(self.health_status())
+            except Exception as e:
+                logger.error(f"LLM health callback failed: {e}")
+    
+    def refresh_health(self) -> bool:
+        """Probe Ollama now and update the cached state; returns availability"""
+        models = self._fetch_models()
+        with self._health_lock:
+            self._apply_health(models)
+        return self._connected
+    
+    async def arefresh_health(self) -> bool:
+        """Async variant of refresh_health"""
+        models = await self._afetch_models()
+        with self._health_lock:
+            self._apply_health(models)
+        return self._connected
+    
+    def health_status(self) -> Dict:
+        """Cached health, as reported by get_system_status and the daemon's llm_status messages"""
+        return {
+            'available': self._connected,
+            'model': self.model,
+            'vision_model': self.vision_model,
+            'available_models': list(self.available_models),
+            'checked_at': self.last_health_check
+        }
+    
+    def _next_health_check(self) -> float:
+        return HEALTH_CHECK_INTERVAL if self._connected else HEALTH_RETRY_INTERVAL
+    
+    def start_health_monitor(self, on_change=None) -> threading.Thread:
+        """
+        Probe Ollama now and then periodically on a background thread
         
-        # Test connection and select best model
-        self.connected = self.check_connection()
-        self.model = self._select_best_model() if self.connected else "llama2-medical"
+        Args:
+            on_change: Called with health_status() after the first probe and
+                whenever availability or the selected model changes
+        """
+        self._on_health_change = on_change
+        self._health_announced = False
+        self._stop_health_monitor.clear()
+        
+        def run():
+            while True:
+                self.refresh_health()
+                if self._stop_health_monitor.wait(self._next_health_check()):
+                    return
+        
+        self._health_monitor = threading.Thread(target=run, name="llm-health", daemon=True)
+        self._health_monitor.start()
+        return self._health_monitor
+    
+    async def amonitor_health(self, on_change=None) -> None:
+        """Asyncio variant of start_health_monitor; run it as a task and cancel it to stop"""
+        self._on_health_change = on_change
+        self._health_announced = False
+        while True:
+            await self.arefresh_health()
+            await asyncio.sleep(self._next_health_check())
+    
+    def stop_health_monitor(self) -> None:
+        self._stop_health_monitor.set()
+    
+    def _mark_unreachable(self) -> None:
+        """A request could not connect: report it now rather than at the next probe"""
+        with self._health_lock:
+            if self._connected:
+                self._apply_health(None)
         
-    def _select_best_model(self) -> str:
+    def _select_best_model(self, available_models: List[str]) -> str:
         """Dynamically select the best available model from Ollama"""
         try:
-            available_models = self.list_available_models()
             # print(f"Found available models: {available_models}") # DISABLED: Breaks JSON Protocol
             
             # Priority list for DEFAULT TEXT GENERATION (Dr. CuraVox Persona)
@@ -55,9 +212,6 @@ class LocalMedicalLLM:
                 "gemma3:4b"        # Fallback for text (Vision Primary)
             ]
             
-            # Dedicated Vision Model (Hardcoded usage later)
-            self.vision_model = "gemma3:4b"
-            
             for model in priority_models:
                 if model in available_models:
                     # print(f"Selected model: {model}") # DISABLED
@@ -72,20 +226,16 @@ class LocalMedicalLLM:
             # print(f"Error selecting model: {e}") # DISABLED
             pass
             
-        return "llama2-medical"  # Fallback
+        return DEFAULT_MODEL  # Fallback
         
     def check_connection(self) -> bool:
         """
-        Check if the local LLM server is accessible
+        Check if the local LLM server is accessible (a live probe that also refreshes the cached state)
         
         Returns:
             bool: True if connection successful, False otherwise
         """
-        try:
-            response = requests.get(f"{self.host}/api/tags", timeout=5)
-            return response.status_code == 200
-        except Exception:
-            return False
+        return self.refresh_health()
     
     def generate_medical_response(self, prompt: str, context: str = "") -> LLMResponse:
         """
@@ -99,8 +249,59 @@ class LocalMedicalLLM:
             LLMResponse: Structured response from the LLM
         """
         start_time = time.time()
+        full_prompt = self._build_medical_prompt(prompt, context)
+        
+        if not self.connected:
+            return self._offline_response(start_time)
+        
+        try:
+            # Make request to local Ollama server
+            response = requests.post(
+                f"{self.host}/api/generate",
+                json=self._medical_payload(full_prompt),
+                timeout=self.timeout
+            )
+            return self._response_from_http(response.status_code, response.json() if response.status_code == 200 else None,
+                                            start_time, self.model)
+                
+        except requests.exceptions.ConnectionError:
+            self._mark_unreachable()
+            return self._connection_error_response(start_time)
+        except Exception as e:
+            return self._exception_response(e, start_time)
+    
+    async def agenerate_medical_response(self, prompt: str, context: str = "") -> LLMResponse:
+        """
+        Async variant of generate_medical_response (no thread is held while Ollama generates)
+        
+        Args:
+            prompt: The medical question or prompt
+            context: Additional context for the query
+            
+        Returns:
+            LLMResponse: Structured response from the LLM
+        """
+        start_time = time.time()
+        full_prompt = self._build_medical_prompt(prompt, context)
         
-        full_prompt = f"""
+        await self.aensure_probed()
+        if not self.connected:
+            return self._offline_response(start_time)
+        
+        try:
+            client = self._get_async_client()
+            response = await client.post("/api/generate", json=self._medical_payload(full_prompt), timeout=self.timeout)
+            return self._response_from_http(response.status_code, response.json() if response.status_code == 200 else None,
+                                            start_time, self.model)
+        except Exception as e:
+            if httpx is not None and isinstance(e, httpx.ConnectError):
+                self._mark_unreachable()
+                return self._connection_error_response(start_time)
+            return self._exception_response(e, start_time)
+    
+    def _build_medical_prompt(self, prompt: str, context: str) -> str:
+        """Wrap a question in the Dr. CuraVox persona prompt"""
+        return f"""
         System: You are Dr. CuraVox, an empathetic and professional medical consultant.
         
         Mission: Provide helpful, accurate medical insights while remaining concise.
@@ -118,82 +319,110 @@ class LocalMedicalLLM:
         
         Dr. CuraVox Response:
         """
-        
-        if not self.connected:
-            # Return a fallback response if LLM is not available
+    
+    def _medical_payload(self, full_prompt: str) -> Dict:
+        """Ollama /api/generate body for text responses"""
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.3,  
+                "top_p": 0.9,
+                "max_tokens": 250,
+                "num_gpu": 99,       # FORCE GPU OFFLOAD (All layers)
+                "num_ctx": 4096      # Fit in 8GB VRAM comfortably
+            }
+        }
+    
+    def _response_from_http(self, status_code: int, result: Optional[Dict], start_time: float, model: str) -> LLMResponse:
+        """Turn an Ollama HTTP result into an LLMResponse"""
+        if status_code == 200:
+            processing_time = time.time() - start_time
+            
+            # Estimate token count (rough approximation)
+            tokens_used = len(result.get("response", "").split())
+            
+            # Calculate confidence based on response quality metrics
+            confidence = self._calculate_confidence(result, processing_time)
+            
             return LLMResponse(
-                response="Local medical AI is not available. Please consult with a healthcare professional for medical advice.",
-                confidence=0.0,
-                processing_time=time.time() - start_time,
-                model_used="offline_fallback",
-                tokens_used=0
+                response=result.get("response", ""),
+                confidence=confidence,
+                processing_time=processing_time,
+                model_used=result.get("model", model),
+                tokens_used=tokens_used
             )
         
-        try:
-            # Make request to local Ollama server
-            response = requests.post(
-                f"{self.host}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,  
-                        "top_p": 0.9,
-                        "max_tokens": 250,
-                        "num_gpu": 99,       # FORCE GPU OFFLOAD (All layers)
-                        "num_ctx": 4096      # Fit in 8GB VRAM comfortably
-                    }
-                },
-                timeout=self.timeout
+        # Handle error response
+        error_msg = f"LLM request failed with status {status_code}"
+        return LLMResponse(
+            response=f"Error: {error_msg}. Please consult with a healthcare professional.",
+            confidence=0.1,
+            processing_time=time.time() - start_time,
+            model_used=model,
+            tokens_used=0
+        )
+    
+    def _offline_response(self, start_time: float) -> LLMResponse:
+        """Fallback response if LLM is not available"""
+        return LLMResponse(
+            response="Local medical AI is not available. Please consult with a healthcare professional for medical advice.",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            model_used="offline_fallback",
+            tokens_used=0
+        )
+    
+    def _connection_error_response(self, start_time: float) -> LLMResponse:
+        return LLMResponse(
+            response="Connection to local medical AI failed. Please ensure Ollama is running and try again.",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            model_used="connection_error",
+            tokens_used=0
+        )
+    
+    def _exception_response(self, error: Exception, start_time: float) -> LLMResponse:
+        return LLMResponse(
+            response=f"An error occurred while processing your request: {str(error)}. Please consult with a healthcare professional.",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            model_used="error",
+            tokens_used=0
+        )
+    
+    def _get_async_client(self):
+        """Shared pooled AsyncClient (created on first use, inside the running loop)"""
+        if httpx is None:
+            raise RuntimeError("The asyncio daemon needs httpx (pip install httpx)")
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
             )
-            
+        return self._async_client
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    async def acheck_connection(self) -> bool:
+        """Async variant of check_connection"""
+        return await self.arefresh_health()
+    
+    async def alist_available_models(self) -> List[str]:
+        """Async variant of list_available_models"""
+        try:
+            response = await self._get_async_client().get("/api/tags", timeout=5)
             if response.status_code == 200:
-                result = response.json()
-                processing_time = time.time() - start_time
-                
-                # Estimate token count (rough approximation)
-                tokens_used = len(result.get("response", "").split())
-                
-                # Calculate confidence based on response quality metrics
-                confidence = self._calculate_confidence(result, processing_time)
-                
-                return LLMResponse(
-                    response=result.get("response", ""),
-                    confidence=confidence,
-                    processing_time=processing_time,
-                    model_used=result.get("model", self.model),
-                    tokens_used=tokens_used
-                )
-            else:
-                # Handle error response
-                error_msg = f"LLM request failed with status {response.status_code}"
-                return LLMResponse(
-                    response=f"Error: {error_msg}. Please consult with a healthcare professional.",
-                    confidence=0.1,
-                    processing_time=time.time() - start_time,
-                    model_used=self.model,
-                    tokens_used=0
-                )
-                
-        except requests.exceptions.ConnectionError:
-            # Handle connection error
-            return LLMResponse(
-                response="Connection to local medical AI failed. Please ensure Ollama is running and try again.",
-                confidence=0.0,
-                processing_time=time.time() - start_time,
-                model_used="connection_error",
-                tokens_used=0
-            )
-        except Exception as e:
-            # Handle other exceptions
-            return LLMResponse(
-                response=f"An error occurred while processing your request: {str(e)}. Please consult with a healthcare professional.",
-                confidence=0.0,
-                processing_time=time.time() - start_time,
-                model_used="error",
-                tokens_used=0
-            )
+                return [model['name'] for model in response.json().get('models', [])]
+            return []
+        except Exception:
+            return []
     
     def _calculate_confidence(self, result: Dict, processing_time: float) -> float:
         """
@@ -350,75 +579,111 @@ class LocalMedicalLLM:
         """
         Generate a response based on an image using a multimodal local model (Gemma 3)
         """
-        import base64
-        
         start_time = time.time()
         
         # Ensure we use a vision model
-        vision_model = getattr(self, "vision_model", "gemma3:4b")
-        if not self.check_model_availability(vision_model):
-             # Try to see if current model is vision capable (e.g. if we fell back to gemma3)
-             if "gemma3" in self.model or "llava" in self.model:
-                 vision_model = self.model
-             else:
-                 return LLMResponse(
-                    response=f"Vision model ({vision_model}) not found locally. Please run 'ollama pull {vision_model}'",
-                    confidence=0.0,
-                    processing_time=0.0,
-                    model_used="none",
-                    tokens_used=0
-                )
+        vision_model = self._resolve_vision_model(self.list_available_models())
+        if vision_model is None:
+            return self._missing_vision_response()
 
         try:
             with open(image_path, "rb") as img_file:
-                base64_image = base64.b64encode(img_file.read()).decode('utf-8')
-                
-            # Ollama API Format for Multimodal
-            payload = {
-                "model": vision_model,
-                "prompt": prompt,
-                "images": [base64_image],
-                "stream": False,
-                "options": {
-                    "temperature": 0.2, # Low temp for accurate OCR
-                    "num_ctx": 4096     # Ensure context fits
-                }
-            }
+                payload = self._vision_payload(vision_model, prompt, img_file.read())
             
             response = requests.post(
                 f"{self.host}/api/generate",
                 json=payload,
-                timeout=120 # Vision can take longer (Initial Load)
+                timeout=self.vision_timeout
             )
-
-            if response.status_code == 200:
-                result = response.json()
-                processing_time = time.time() - start_time
-                confidence = self._calculate_confidence(result, processing_time)
-                
-                return LLMResponse(
-                    response=result.get("response", ""),
-                    confidence=confidence,
-                    processing_time=processing_time,
-                    model_used=vision_model,
-                    tokens_used=len(result.get("response", "").split())
-                )
-            else:
-                 return LLMResponse(
-                    response=f"Vision analysis failed: {response.text}",
-                    confidence=0.0,
-                    processing_time=time.time() - start_time,
-                    model_used=vision_model,
-                    tokens_used=0
-                )
+            return self._vision_response(response.status_code, response.json() if response.status_code == 200 else None,
+                                         response.text, start_time, vision_model)
         except Exception as e:
+            return self._vision_error_response(e, start_time)
+    
+    async def agenerate_image_response(self, image_path: str, prompt: str) -> LLMResponse:
+        """Async variant of generate_image_response"""
+        start_time = time.time()
+        
+        vision_model = self._resolve_vision_model(await self.alist_available_models())
+        if vision_model is None:
+            return self._missing_vision_response()
+        
+        try:
+            def read_image() -> bytes:
+                with open(image_path, "rb") as img_file:
+                    return img_file.read()
+            
+            payload = self._vision_payload(vision_model, prompt, await asyncio.to_thread(read_image))
+            response = await self._get_async_client().post("/api/generate", json=payload, timeout=self.vision_timeout)
+            return self._vision_response(response.status_code, response.json() if response.status_code == 200 else None,
+                                         response.text, start_time, vision_model)
+        except Exception as e:
+            return self._vision_error_response(e, start_time)
+    
+    def _resolve_vision_model(self, available_models: List[str]) -> Optional[str]:
+        """Pick the vision model, or None when no vision-capable model is installed"""
+        vision_model = getattr(self, "vision_model", "gemma3:4b")
+        if vision_model in available_models:
+            return vision_model
+        # Try to see if current model is vision capable (e.g. if we fell back to gemma3)
+        if "gemma3" in self.model or "llava" in self.model:
+            return self.model
+        return None
+    
+    def _missing_vision_response(self) -> LLMResponse:
+        vision_model = getattr(self, "vision_model", "gemma3:4b")
+        return LLMResponse(
+            response=f"Vision model ({vision_model}) not found locally. Please run 'ollama pull {vision_model}'",
+            confidence=0.0,
+            processing_time=0.0,
+            model_used="none",
+            tokens_used=0
+        )
+    
+    @staticmethod
+    def _vision_payload(vision_model: str, prompt: str, image_bytes: bytes) -> Dict:
+        """Ollama API Format for Multimodal"""
+        return {
+            "model": vision_model,
+            "prompt": prompt,
+            "images": [base64.b64encode(image_bytes).decode('utf-8')],
+            "stream": False,
+            "options": {
+                "temperature": 0.2, # Low temp for accurate OCR
+                "num_ctx": 4096     # Ensure context fits
+            }
+        }
+    
+    def _vision_response(self, status_code: int, result: Optional[Dict], text: str,
+                         start_time: float, vision_model: str) -> LLMResponse:
+        if status_code == 200:
+            processing_time = time.time() - start_time
+            confidence = self._calculate_confidence(result, processing_time)
+            
             return LLMResponse(
-                response=f"Error processing image: {str(e)}",
-                confidence=0.0,
-                processing_time=time.time() - start_time,
-                model_used="error",
-                tokens_used=0
+                response=result.get("response", ""),
+                confidence=confidence,
+                processing_time=processing_time,
+                model_used=vision_model,
+                tokens_used=len(result.get("response", "").split())
             )
+        return LLMResponse(
+            response=f"Vision analysis failed: {text}",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            model_used=vision_model,
+            tokens_used=0
+        )
+    
+    @staticmethod
+    def _vision_error_response(error: Exception, start_time: float) -> LLMResponse:
+        return LLMResponse(
+            response=f"Error processing image: {str(error)}",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            model_used="error",
+            tokens_used=0
+        )
 
 # Example usage
 if __name__ == "__main__":
@@ -15,18 +15,25 @@ import logging
 logging.getLogger('tensorflow').setLevel(logging.FATAL)
 
 import time
+import math
 import json
+import heapq
+import hashlib
+import itertools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterable
 import argparse
-from transformers import pipeline, logging as hf_logging
-import torch
+import shutil
+import stat
+import subprocess
 import warnings
 import asyncio # Fix missing import
 
-# Configure HF Logging - Set to ERROR to hide massive config JSON dumps now that it works
-hf_logging.set_verbosity_error()
+# transformers and torch take seconds to import and only the lazy HF pipelines need them (see hf_pipeline)
 warnings.filterwarnings("ignore", category=UserWarning) # Keep actual warnings but suppress minor ones
 
 # Add the current directory to Python path for absolute imports
@@ -37,20 +44,167 @@ try:
     from inference.optimized_medicine_analyzer import OptimizedMedicineAnalyzer, MedicineInfo
     from local_llm_integration import LocalMedicalLLM, LLMResponse
     from medical_agents import MedicalAgentOrchestrator, PatientContext, MedicalAgentResponse, MedicalSpecialty
-    from caching_system import cache_manager, cache_memoize, LRUCache
+    from caching_system import cache_manager, cache_memoize, LRUCache, make_cache_key, fingerprint, LatencyRecorder
+    from daemon_protocol import (encode_frame, read_frame, read_frame_sync, ProtocolError, MessageError,
+                                 LINE_PROTOCOL, available_protocols, choose_protocol)
 except ImportError as e:
-    print(f"Import error: {e}")
-    print("Attempting alternative import paths...")
+    # stdout carries daemon responses; diagnostics go to the log (stderr)
+    logging.getLogger(__name__).warning(f"Import error: {e}; attempting alternative import paths")
     # Fallback imports for development
     from ai_ml_engine.inference.optimized_medicine_analyzer import OptimizedMedicineAnalyzer, MedicineInfo
     from ai_ml_engine.local_llm_integration import LocalMedicalLLM, LLMResponse
     from ai_ml_engine.medical_agents import MedicalAgentOrchestrator, PatientContext, MedicalAgentResponse, MedicalSpecialty
-    from ai_ml_engine.caching_system import cache_manager, cache_memoize, LRUCache
+    from ai_ml_engine.caching_system import (cache_manager, cache_memoize, LRUCache, make_cache_key, fingerprint,
+                                             LatencyRecorder)
+    from ai_ml_engine.daemon_protocol import (encode_frame, read_frame, read_frame_sync, ProtocolError, MessageError,
+                                              LINE_PROTOCOL, available_protocols, choose_protocol)
+
+# The registry must be one module object per process: the package's copy when
+# imported as ai_ml_engine.medical_ai_core, the top-level one when run as a script
+try:
+    from .model_registry import model_registry, ModelLoadError
+except ImportError:
+    from model_registry import model_registry, ModelLoadError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_WARMUP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'warmup_queries.json')
+DEFAULT_IMAGE_PROMPT = 'Identify this medicine.'
+DEFAULT_SERVER_HOST = '127.0.0.1'
+DEFAULT_SERVER_PORT = 8765
+DEFAULT_SEMANTIC_AUDIT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'semantic_cache_audit.jsonl')
+
+# Daemon worker pool: Ollama serves one generation at a time by default, and
+# vision calls can take minutes, so LLM-bound actions get few slots
+DEFAULT_DAEMON_WORKERS = 8
+DEFAULT_ACTION_CONCURRENCY = {
+    'analyze_medicine_image': 1,
+    'get_medical_advice': 2,
+    'process_voice_command': 2,
+    'analyze_patient_case': 2,
+    'analyze_medicine_text': 4,
+    'get_system_status': 2,
+    'batch': 2
+}
+MAX_BATCH_SIZE = 100
+DEFAULT_MAX_QUEUE = 64  # Requests waiting for a slot before new ones are shed
+
+# Scheduling priorities (lower runs first) and the default per action; unlisted actions are 'normal'
+PRIORITY_LEVELS = {'emergency': 0, 'high': 1, 'normal': 2, 'low': 3}
+DEFAULT_ACTION_PRIORITY = {
+    'process_voice_command': 'high',  # Visually impaired users are waiting on speech
+    'analyze_medicine_image': 'low',
+    'batch': 'low'
+}
+PRIORITY_AGING_SECONDS = 5.0  # A waiting request gains one level per this many seconds
+
+EMERGENCY_SYMPTOMS = [
+    'chest pain', 'difficulty breathing', 'severe headache', 'loss of consciousness',
+    'severe abdominal pain', 'stroke symptoms', 'seizures', 'severe allergic reaction'
+]
+DEFAULT_BATCH_WORKERS = 4  # Items of one batch processed in parallel
+
+# Hugging Face pipelines: name -> (task, model, extra pipeline kwargs); instances live in model_registry
+PIPELINE_SPECS = {
+    'ner': ('ner', 'dslim/bert-base-NER', {'grouped_entities': True}),
+    'qa': ('question-answering', 'deepset/roberta-base-squad2', {}),
+    'summarizer': ('summarization', 'facebook/bart-large-cnn', {})
+}
+# eager: load before the daemon reports ready; background: load after ready; on-demand: on first use
+PRELOAD_POLICIES = ('eager', 'background', 'on-demand')
+DEFAULT_PRELOAD_POLICY = 'on-demand'
+
+# Daemon responses and notifications may come from several threads
+_stdout_lock = threading.Lock()
+
+_stdout_protocol = LINE_PROTOCOL
+_stdout = None  # Private handle on the real stdout once claim_stdout() ran; sys.stdout until then
+
+def claim_stdout() -> None:
+    """
+    Reserve the process's stdout for daemon messages
+    
+    A stray print() (ours, a library's, or native code writing to fd 1)
+    would corrupt a framed stream for good, so messages go to a duplicate
+    of the original stdout descriptor and both sys.stdout and fd 1 are
+    pointed at stderr.
+    """
+    global _stdout
+    with _stdout_lock:
+        if _stdout is not None:
+            return
+        sys.stdout.flush()
+        try:
+            fd = os.dup(sys.stdout.fileno())
+            os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+            _stdout = os.fdopen(fd, 'w', encoding='utf-8', newline='\n')
+        except (AttributeError, OSError, ValueError):
+            _stdout = sys.stdout  # No real descriptor (e.g. replaced in tests): swap the objects only
+        sys.stdout = sys.stderr
+
+def _write_stdout(message: Dict[str, Any]) -> None:
+    """Write in the negotiated protocol (caller holds _stdout_lock)"""
+    out = _stdout or sys.stdout
+    if _stdout_protocol == LINE_PROTOCOL:
+        out.write(json.dumps(message) + '\n')
+        out.flush()
+    else:
+        out.buffer.write(encode_frame(message, _stdout_protocol))
+        out.buffer.flush()
+
+def emit(message: Dict[str, Any]) -> None:
+    """Write one message to stdout for the Node.js side (a JSON line unless a framed protocol was negotiated)"""
+    with _stdout_lock:
+        _write_stdout(message)
+
+def switch_stdout_protocol(protocol: str) -> None:
+    """Acknowledge a hello in the current protocol, then write everything after it in the new one"""
+    global _stdout_protocol
+    with _stdout_lock:
+        _write_stdout({"type": "protocol", "protocol": protocol})
+        _stdout_protocol = protocol
+
+
+def hf_pipeline(task: str, **kwargs):
+    """Build a transformers pipeline, importing transformers (and torch) on first use"""
+    from transformers import pipeline, logging as hf_logging
+    # Configure HF Logging - Set to ERROR to hide massive config JSON dumps now that it works
+    hf_logging.set_verbosity_error()
+    return pipeline(task, **kwargs)
+
+def probe_gpu() -> str:
+    """
+    Describe the NVIDIA GPU without importing torch
+    
+    Uses torch only if something already imported it; otherwise asks
+    nvidia-smi for the device name and memory.
+    """
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        vram_gb = torch.cuda.get_device_properties(0).total_memory / 1e9
+        return f"DETECTED ({torch.cuda.get_device_name(0)} - {vram_gb:.1f}GB VRAM)"
+    
+    nvidia_smi = shutil.which('nvidia-smi')
+    if not nvidia_smi:
+        return "NOT DETECTED"
+    try:
+        output = subprocess.run(
+            [nvidia_smi, '--query-gpu=name,memory.total', '--format=csv,noheader,nounits'],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip().splitlines()
+        name, memory_mib = (part.strip() for part in output[0].split(','))
+        return f"DETECTED ({name} - {float(memory_mib) / 1024:.1f}GB VRAM)"
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        return "DETECTED (NVIDIA Generic)"
+
+def has_emergency_symptoms(symptoms: List[str]) -> bool:
+    """True if any symptom mentions an emergency indicator (see EMERGENCY_SYMPTOMS)"""
+    return any(
+        isinstance(symptom, str) and any(emergency in symptom.lower() for emergency in EMERGENCY_SYMPTOMS)
+        for symptom in symptoms
+    )
 
 @dataclass
 class MedicalAnalysisResult:
@@ -72,53 +226,118 @@ class MedicalAICore:
     Core medical AI system that integrates all components seamlessly
     """
     
-    def __init__(self):
+    def __init__(self, preload_policy: str = DEFAULT_PRELOAD_POLICY,
+                 preload_pipelines: Optional[Iterable[str]] = None):
+        """
+        Args:
+            preload_policy: When the Hugging Face pipelines load (see PRELOAD_POLICIES);
+                'eager' loads them here, 'background' via start_pipeline_preload()
+            preload_pipelines: Names from PIPELINE_SPECS to preload (default: all)
+        """
+        if preload_policy not in PRELOAD_POLICIES:
+            raise ValueError(f"Unknown preload policy {preload_policy!r}; expected one of {PRELOAD_POLICIES}")
         # Initialize all components
         self.medicine_analyzer = OptimizedMedicineAnalyzer()
         self.local_llm = LocalMedicalLLM()
         self.agent_orchestrator = MedicalAgentOrchestrator()
         self.cache_manager = cache_manager
         
-        # Lazy load Hugging Face Pipelines only when needed
-        self.qa_pipeline = None
-        self.nlp_pipeline = None
-        self.summarizer = None
-        # self._initialize_transformer_models() # Removed to prevent 10s startup delay
+        # Hugging Face Pipelines load per preload_policy into the process-wide model registry
+        self.model_registry = model_registry
+        self.preload_policy = preload_policy
+        self.preload_pipelines = list(PIPELINE_SPECS if preload_pipelines is None else preload_pipelines)
+        unknown = set(self.preload_pipelines) - set(PIPELINE_SPECS)
+        if unknown:
+            raise ValueError(f"Unknown pipelines {sorted(unknown)}; expected names from {list(PIPELINE_SPECS)}")
         
-        # Check system availability
-        self.llm_available = self.local_llm.check_connection()
+        # Ollama is probed in the background (daemon modes) or on first use, never here
         self.system_initialized = True
+        self.warmup_status = {'status': 'not_started'}
+        self.semantic_cache = None  # Opt-in, see enable_semantic_cache()
+        self.gpu_status = None  # See check_gpu_availability()
+        self.dispatcher = None  # Set in daemon mode
+        self.server = None  # Set in server mode
+        self.batch_executor = ThreadPoolExecutor(max_workers=DEFAULT_BATCH_WORKERS, thread_name_prefix="batch")
+        
+        if preload_policy == 'eager':
+            self.load_pipelines()
         
         logger.info("Medical AI Core system initialized successfully")
 
+    @property
+    def llm_available(self) -> bool:
+        """Cached Ollama availability, kept current by the LLM health monitor"""
+        return self.local_llm.connected
+
+    def enable_semantic_cache(self, threshold: float = 0.85,
+                              audit_log_path: Optional[str] = DEFAULT_SEMANTIC_AUDIT_LOG):
+        """
+        Serve cached advice for near-duplicate questions, not just identical ones
+        
+        Args:
+            threshold: Minimum cosine similarity between questions
+            audit_log_path: JSON-lines file receiving every semantic hit for false-hit review
+        """
+        # NumPy is only needed when the semantic layer is switched on
+        try:
+            from semantic_cache import SemanticCache
+        except ImportError:
+            from ai_ml_engine.semantic_cache import SemanticCache
+        
+        if audit_log_path:
+            os.makedirs(os.path.dirname(audit_log_path), exist_ok=True)
+        self.semantic_cache = SemanticCache(
+            threshold=threshold,
+            ttl=self.cache_manager.llm_cache.ttl,
+            # A different medicine name must never reuse an answer
+            protected_terms=self.medicine_analyzer.medical_knowledge_base.keys(),
+            audit_log_path=audit_log_path
+        )
+        logger.info(f"Semantic cache enabled for medical advice (threshold {threshold})")
+    
+    def get_pipeline(self, name: str, pin: bool = False):
+        """
+        Return a Hugging Face pipeline from PIPELINE_SPECS, loading it on first use
+        
+        The instance is shared through model_registry, so every core (and
+        AdvancedMedicalAI) uses the same one, concurrent first callers wait on
+        a single load, and an unpinned pipeline may be evicted under the memory
+        ceiling and reloaded here later. A failed load is logged and returns
+        None; until its backoff passes (see ModelRegistry) callers get None
+        without another attempt.
+        """
+        task, model, kwargs = PIPELINE_SPECS[name]
+        try:
+            return self.model_registry.get(model, lambda: hf_pipeline(task, model=model, **kwargs), pin=pin)
+        except ModelLoadError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to load {name} pipeline: {e}")
+            return None
+    
+    def load_pipelines(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Load and pin pipelines now (default: preload_pipelines); returns get_pipeline_status()"""
+        for name in self.preload_pipelines if names is None else names:
+            self.get_pipeline(name, pin=True)  # Preloaded models must not be evicted
+        return self.get_pipeline_status()
+    
+    def get_pipeline_status(self) -> Dict[str, Any]:
+        """Preload policy and the load state of every pipeline"""
+        pipelines = {
+            name: {'model': model, **self.model_registry.state(model)}
+            for name, (_, model, _) in PIPELINE_SPECS.items()
+        }
+        return {'policy': self.preload_policy, 'preload': list(self.preload_pipelines), 'pipelines': pipelines}
+
     def get_nlp_pipeline(self):
         """Lazy load NER pipeline"""
-        if not self.nlp_pipeline:
-             try:
-                logger.info("Loading BERT NER model (Lazy Load)...")
-                self.nlp_pipeline = pipeline("ner", model="dslim/bert-base-NER", grouped_entities=True)
-             except Exception as e:
-                logger.warning(f"Failed to load NER: {e}")
-        return self.nlp_pipeline
+        return self.get_pipeline('ner')
 
     def get_qa_pipeline(self):
-        if not self.qa_pipeline:
-             try:
-                logger.info("Loading RoBERTa QA model (Lazy Load)...")
-                self.qa_pipeline = pipeline("question-answering", model="deepset/roberta-base-squad2")
-             except: pass
-        return self.qa_pipeline
+        return self.get_pipeline('qa')
 
     def get_summarizer(self):
-        if not self.summarizer:
-             try:
-                logger.info("Loading BART Summarizer (Lazy Load)...")
-                self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-             except: pass
-        return self.summarizer
-
-    # def _initialize_transformer_models(self): # Deprecated
-    #     """Initialize local Transformer models for NLP tasks"""
+        return self.get_pipeline('summarizer')
     
     def process_voice_command_intent(self, command: str, user_id: str) -> Dict[str, Any]:
         """
@@ -144,6 +363,13 @@ class MedicalAICore:
             "action": "chat",
             "response": advice
         }
+    
+    async def aprocess_voice_command_intent(self, command: str, user_id: str) -> Dict[str, Any]:
+        """Async variant of process_voice_command_intent"""
+        return {
+            "action": "chat",
+            "response": await self.aget_medical_advice(command)
+        }
 
     def _extract_entity(self, text: str, entity_type: str) -> Optional[str]:
         """Try BERT NER first, then fallback to heuristics"""
@@ -182,14 +408,20 @@ class MedicalAICore:
         Returns:
             Comprehensive medical analysis result
         """
-        start_time = time.time()
+        # Identical concurrent cases share one analysis (single-flight)
+        cache_key = make_cache_key("case_analysis", patient_id, symptoms, patient_context)
         
-        # Check cache first for identical cases
-        cache_key = f"case_analysis:{patient_id}:{hash(str(symptoms) + str(patient_context.__dict__))}"
-        cached_result = self.cache_manager.get_cached_agent_response(cache_key)
-        if cached_result:
-            logger.info(f"Retrieved cached analysis for patient {patient_id}")
-            return cached_result
+        async def analyze():
+            return self._analyze_patient_case_uncached(patient_id, symptoms, patient_context)
+        
+        return await self.cache_manager.aget_or_compute(cache_key, analyze, cache='agent')
+    
+    def _analyze_patient_case_uncached(self,
+                                       patient_id: str,
+                                       symptoms: List[str],
+                                       patient_context: PatientContext) -> MedicalAnalysisResult:
+        """Run the full agent pipeline for a case (no cache lookup)"""
+        start_time = time.time()
         
         # Step 1: Process through agent orchestrator
         agent_results = self.agent_orchestrator.process_patient_input(symptoms, patient_context)
@@ -228,9 +460,6 @@ class MedicalAICore:
             timestamp=datetime.now()
         )
         
-        # Cache the result
-        self.cache_manager.cache_agent_response(cache_key, result)
-        
         logger.info(f"Completed analysis for patient {patient_id} in {processing_time:.2f}s")
         return result
     
@@ -245,7 +474,7 @@ class MedicalAICore:
             Detailed medicine information
         """
         # Check cache first
-        cache_key = f"medicine_image:{hash(image_path)}"
+        cache_key = make_cache_key("medicine_image", image_path)
         cached_result = self.cache_manager.get_cached_ocr_result(cache_key)
         if cached_result:
             logger.info(f"Retrieved cached medicine analysis for {image_path}")
@@ -263,76 +492,221 @@ class MedicalAICore:
         
         return medicine_info
     
-    def analyze_medicine_from_text(self, text: str) -> MedicineInfo:
+    def analyze_medicine_image_llm(self, image_path: str, prompt: str = DEFAULT_IMAGE_PROMPT) -> LLMResponse:
         """
-        Analyze medicine information from text
+        Identify a medicine image with the local vision model, cached by image content
+        
+        Args:
+            image_path: Path to medicine image
+            prompt: Instruction for the vision model
+            
+        Returns:
+            Vision model response
         """
-        # Check cache first
-        cache_key = f"medicine_text:{hash(text)}"
-        cached_result = self.cache_manager.get_cached_medicine_info(cache_key)
+        with open(image_path, 'rb') as f:
+            image_digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        cache_key = make_cache_key("medicine_image_llm", image_digest, prompt)
+        cached_result = self.cache_manager.get_cached_ocr_result(cache_key)
         if cached_result:
-            logger.info("Retrieved cached medicine analysis from text")
+            logger.info(f"Retrieved cached image analysis for {image_path}")
             return cached_result
         
-        # 1. Try Optimized Analyzer (Regex + Knowledge Base)
-        medicine_info = self.medicine_analyzer.analyze_medicine_from_text(text)
+        llm_response = self.local_llm.generate_image_response(image_path, prompt)
+        # Zero confidence means the vision model was missing or failed; retry next time
+        if llm_response.confidence > 0:
+            self.cache_manager.cache_ocr_result(cache_key, llm_response)
+        return llm_response
+    
+    async def aanalyze_medicine_image_llm(self, image_path: str, prompt: str = DEFAULT_IMAGE_PROMPT) -> LLMResponse:
+        """Async variant of analyze_medicine_image_llm"""
+        def digest() -> str:
+            with open(image_path, 'rb') as f:
+                return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
         
-        # 2. LLM Fallback: ALWAYS ENGAGE if text looks like a Multi-Angle Scan (contains "[Angle") or if confidence is low.
-        # The user specifically requested "Doctor-like" behavior for tricky images, so we prioritize the LLM's reasoning.
-        is_multi_angle = "[Angle" in text
+        cache_key = make_cache_key("medicine_image_llm", await asyncio.to_thread(digest), prompt)
+        cached_result = self.cache_manager.get_cached_ocr_result(cache_key)
+        if cached_result:
+            logger.info(f"Retrieved cached image analysis for {image_path}")
+            return cached_result
         
-        if (medicine_info.name == "Unknown Medicine" or medicine_info.confidence_score < 0.7 or is_multi_angle) and self.llm_available:
-            logger.info("Engaging Local LLM for Deep Multi-Angle Analysis...")
-            
-            prompt = f"""
-            I have scanned a medicine strip from 4 different angles to capture all text.
-            Here is the combined noisy OCR text:
-            
-            "{text}"
-            
-            Your Task:
-            1. Look through the noise in all angles.
-            2. Identify the MEDICINE NAME (Brand or Generic). Look for patterns like "Metformin", "Paracetamol", etc.
-            3. Identify the DOSAGE (e.g., 500mg, 10mg). Ignore realistic-looking typos (like '5000mg') if they seem impossible, assume standard dosages.
-            4. Reconstruct the likely true information.
-            
-            Return ONLY a valid JSON object with:
-            {{
-                "name": "Identified Name",
-                "uses": ["Use 1", "Use 2"],
-                "side_effects": ["Side Effect 1"],
-                "dosage": "Standard Dosage",
-                "warnings": ["Warning 1"]
-            }}
-            """
-            
-            llm_response = self.local_llm.generate_medical_response(prompt)
+        llm_response = await self.local_llm.agenerate_image_response(image_path, prompt)
+        if llm_response.confidence > 0:
+            self.cache_manager.cache_ocr_result(cache_key, llm_response)
+        return llm_response
+    
+    def warm_up_caches(self, config_path: Optional[str] = DEFAULT_WARMUP_FILE,
+                       llm_limit: int = 0) -> Dict[str, Any]:
+        """
+        Pre-populate the medicine cache under the keys analyze_medicine_text reads
+        
+        Sources are every medicine in the analyzer's knowledge base plus the
+        frequent medicine texts, advice questions and medicine images listed in
+        the warm-up file. By default only texts the local analyzer recognizes
+        confidently are warmed, so startup puts no load on Ollama. With
+        llm_limit, up to that many LLM calls are spent on uncertain texts,
+        advice questions and images, in that order (none while Ollama is down).
+        
+        Args:
+            config_path: JSON file of frequent queries (None for knowledge base only)
+            llm_limit: Maximum number of LLM calls the warm-up may make
             
-            # Attempt to parse LLM JSON response
+        Returns:
+            Warm-up status with duration, entries warmed per source and LLM calls made
+        """
+        start_time = time.perf_counter()
+        self.warmup_status = {'status': 'running', 'started_at': datetime.now().isoformat()}
+        config = load_warmup_config(config_path)
+        warmed = {'knowledge_base': 0, 'medicine_texts': 0, 'medical_advice': 0, 'medicine_images': 0}
+        llm_budget = llm_limit if self.llm_available else 0
+        errors = 0
+        
+        def warm(source: str, fn, item, uses_llm: bool = False) -> None:
+            nonlocal errors, llm_budget
+            if uses_llm:
+                if llm_budget <= 0:
+                    return
+                llm_budget -= 1
             try:
-                # Find JSON block in response
-                import re
-                json_match = re.search(r'\{.*\}', llm_response.response, re.DOTALL)
-                if json_match:
-                    data = json.loads(json_match.group(0))
-                    
-                    # Update medicine info with LLM intelligence
-                    medicine_info.name = data.get('name', medicine_info.name)
-                    medicine_info.uses = data.get('uses', medicine_info.uses)
-                    medicine_info.side_effects = data.get('side_effects', medicine_info.side_effects)
-                    medicine_info.dosage_instructions = str(data.get('dosage', medicine_info.dosage_instructions))
-                    medicine_info.warnings = data.get('warnings', medicine_info.warnings)
-                    medicine_info.confidence_score = 0.90 # High confidence in LLM reasoning
-                    
-                    logger.info(f"LLM successfully deduced medicine from multi-angle scan: {medicine_info.name}")
+                fn(item)
+                warmed[source] += 1
             except Exception as e:
-                logger.warning(f"Failed to parse LLM JSON fallback: {e}")
+                errors += 1
+                logger.warning(f"Cache warm-up failed for {source} item {item!r}: {e}")
+        
+        def warm_text(source: str, text: str) -> None:
+            info = self.medicine_analyzer.analyze_medicine_from_text(text)
+            if self._is_uncertain(info, text):
+                # The read path would ask the LLM to review this one
+                warm(source, self.analyze_medicine_from_text, text, uses_llm=True)
+            else:
+                warm(source, lambda t: self.cache_manager.get_or_compute(
+                    make_cache_key("medicine_text", t), lambda: info, cache='medicine'), text)
+        
+        for name in self.medicine_analyzer.medical_knowledge_base:
+            warm_text('knowledge_base', name)
+        for text in config.get('medicine_texts', []):
+            warm_text('medicine_texts', text)
+        for query in config.get('medical_advice', []):
+            warm('medical_advice', self.get_medical_advice, query, uses_llm=True)
+        prompt = config.get('image_prompt', DEFAULT_IMAGE_PROMPT)
+        for image_path in config.get('medicine_images', []):
+            warm('medicine_images', lambda path: self.analyze_medicine_image_llm(path, prompt), image_path,
+                 uses_llm=True)
+        
+        self.warmup_status = {
+            'status': 'complete',
+            'duration_ms': round((time.perf_counter() - start_time) * 1000, 1),
+            'entries': warmed,
+            'errors': errors,
+            'llm_calls': (llm_limit if self.llm_available else 0) - llm_budget,
+            'llm_available': self.llm_available,
+            'finished_at': datetime.now().isoformat()
+        }
+        logger.info(f"Cache warm-up finished in {self.warmup_status['duration_ms']}ms: {warmed}")
+        return self.warmup_status
+    
+    def analyze_medicine_from_text(self, text: str) -> MedicineInfo:
+        """
+        Analyze medicine information from text
+        """
+        # Identical concurrent scans share one analysis (single-flight)
+        cache_key = make_cache_key("medicine_text", text)
+        return self.cache_manager.get_or_compute(
+            cache_key, lambda: self._analyze_medicine_text_uncached(text), cache='medicine'
+        )
+    
+    def _analyze_medicine_text_uncached(self, text: str) -> MedicineInfo:
+        """Regex/knowledge-base analysis with LLM fallback (no cache lookup)"""
+        # 1. Try Optimized Analyzer (Regex + Knowledge Base)
+        medicine_info = self.medicine_analyzer.analyze_medicine_from_text(text)
+        
+        if self._needs_llm_review(medicine_info, text):
+            logger.info("Engaging Local LLM for Deep Multi-Angle Analysis...")
+            llm_response = self.local_llm.generate_medical_response(self._medicine_review_prompt(text))
+            self._apply_llm_medicine_review(medicine_info, llm_response)
                 
-        # Cache the result
-        self.cache_manager.cache_medicine_info(cache_key, medicine_info)
+        return medicine_info
+    
+    async def _aanalyze_medicine_text_uncached(self, text: str) -> MedicineInfo:
+        """Async variant of _analyze_medicine_text_uncached"""
+        medicine_info = self.medicine_analyzer.analyze_medicine_from_text(text)
+        await self.local_llm.aensure_probed()
+        
+        if self._needs_llm_review(medicine_info, text):
+            logger.info("Engaging Local LLM for Deep Multi-Angle Analysis...")
+            llm_response = await self.local_llm.agenerate_medical_response(self._medicine_review_prompt(text))
+            self._apply_llm_medicine_review(medicine_info, llm_response)
         
         return medicine_info
     
+    def _needs_llm_review(self, medicine_info: MedicineInfo, text: str) -> bool:
+        """
+        LLM Fallback: ALWAYS ENGAGE if text looks like a Multi-Angle Scan (contains "[Angle") or if confidence is low.
+        The user specifically requested "Doctor-like" behavior for tricky images, so we prioritize the LLM's reasoning.
+        """
+        return self._is_uncertain(medicine_info, text) and self.llm_available
+    
+    @staticmethod
+    def _is_uncertain(medicine_info: MedicineInfo, text: str) -> bool:
+        """True when the local analysis alone should not be trusted (unknown, low confidence or multi-angle)"""
+        is_multi_angle = "[Angle" in text
+        return medicine_info.name == "Unknown Medicine" or medicine_info.confidence_score < 0.7 or is_multi_angle
+    
+    @staticmethod
+    def _medicine_review_prompt(text: str) -> str:
+        """Prompt asking the LLM to reconstruct a medicine from noisy multi-angle OCR text"""
+        return f"""
+        I have scanned a medicine strip from 4 different angles to capture all text.
+        Here is the combined noisy OCR text:
+        
+        "{text}"
+        
+        Your Task:
+        1. Look through the noise in all angles.
+        2. Identify the MEDICINE NAME (Brand or Generic). Look for patterns like "Metformin", "Paracetamol", etc.
+        3. Identify the DOSAGE (e.g., 500mg, 10mg). Ignore realistic-looking typos (like '5000mg') if they seem impossible, assume standard dosages.
+        4. Reconstruct the likely true information.
+        
+        Return ONLY a valid JSON object with:
+        {{
+            "name": "Identified Name",
+            "uses": ["Use 1", "Use 2"],
+            "side_effects": ["Side Effect 1"],
+            "dosage": "Standard Dosage",
+            "warnings": ["Warning 1"]
+        }}
+        """
+    
+    @staticmethod
+    def _apply_llm_medicine_review(medicine_info: MedicineInfo, llm_response: LLMResponse) -> None:
+        """Merge the LLM's JSON reading of a noisy scan into medicine_info"""
+        # Attempt to parse LLM JSON response
+        try:
+            # Find JSON block in response
+            import re
+            json_match = re.search(r'\{.*\}', llm_response.response, re.DOTALL)
+            if json_match:
+                data = json.loads(json_match.group(0))
+                
+                # Update medicine info with LLM intelligence
+                medicine_info.name = data.get('name', medicine_info.name)
+                medicine_info.uses = data.get('uses', medicine_info.uses)
+                medicine_info.side_effects = data.get('side_effects', medicine_info.side_effects)
+                medicine_info.dosage_instructions = str(data.get('dosage', medicine_info.dosage_instructions))
+                medicine_info.warnings = data.get('warnings', medicine_info.warnings)
+                medicine_info.confidence_score = 0.90 # High confidence in LLM reasoning
+                
+                logger.info(f"LLM successfully deduced medicine from multi-angle scan: {medicine_info.name}")
+        except Exception as e:
+            logger.warning(f"Failed to parse LLM JSON fallback: {e}")
+    
+    async def aanalyze_medicine_from_text(self, text: str) -> MedicineInfo:
+        """Async variant of analyze_medicine_from_text"""
+        cache_key = make_cache_key("medicine_text", text)
+        return await self.cache_manager.aget_or_compute(
+            cache_key, lambda: self._aanalyze_medicine_text_uncached(text), cache='medicine'
+        )
+    
     def get_medical_advice(self, query: str, patient_context: PatientContext = None) -> str:
         """
         Get medical advice using local LLM
@@ -347,24 +721,51 @@ class MedicalAICore:
         if not self.llm_available:
             return "Local medical AI is not available. Please consult with a healthcare professional."
         
-        # Check cache first
-        cache_key = f"medical_advice:{hash(query + str(patient_context))}"
-        cached_result = self.cache_manager.get_cached_llm_response(cache_key)
-        if cached_result:
-            logger.info("Retrieved cached medical advice")
-            return cached_result
+        # Identical concurrent questions share one LLM generation (single-flight)
+        cache_key = make_cache_key("medical_advice", query, patient_context)
         
-        # Generate response using local LLM
-        context_str = str(patient_context.__dict__) if patient_context else "No specific patient context provided"
-        response = self.local_llm.generate_medical_response(
-            prompt=query,
-            context=context_str
-        )
+        # Semantic matches never cross patient contexts
+        namespace = fingerprint(patient_context) if patient_context else ""
         
-        # Cache the result
-        self.cache_manager.cache_llm_response(cache_key, response.response)
+        def generate() -> str:
+            if self.semantic_cache is not None:
+                answer = self.semantic_cache.lookup(query, namespace)
+                if answer is not None:
+                    return answer
+            
+            context_str = str(patient_context.__dict__) if patient_context else "No specific patient context provided"
+            response = self.local_llm.generate_medical_response(
+                prompt=query,
+                context=context_str
+            )
+            if self.semantic_cache is not None:
+                self.semantic_cache.insert(query, response.response, namespace)
+            return response.response
         
-        return response.response
+        return self.cache_manager.get_or_compute(cache_key, generate, cache='llm')
+    
+    async def aget_medical_advice(self, query: str, patient_context: PatientContext = None) -> str:
+        """Async variant of get_medical_advice; awaits Ollama instead of blocking a thread"""
+        await self.local_llm.aensure_probed()
+        if not self.llm_available:
+            return "Local medical AI is not available. Please consult with a healthcare professional."
+        
+        cache_key = make_cache_key("medical_advice", query, patient_context)
+        namespace = fingerprint(patient_context) if patient_context else ""
+        
+        async def generate() -> str:
+            if self.semantic_cache is not None:
+                answer = self.semantic_cache.lookup(query, namespace)
+                if answer is not None:
+                    return answer
+            
+            context_str = str(patient_context.__dict__) if patient_context else "No specific patient context provided"
+            response = await self.local_llm.agenerate_medical_response(prompt=query, context=context_str)
+            if self.semantic_cache is not None:
+                self.semantic_cache.insert(query, response.response, namespace)
+            return response.response
+        
+        return await self.cache_manager.aget_or_compute(cache_key, generate, cache='llm')
     
     def _determine_primary_diagnosis(self, agent_results: Dict[str, Any]) -> str:
         """Determine primary diagnosis from agent responses"""
@@ -438,16 +839,9 @@ class MedicalAICore:
                              agent_results: Dict[str, Any], 
                              patient_context: PatientContext) -> str:
         """Assess the urgency level of the case"""
-        # Check for emergency symptoms
-        emergency_symptoms = [
-            'chest pain', 'difficulty breathing', 'severe headache', 'loss of consciousness',
-            'severe abdominal pain', 'stroke symptoms', 'seizures', 'severe allergic reaction'
-        ]
-        
         # Check for emergency indicators in symptoms
-        for symptom in symptoms:
-            if any(emergency in symptom.lower() for emergency in emergency_symptoms):
-                return 'emergent'
+        if has_emergency_symptoms(symptoms):
+            return 'emergent'
         
         # Check agent responses for urgent recommendations
         for specialty, data in agent_results['agent_responses'].items():
@@ -493,52 +887,197 @@ class MedicalAICore:
         return min(1.0, overall_confidence)  # Cap at 1.0
     
     def check_gpu_availability(self) -> str:
-        """Check if NVIDIA GPU is available/detected"""
-        try:
-            # Method 1: Check Torch (Precise Model Name)
-            if torch.cuda.is_available():
-                vram_gb = torch.cuda.get_device_properties(0).total_memory / 1e9
-                return f"DETECTED ({torch.cuda.get_device_name(0)} - {vram_gb:.1f}GB VRAM)"
-
-            # Method 2: Check via nvidia-smi (Generic)
-            import shutil
-            if shutil.which('nvidia-smi'):
-                 return "DETECTED (NVIDIA Generic)"
-            
-            return "NOT DETECTED"
-        except:
-            return "UNKNOWN"
+        """Check if NVIDIA GPU is available/detected (probed once, without importing torch)"""
+        if self.gpu_status is None:
+            try:
+                self.gpu_status = probe_gpu()
+            except Exception:
+                return "UNKNOWN"
+        return self.gpu_status
 
     def get_system_status(self) -> Dict[str, Any]:
         """Get comprehensive system status and statistics"""
         # Get System Status - User Requested Clean Output (Only Active Models)
-        active_text_model = self.local_llm.model if hasattr(self.local_llm, 'model') else 'Unknown'
-        active_vision_model = getattr(self.local_llm, 'vision_model', 'None')
+        llm_available = self.llm_available
+        llm_health = self.local_llm.health_status()  # Cached; no Ollama round trip per status call
         gpu_status = self.check_gpu_availability()
 
         return {
             'system_initialized': self.system_initialized,
-            'llm_available': self.llm_available,
+            'llm_available': llm_available,
+            'llm_health': llm_health,
             'gpu_status': gpu_status,
             'component_health': {
                 'medicine_analyzer': True,
                 'agent_orchestrator': True
             },
             'model_details': {
-                'active_llm': active_text_model,
-                'active_vision': active_vision_model,
-                'available_models': self.local_llm.list_available_models(),
+                'active_llm': llm_health['model'],
+                'active_vision': llm_health['vision_model'],
+                'available_models': llm_health['available_models'],
                 'ner': 'dslim/bert-base-NER',
                 'qa': 'deepset/roberta-base-squad2',
                 'summarizer': 'facebook/bart-large-cnn'
             },
             'cache_statistics': self.cache_manager.get_stats(),
+            'cache_warmup': dict(self.warmup_status),
+            'pipelines': self.get_pipeline_status(),
+            'model_registry': self.model_registry.get_stats(),
+            'semantic_cache': self.semantic_cache.get_stats() if self.semantic_cache else None,
+            'daemon': self.dispatcher.get_stats() if self.dispatcher else None,
+            'server': self.server.get_stats() if self.server else None,
             'timestamp': datetime.now().isoformat()
         }
 
 
-def process_request(ai_core: MedicalAICore, input_params: Dict[str, Any]) -> Dict[str, Any]:
-    """Unified request processor"""
+def _medicine_info_result(medicine_info: MedicineInfo) -> Dict[str, Any]:
+    return {
+        'name': medicine_info.name,
+        'uses': medicine_info.uses,
+        'dosage_instructions': medicine_info.dosage_instructions,
+        'side_effects': medicine_info.side_effects,
+        'warnings': medicine_info.warnings,
+        'confidence_score': medicine_info.confidence_score
+    }
+
+def _image_result(llm_response: LLMResponse) -> Dict[str, Any]:
+    return {
+        'raw_response': llm_response.response,
+        'confidence': llm_response.confidence,
+        'model': llm_response.model_used
+    }
+
+def _case_result(result: MedicalAnalysisResult) -> Dict[str, Any]:
+    return {
+        'patient_id': result.patient_id,
+        'symptoms': result.symptoms,
+        'primary_diagnosis': result.primary_diagnosis,
+        'differential_diagnoses': result.differential_diagnoses,
+        'treatment_recommendations': result.treatment_recommendations,
+        'urgency_level': result.urgency_level,
+        'confidence_score': result.confidence_score,
+        'processing_time': result.processing_time,
+        'timestamp': result.timestamp.isoformat()
+    }
+
+def _system_status_result(ai_core: MedicalAICore, input_params: Dict[str, Any]) -> Dict[str, Any]:
+    if input_params.get('format') == 'prometheus':
+        # Text exposition for scrapers; the Node side can serve it verbatim at /metrics
+        return {
+            'content_type': 'text/plain; version=0.0.4',
+            'metrics': ai_core.cache_manager.export_prometheus()
+        }
+    return ai_core.get_system_status()
+
+def _batch_items(input_params: Dict[str, Any]) -> List[Any]:
+    items = input_params.get('requests')
+    if not isinstance(items, list):
+        raise ValueError("batch needs a 'requests' list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"batch of {len(items)} exceeds the limit of {MAX_BATCH_SIZE}")
+    return items
+
+def _batch_item_error(item: Any) -> Optional[Dict[str, Any]]:
+    """Per-item rejection for items that must not be run"""
+    if not isinstance(item, dict):
+        return {'success': False, 'error': 'Batch item must be an object'}
+    if item.get('action') == 'batch':
+        return {'success': False, 'error': 'Nested batches are not supported'}
+    return None
+
+def _batch_result(results: List[Optional[Dict[str, Any]]], streamed: bool) -> Dict[str, Any]:
+    succeeded = sum(1 for r in results if r and r.get('success'))
+    summary = {'count': len(results), 'succeeded': succeeded, 'failed': len(results) - succeeded}
+    if streamed:
+        summary['streamed'] = True  # Items already went out as batch_item messages
+    else:
+        summary['results'] = results
+    return summary
+
+def _batch_streamer(data: Dict[str, Any], respond) -> Optional[Callable[[int, Dict[str, Any]], None]]:
+    """Per-item callback for batch requests with "stream": true, None otherwise"""
+    if respond is None or data.get('action') != 'batch' or not data.get('stream'):
+        return None
+    request_id = data.get('requestId')
+    
+    def on_item(index: int, response: Dict[str, Any]) -> None:
+        respond({'type': 'batch_item', 'requestId': request_id, 'index': index, **response})
+    return on_item
+
+def run_batch(ai_core: MedicalAICore, items: List[Any],
+              on_item: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+              deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run batch sub-requests in parallel on the core's batch pool
+    
+    In daemon mode each item takes a slot of its action from the dispatcher
+    (see RequestDispatcher.run_nested), so a batch of images still runs one
+    vision call at a time. Items not started by the batch's deadline are
+    answered with 'deadline_exceeded'.
+    
+    Args:
+        ai_core: Core used to process the items
+        items: Sub-requests, each shaped like a normal request ({"action": ..., ...})
+        on_item: Called with (index, response) as each item finishes, for streaming
+        deadline: Monotonic deadline of the batch request, if any
+        
+    Returns:
+        Counts plus, unless streamed, the per-item responses in request order
+    """
+    results = [None] * len(items)
+    dispatcher = ai_core.dispatcher if isinstance(ai_core.dispatcher, RequestDispatcher) else None
+    
+    def run_item(index: int) -> None:
+        item = items[index]
+        response = _batch_item_error(item)
+        if response is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                response = _rejection(item, 'deadline_exceeded')
+            elif dispatcher is not None:
+                response = dispatcher.run_nested(item, deadline)
+            else:
+                response = process_request(ai_core, item)
+        results[index] = response
+        if on_item:
+            on_item(index, response)
+    
+    # map() keeps the pool bounded; errors are per item, so none escape
+    list(ai_core.batch_executor.map(run_item, range(len(items))))
+    return _batch_result(results, streamed=on_item is not None)
+
+async def arun_batch(ai_core: MedicalAICore, items: List[Any],
+                     on_item: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                     deadline: Optional[float] = None, priority: str = 'normal') -> Dict[str, Any]:
+    """
+    asyncio variant of run_batch; at most DEFAULT_BATCH_WORKERS items are in flight
+    
+    Under an AsyncRequestDispatcher, items wait for a slot of their action at
+    the batch's priority and give up when the batch's deadline passes.
+    """
+    results = [None] * len(items)
+    semaphore = asyncio.Semaphore(DEFAULT_BATCH_WORKERS)
+    dispatcher = ai_core.dispatcher if isinstance(ai_core.dispatcher, AsyncRequestDispatcher) else None
+    
+    async def run_item(index: int) -> None:
+        item = items[index]
+        response = _batch_item_error(item)
+        if response is None:
+            async with semaphore:
+                if dispatcher is not None:
+                    response = await dispatcher.run_nested(item, priority, deadline)
+                else:
+                    response = await aprocess_request(ai_core, item)
+        results[index] = response
+        if on_item:
+            on_item(index, response)
+    
+    await asyncio.gather(*(run_item(i) for i in range(len(items))))
+    return _batch_result(results, streamed=on_item is not None)
+
+def process_request(ai_core: MedicalAICore, input_params: Dict[str, Any],
+                    on_item: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                    deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Unified request processor (on_item streams batch results as they finish; deadline bounds batch items)"""
     try:
         action = input_params.get('action', '')
         
@@ -555,27 +1094,16 @@ def process_request(ai_core: MedicalAICore, input_params: Dict[str, Any]) -> Dic
         elif action == 'analyze_medicine_text':
              text = input_params.get('text', '')
              medicine_info = ai_core.analyze_medicine_from_text(text)
-             return {'success': True, 'result': {
-                 'name': medicine_info.name,
-                 'uses': medicine_info.uses,
-                 'dosage_instructions': medicine_info.dosage_instructions,
-                 'side_effects': medicine_info.side_effects,
-                 'warnings': medicine_info.warnings,
-                 'confidence_score': medicine_info.confidence_score
-             }}
+             return {'success': True, 'result': _medicine_info_result(medicine_info)}
 
         elif action == 'analyze_medicine_image':
              image_path = input_params.get('image_path', '')
-             prompt = input_params.get('prompt', 'Identify this medicine.')
+             prompt = input_params.get('prompt', DEFAULT_IMAGE_PROMPT)
              
-             # Use Local Multimodal LLM (Gemma 3)
-             llm_response = ai_core.local_llm.generate_image_response(image_path, prompt)
+             # Use Local Multimodal LLM (Gemma 3); repeat images are served from the OCR cache
+             llm_response = ai_core.analyze_medicine_image_llm(image_path, prompt)
              
-             return {'success': True, 'result': {
-                 'raw_response': llm_response.response,
-                 'confidence': llm_response.confidence,
-                 'model': llm_response.model_used
-             }}
+             return {'success': True, 'result': _image_result(llm_response)}
              
         elif action == 'analyze_patient_case':
              symptoms = input_params.get('symptoms', [])
@@ -591,20 +1119,14 @@ def process_request(ai_core: MedicalAICore, input_params: Dict[str, Any]) -> Dic
                 patient_context=patient_ctx
              ))
              
-             return {'success': True, 'result': {
-                 'patient_id': result.patient_id,
-                 'symptoms': result.symptoms,
-                 'primary_diagnosis': result.primary_diagnosis,
-                 'differential_diagnoses': result.differential_diagnoses,
-                 'treatment_recommendations': result.treatment_recommendations,
-                 'urgency_level': result.urgency_level,
-                 'confidence_score': result.confidence_score,
-                 'processing_time': result.processing_time,
-                 'timestamp': result.timestamp.isoformat()
-             }}
+             return {'success': True, 'result': _case_result(result)}
 
         elif action == 'get_system_status':
-             return {'success': True, 'result': ai_core.get_system_status()}
+             return {'success': True, 'result': _system_status_result(ai_core, input_params)}
+        
+        elif action == 'batch':
+             # e.g. one pharmacy-shelf scan: many analyze_medicine_text items in one round trip
+             return {'success': True, 'result': run_batch(ai_core, _batch_items(input_params), on_item, deadline)}
              
         else:
              return {'success': False, 'error': f'Unknown action: {action}'}
@@ -613,54 +1135,1058 @@ def process_request(ai_core: MedicalAICore, input_params: Dict[str, Any]) -> Dic
         logger.error(f"Processing Error: {e}")
         return {'success': False, 'error': str(e)}
 
-def run_daemon_mode(ai_core: MedicalAICore):
+async def aprocess_request(ai_core: MedicalAICore, input_params: Dict[str, Any],
+                           on_item: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                           deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Unified request processor for the asyncio daemon; LLM calls are awaited, not blocking"""
+    try:
+        await ai_core.local_llm.aensure_probed()
+        action = input_params.get('action', '')
+        
+        if action == 'process_voice_command':
+            command = input_params.get('command', '')
+            user_id = input_params.get('user_id', 'unknown')
+            result = await ai_core.aprocess_voice_command_intent(command, user_id)
+            return {'success': True, 'result': result}
+        
+        elif action == 'get_medical_advice':
+            query = input_params.get('query', '')
+            return {'success': True, 'result': {'response': await ai_core.aget_medical_advice(query), 'query': query}}
+        
+        elif action == 'analyze_medicine_text':
+            medicine_info = await ai_core.aanalyze_medicine_from_text(input_params.get('text', ''))
+            return {'success': True, 'result': _medicine_info_result(medicine_info)}
+        
+        elif action == 'analyze_medicine_image':
+            llm_response = await ai_core.aanalyze_medicine_image_llm(
+                input_params.get('image_path', ''), input_params.get('prompt', DEFAULT_IMAGE_PROMPT)
+            )
+            return {'success': True, 'result': _image_result(llm_response)}
+        
+        elif action == 'analyze_patient_case':
+            patient_context_data = input_params.get('patient_context', {})
+            result = await ai_core.analyze_patient_case(
+                patient_id=patient_context_data.get('patient_id', 'unknown'),
+                symptoms=input_params.get('symptoms', []),
+                patient_context=PatientContext(**patient_context_data)
+            )
+            return {'success': True, 'result': _case_result(result)}
+        
+        elif action == 'get_system_status':
+            # Ollama health is cached by the monitor, but the first call runs nvidia-smi and the
+            # latency percentiles are sorted in Python; keep both off the event loop
+            result = await asyncio.to_thread(_system_status_result, ai_core, input_params)
+            return {'success': True, 'result': result}
+        
+        elif action == 'batch':
+            return {'success': True, 'result': await arun_batch(ai_core, _batch_items(input_params), on_item,
+                                                                deadline, request_priority(input_params))}
+        
+        else:
+            return {'success': False, 'error': f'Unknown action: {action}'}
+    
+    except Exception as e:
+        logger.error(f"Processing Error: {e}")
+        return {'success': False, 'error': str(e)}
+
+def load_warmup_config(path: Optional[str]) -> Dict[str, Any]:
+    """
+    Load the frequent-queries warm-up file
+    
+    Relative image paths are resolved against the file's directory. A missing
+    or unreadable file yields an empty config (knowledge base warm-up only).
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read warm-up file {path}: {e}")
+        return {}
+    
+    base_dir = os.path.dirname(os.path.abspath(path))
+    config['medicine_images'] = [
+        os.path.normpath(os.path.join(base_dir, image)) for image in config.get('medicine_images', [])
+    ]
+    return config
+
+def start_cache_warmup(ai_core: MedicalAICore, config_path: Optional[str],
+                       llm_limit: int = 0) -> threading.Thread:
+    """Warm caches on a background thread and announce completion on stdout"""
+    def run():
+        try:
+            status = ai_core.warm_up_caches(config_path, llm_limit=llm_limit)
+            emit({"type": "warmup", **status})
+        except Exception as e:
+            logger.error(f"Cache warm-up error: {e}")
+            ai_core.warmup_status = {'status': 'failed', 'error': str(e)}
+            emit({"type": "warmup", "status": "failed", "message": str(e)})
+    
+    thread = threading.Thread(target=run, name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def start_pipeline_preload(ai_core: MedicalAICore) -> Optional[threading.Thread]:
+    """Under the 'background' preload policy, load pipelines on a thread and announce the result"""
+    if ai_core.preload_policy != 'background':
+        return None
+    
+    def run():
+        status = ai_core.load_pipelines()
+        states = {name: pipeline['state'] for name, pipeline in status['pipelines'].items()}
+        emit({"type": "preload", "status": "complete", "pipelines": states})
+    
+    thread = threading.Thread(target=run, name="pipeline-preload", daemon=True)
+    thread.start()
+    return thread
+
+def announce_llm_status(status: Dict[str, Any]) -> None:
+    """Tell Node.js whenever Ollama becomes reachable or unreachable (or the model changes)"""
+    emit({"type": "llm_status", **status})
+
+def handle_request(ai_core: MedicalAICore, data: Dict[str, Any], respond=None,
+                   deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Process one daemon request and attach its requestId for Node.js correlation"""
+    response = process_request(ai_core, data, on_item=_batch_streamer(data, respond), deadline=deadline)
+    request_id = data.get('requestId')
+    if request_id:
+        response['requestId'] = request_id
+    return response
+
+def _request_deadline(data: Dict[str, Any], default_deadline_ms: Optional[float]) -> Optional[float]:
+    """
+    Monotonic deadline from the request's deadline_ms (milliseconds from receipt), if any
+    
+    Raises:
+        ValueError: deadline_ms is not a finite, non-negative number
+    """
+    deadline_ms = data.get('deadline_ms', default_deadline_ms)
+    if deadline_ms is None:
+        return None
+    try:
+        budget = float(deadline_ms)
+    except (TypeError, ValueError):
+        budget = math.nan
+    if isinstance(deadline_ms, bool) or not 0 <= budget < math.inf:
+        raise ValueError(f"deadline_ms must be a non-negative number of milliseconds, got {deadline_ms!r}")
+    return time.monotonic() + budget / 1000
+
+def _invalid_request(data: Dict[str, Any], error: str) -> Dict[str, Any]:
+    """Error response for a request that cannot be scheduled, still correlated by requestId"""
+    response = {'success': False, 'error': error}
+    if data.get('requestId'):
+        response['requestId'] = data['requestId']
+    return response
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+def _rejection(data: Dict[str, Any], reason: str, **details) -> Dict[str, Any]:
+    """Response for a request that was shed or ran out of time, flagged so clients can back off"""
+    response = {'success': False, 'error': reason, reason: True, **details}
+    if data.get('requestId'):
+        response['requestId'] = data['requestId']
+    return response
+
+def request_priority(data: Dict[str, Any]) -> str:
+    """
+    Scheduling priority of a daemon request
+    
+    An explicit "priority" (a name from PRIORITY_LEVELS or its number) wins
+    over the action default, but a patient case listing emergency symptoms
+    always runs as 'emergency' since the cases _assess_urgency_level would
+    flag as emergent must not wait behind bulk work.
+    """
+    action = data.get('action', '')
+    if action == 'analyze_patient_case' and has_emergency_symptoms(data.get('symptoms') or []):
+        return 'emergency'
+    priority = data.get('priority')
+    if priority in PRIORITY_LEVELS:
+        return priority
+    names = list(PRIORITY_LEVELS)
+    if isinstance(priority, int) and 0 <= priority < len(names):
+        return names[priority]
+    return DEFAULT_ACTION_PRIORITY.get(action, 'normal')
+
+def _schedule_key(priority: str, enqueued_at: float) -> float:
+    """
+    Queue order: priority first, then arrival
+    
+    Ranking by level * PRIORITY_AGING_SECONDS + arrival time makes a request
+    gain one level per PRIORITY_AGING_SECONDS of waiting, so low-priority work
+    is delayed by at most a few aging periods but never starved. The key is
+    fixed at enqueue time, which keeps plain heaps valid.
+    """
+    return PRIORITY_LEVELS[priority] * PRIORITY_AGING_SECONDS + enqueued_at
+
+def _priority_latency_stats(latency: Dict[str, LatencyRecorder]) -> Dict[str, Any]:
+    stats = {}
+    for priority, recorder in latency.items():
+        snapshot = recorder.snapshot()
+        if snapshot['count']:
+            stats[priority] = {f"p{int(q * 100)}": round(v * 1000, 2) for q, v in snapshot['quantiles'].items()}
+            stats[priority]['count'] = snapshot['count']
+    return stats
+
+class RequestDispatcher:
+    """
+    Runs daemon requests on a bounded thread pool and writes each response when it finishes
+    
+    Each action has its own concurrency limit. Requests over the limit wait
+    without holding a pool thread, so a queue of slow vision calls can't
+    starve quick text lookups. Whenever a thread or an action slot frees up,
+    the waiting request with the best priority (see request_priority and
+    _schedule_key) among actions with a free slot runs next, so voice commands
+    and emergency cases jump ahead of image scans and batches. Responses go
+    out in completion order; Node.js matches them by requestId.
+    
+    Admission is bounded: once max_queue requests are waiting, new ones that
+    would also have to wait get an immediate 'overloaded' response. Requests
+    whose deadline_ms passes before a worker picks them up are answered with
+    'deadline_exceeded' and never run (a request already running in a thread
+    cannot be interrupted). A sweeper thread sends those answers as each
+    deadline passes, so callers hear back even while every slot is stuck on
+    a stalled Ollama call.
+    """
+    
+    def __init__(self, ai_core: MedicalAICore, max_workers: int = DEFAULT_DAEMON_WORKERS,
+                 action_limits: Optional[Dict[str, int]] = None, respond=emit,
+                 max_queue: Optional[int] = DEFAULT_MAX_QUEUE, default_deadline_ms: Optional[float] = None):
+        """
+        Initialize the dispatcher
+        
+        Args:
+            ai_core: Core used to process requests
+            max_workers: Pool threads (total requests in progress)
+            action_limits: Max concurrent requests per action; unlisted actions
+                           may use the whole pool
+            respond: Called with each response (defaults to a locked stdout write)
+            max_queue: Waiting requests before new ones are shed (None: unbounded)
+            default_deadline_ms: Deadline for requests that don't send deadline_ms
+        """
+        self.ai_core = ai_core
+        self.max_workers = max_workers
+        self.action_limits = dict(DEFAULT_ACTION_CONCURRENCY if action_limits is None else action_limits)
+        self.respond = respond
+        self.max_queue = max_queue
+        self.default_deadline_ms = default_deadline_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="daemon-worker")
+        self.lock = threading.Lock()
+        self.slot_freed = threading.Condition(self.lock)  # Wakes batch items waiting in run_nested
+        self.running = defaultdict(int)
+        self.active = 0  # Requests handed to the pool
+        # action -> heap of (key, seq, priority, data, deadline, enqueued_at)
+        self.waiting = defaultdict(list)
+        self.sequence = itertools.count()
+        self.queued = 0
+        self.completed = 0
+        self.shed = 0
+        self.expired = 0
+        self.latency = {priority: LatencyRecorder() for priority in PRIORITY_LEVELS}
+        self._sweep_wake = threading.Event()
+        self._closing = False
+        self._sweeper = threading.Thread(target=self._sweep_expired, name="deadline-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def _limit(self, action: str) -> int:
+        return self.action_limits.get(action, self.max_workers)
+    
+    def _purge_expired(self) -> List[Dict[str, Any]]:
+        """Drop queued requests past their deadline (caller holds the lock)"""
+        now = time.monotonic()
+        purged = []
+        for action, heap in self.waiting.items():
+            keep = [entry for entry in heap if entry[4] is None or entry[4] > now]
+            purged.extend(entry[3] for entry in heap if entry[4] is not None and entry[4] <= now)
+            heapq.heapify(keep)
+            self.waiting[action] = keep
+        self.queued -= len(purged)
+        self.expired += len(purged)
+        return purged
+    
+    def _sweep_expired(self) -> None:
+        """Answer queued requests with 'deadline_exceeded' as their deadlines pass"""
+        while True:
+            self._sweep_wake.clear()
+            with self.lock:
+                if self._closing:
+                    return
+                purged = self._purge_expired()
+                next_deadline = min((entry[4] for heap in self.waiting.values() for entry in heap
+                                     if entry[4] is not None), default=None)
+            for expired in purged:
+                self.respond(_rejection(expired, 'deadline_exceeded'))
+            # Sleep until the earliest queued deadline; submit() wakes us for earlier ones
+            self._sweep_wake.wait(_remaining(next_deadline))
+    
+    def _schedule(self) -> List[tuple]:
+        """Claim a thread and a slot for the best runnable waiting requests (caller holds the lock)"""
+        started = []
+        while self.active < self.max_workers:
+            best = None
+            for action, heap in self.waiting.items():
+                if heap and self.running[action] < self._limit(action):
+                    if best is None or heap[0] < self.waiting[best][0]:
+                        best = action
+            if best is None:
+                break
+            entry = heapq.heappop(self.waiting[best])
+            self.queued -= 1
+            self.running[best] += 1
+            self.active += 1
+            started.append((best, entry))
+        return started
+    
+    def submit(self, data: Dict[str, Any]) -> None:
+        """Start a request now, queue it by priority, or shed it"""
+        action = data.get('action', '')
+        priority = request_priority(data)
+        now = time.monotonic()
+        try:
+            deadline = _request_deadline(data, self.default_deadline_ms)
+        except ValueError as e:
+            self.respond(_invalid_request(data, str(e)))
+            return
+        entry = (_schedule_key(priority, now), next(self.sequence), priority, data, deadline, now)
+        purged = []
+        started = []
+        overloaded = False
+        with self.lock:
+            can_start = self.active < self.max_workers and self.running[action] < self._limit(action)
+            if not can_start and self.max_queue is not None and self.queued >= self.max_queue:
+                purged = self._purge_expired()
+                overloaded = self.queued >= self.max_queue
+            if overloaded:
+                self.shed += 1
+                depth = self.queued
+            else:
+                heapq.heappush(self.waiting[action], entry)
+                self.queued += 1
+                started = self._schedule()
+        
+        if deadline is not None and not overloaded:
+            self._sweep_wake.set()
+        for expired in purged:
+            self.respond(_rejection(expired, 'deadline_exceeded'))
+        if overloaded:
+            self.respond(_rejection(data, 'overloaded', queue_depth=depth))
+        for started_action, started_entry in started:
+            self.executor.submit(self._run, started_action, started_entry)
+    
+    def _run(self, action: str, entry: tuple) -> None:
+        _, _, priority, data, deadline, enqueued_at = entry
+        try:
+            if deadline is not None and time.monotonic() >= deadline:
+                # Nobody is waiting for this answer any more; free the slot instead
+                with self.lock:
+                    self.expired += 1
+                response = _rejection(data, 'deadline_exceeded')
+            else:
+                response = handle_request(self.ai_core, data, respond=self.respond, deadline=deadline)
+        except Exception as e:
+            # process_request already converts errors; this guards the correlation step
+            logger.error(f"Worker error for {action}: {e}")
+            response = {'success': False, 'error': str(e), 'requestId': data.get('requestId')}
+        
+        try:
+            self.respond(response)
+        finally:
+            self.latency[priority].record(time.monotonic() - enqueued_at)
+            with self.lock:
+                self.completed += 1
+                self.running[action] -= 1
+                self.active -= 1
+                started = self._schedule()
+                self.slot_freed.notify_all()
+            for started_action, started_entry in started:
+                self.executor.submit(self._run, started_action, started_entry)
+    
+    def run_nested(self, data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run a batch item in the calling (batch pool) thread under its action's limit
+        
+        The item holds a slot of its action while it runs, like a top-level
+        request, but no pool thread. Freed slots go to queued requests first
+        (_schedule runs before waiting items wake), so batch items never
+        overtake them. An item still waiting at the deadline is answered
+        with 'deadline_exceeded'.
+        """
+        action = data.get('action', '')
+        with self.slot_freed:
+            while self.running[action] >= self._limit(action):
+                remaining = _remaining(deadline)
+                if remaining == 0:
+                    self.expired += 1
+                    return _rejection(data, 'deadline_exceeded')
+                self.slot_freed.wait(remaining)
+            self.running[action] += 1
+        try:
+            return process_request(self.ai_core, data)
+        finally:
+            with self.lock:
+                self.running[action] -= 1
+                started = self._schedule()
+                self.slot_freed.notify_all()
+            for started_action, started_entry in started:
+                self.executor.submit(self._run, started_action, started_entry)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """In-progress and queued requests, queue depth, shed counts and latency per priority"""
+        with self.lock:
+            queued_by_priority = defaultdict(int)
+            for heap in self.waiting.values():
+                for entry in heap:
+                    queued_by_priority[entry[2]] += 1
+            stats = {
+                'mode': 'threads',
+                'workers': self.max_workers,
+                'running': {a: n for a, n in self.running.items() if n},
+                'queued': {a: len(h) for a, h in self.waiting.items() if h},
+                'queued_by_priority': dict(queued_by_priority),
+                'queue_depth': self.queued,
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'shed': self.shed,
+                'expired': self.expired,
+                'cancelled': 0,  # A running request is never interrupted in this mode
+                'action_limits': dict(self.action_limits)
+            }
+        stats['latency_ms_by_priority'] = _priority_latency_stats(self.latency)
+        return stats
+    
+    def shutdown(self) -> None:
+        """Finish everything already accepted, including queued requests"""
+        while True:
+            with self.lock:
+                busy = self.active or self.queued
+            if not busy:
+                break
+            time.sleep(0.05)
+        with self.lock:
+            self._closing = True
+        self._sweep_wake.set()
+        self.executor.shutdown(wait=True)
+
+def run_daemon_mode(ai_core: MedicalAICore, warmup_file: Optional[str] = None,
+                    workers: int = DEFAULT_DAEMON_WORKERS,
+                    action_limits: Optional[Dict[str, int]] = None,
+                    max_queue: Optional[int] = DEFAULT_MAX_QUEUE,
+                    default_deadline_ms: Optional[float] = None,
+                    warmup_llm_limit: int = 0):
     """Persistent Loop for Fast Local AI"""
-    logger.info("Daemon Mode Started. Listening on STDIN...")
-    print(json.dumps({"type": "startup", "status": "ready"}), flush=True) # Signal to Node.js
+    logger.info(f"Daemon Mode Started with {workers} workers. Listening on STDIN...")
+    dispatcher = RequestDispatcher(ai_core, max_workers=workers, action_limits=action_limits,
+                                   max_queue=max_queue, default_deadline_ms=default_deadline_ms)
+    ai_core.dispatcher = dispatcher
+    offered = available_protocols()
+    emit({"type": "startup", "status": "ready", "protocols": offered}) # Signal to Node.js
+    ai_core.local_llm.start_health_monitor(on_change=announce_llm_status)
+    
+    # Warm-up runs behind the ready signal; requests are served (and may warm entries) meanwhile
+    start_pipeline_preload(ai_core)
+    if warmup_file is not None:
+        start_cache_warmup(ai_core, warmup_file, warmup_llm_limit)
     
+    # Read bytes so the stream can switch from lines to frames without losing buffered input
+    stdin = sys.stdin.buffer
+    protocol = LINE_PROTOCOL
     while True:
         try:
-            line = sys.stdin.readline()
-            if not line:
-                break # EOF
+            if protocol == LINE_PROTOCOL:
+                line = stdin.readline()
+                if not line:
+                    break # EOF
+                    
+                line = line.strip()
+                if not line:
+                    continue
+                    
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Invalid JSON received")
+                    continue
+            else:
+                data = read_frame_sync(stdin, protocol)
+                if data is None:
+                    break # EOF
+            if not isinstance(data, dict):
+                emit(_invalid_request({}, f"Request must be a JSON object, got {type(data).__name__}"))
+                continue
+            
+            if data.get('type') == 'hello':
+                # Optional first message: {"type": "hello", "protocol": "msgpack"}
+                try:
+                    protocol = choose_protocol(data.get('protocol'), offered if protocol == LINE_PROTOCOL else [])
+                except ProtocolError as e:
+                    emit({"type": "protocol", "protocol": protocol, "error": str(e)})
+                    continue
+                switch_stdout_protocol(protocol)
+                continue
+            
+            # Responses are written by the workers as each request finishes
+            dispatcher.submit(data)
                 
+        except MessageError as e:
+            emit(_invalid_request({}, str(e)))  # The frame was complete, so the stream is still in sync
+        except ProtocolError as e:
+            logger.error(f"Daemon Protocol Error, closing: {e}")
+            break # Framing is lost; nothing after this can be trusted
+        except KeyboardInterrupt:
+            break
+        except Exception as e:
+            logger.error(f"Daemon Loop Error: {e}")
+    
+    ai_core.local_llm.stop_health_monitor()
+    dispatcher.shutdown()
+
+class AsyncRequestDispatcher:
+    """
+    asyncio counterpart of RequestDispatcher: one task per request, per-action slot handoff
+    
+    Waiting requests are suspended coroutines rather than threads, so hundreds
+    can be in flight while Ollama works through them. Priorities, admission
+    and deadlines work as in RequestDispatcher, except that a request still
+    running when its deadline passes is cancelled. Only that request's own
+    await is cancelled: work it shares with identical requests (see
+    MedicalCacheManager.aget_or_compute) keeps running for them.
+    """
+    
+    def __init__(self, ai_core: MedicalAICore, action_limits: Optional[Dict[str, int]] = None, respond=emit,
+                 max_queue: Optional[int] = DEFAULT_MAX_QUEUE, default_deadline_ms: Optional[float] = None):
+        """
+        Initialize the dispatcher (inside the running event loop)
+        
+        Args:
+            ai_core: Core used to process requests
+            action_limits: Max concurrent requests per action; unlisted actions are unbounded
+            respond: Called with each response (defaults to a locked stdout write)
+            max_queue: Waiting requests before new ones are shed (None: unbounded)
+            default_deadline_ms: Deadline for requests that don't send deadline_ms
+        """
+        self.ai_core = ai_core
+        self.action_limits = dict(DEFAULT_ACTION_CONCURRENCY if action_limits is None else action_limits)
+        self.respond = respond
+        self.max_queue = max_queue
+        self.default_deadline_ms = default_deadline_ms
+        self.tasks = set()
+        # get_system_status reads these from a worker thread
+        self.lock = threading.Lock()
+        self.running = defaultdict(int)
+        self.waiting = defaultdict(int)
+        # action -> heap of (key, seq, future, nested, priority); the future resolves when a slot is handed over.
+        # Nested (batch item) waiters are not counted in waiting/queued, so they never cause shedding
+        self.waiters = defaultdict(list)
+        self.sequence = itertools.count()
+        self.queued = 0
+        self.completed = 0
+        self.shed = 0
+        self.expired = 0
+        self.cancelled = 0
+        self.latency = {priority: LatencyRecorder() for priority in PRIORITY_LEVELS}
+    
+    def submit(self, data: Dict[str, Any], respond=None) -> None:
+        """Start processing a request, queue it for a slot, or shed it when the queue is full"""
+        respond = respond or self.respond
+        try:
+            deadline = _request_deadline(data, self.default_deadline_ms)
+        except ValueError as e:
+            respond(_invalid_request(data, str(e)))
+            return
+        action = data.get('action', '')
+        limit = self.action_limits.get(action)
+        priority = request_priority(data)
+        enqueued_at = time.monotonic()
+        waiter = None
+        depth = None
+        with self.lock:
+            if limit is None or self.running[action] < limit:
+                self.running[action] += 1
+            elif self.max_queue is not None and self.queued >= self.max_queue:
+                self.shed += 1
+                depth = self.queued
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                heapq.heappush(self.waiters[action],
+                               (_schedule_key(priority, enqueued_at), next(self.sequence), waiter, False, priority))
+                self.waiting[action] += 1
+                self.queued += 1
+        if depth is not None:
+            respond(_rejection(data, 'overloaded', queue_depth=depth))
+            return
+        
+        task = asyncio.create_task(self._run(action, data, deadline, respond, waiter, priority, enqueued_at))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    def _release(self, action: str) -> None:
+        """Hand the finished request's slot to the next live waiter, or free it"""
+        with self.lock:
+            waiters = self.waiters[action]
+            while waiters:
+                _, _, waiter, nested, _ = heapq.heappop(waiters)
+                if not waiter.done():  # Waiters that timed out were cancelled and already uncounted
+                    if not nested:
+                        self.waiting[action] -= 1
+                        self.queued -= 1
+                    waiter.set_result(None)
+                    return
+            self.running[action] -= 1
+    
+    async def _run(self, action: str, data: Dict[str, Any], deadline: Optional[float], respond, waiter,
+                   priority: str, enqueued_at: float) -> None:
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, _remaining(deadline))
+            except asyncio.TimeoutError:
+                with self.lock:
+                    self.waiting[action] -= 1
+                    self.queued -= 1
+                    self.expired += 1
+                respond(_rejection(data, 'deadline_exceeded'))
+                return
+        
+        try:
+            if deadline is not None and time.monotonic() >= deadline:
+                with self.lock:
+                    self.expired += 1
+                response = _rejection(data, 'deadline_exceeded')
+            else:
+                response = await asyncio.wait_for(
+                    aprocess_request(self.ai_core, data, on_item=_batch_streamer(data, respond), deadline=deadline),
+                    _remaining(deadline)
+                )
+        except asyncio.TimeoutError:
+            # Cancels this request's await; a coalesced Ollama call is shielded and finishes for its other callers
+            with self.lock:
+                self.cancelled += 1
+            response = _rejection(data, 'deadline_exceeded')
+        finally:
+            self._release(action)
+        
+        request_id = data.get('requestId')
+        if request_id:
+            response['requestId'] = request_id
+        respond(response)
+        self.latency[priority].record(time.monotonic() - enqueued_at)
+        with self.lock:
+            self.completed += 1
+    
+    async def run_nested(self, data: Dict[str, Any], priority: str,
+                         deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run a batch item under its action's limit, waiting for a slot at the batch's priority
+        
+        Returns 'deadline_exceeded' if no slot frees up before the batch's deadline.
+        """
+        action = data.get('action', '')
+        limit = self.action_limits.get(action)
+        waiter = None
+        with self.lock:
+            if limit is None or self.running[action] < limit:
+                self.running[action] += 1
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                heapq.heappush(self.waiters[action],
+                               (_schedule_key(priority, time.monotonic()), next(self.sequence), waiter, True, priority))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, _remaining(deadline))
+            except asyncio.TimeoutError:
+                with self.lock:
+                    self.expired += 1
+                return _rejection(data, 'deadline_exceeded')
+        try:
+            return await aprocess_request(self.ai_core, data)
+        finally:
+            self._release(action)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Same fields as RequestDispatcher.get_stats, so monitoring does not depend on the mode"""
+        with self.lock:
+            queued_by_priority = defaultdict(int)
+            for heap in self.waiters.values():
+                for _, _, waiter, nested, priority in heap:
+                    if not nested and not waiter.done():  # Timed-out waiters stay in the heap until popped
+                        queued_by_priority[priority] += 1
+            stats = {
+                'mode': 'asyncio',
+                'workers': None,  # One task per request, no pool
+                'running': {a: n for a, n in self.running.items() if n},
+                'queued': {a: n for a, n in self.waiting.items() if n},
+                'queued_by_priority': dict(queued_by_priority),
+                'queue_depth': self.queued,
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'shed': self.shed,
+                'expired': self.expired,
+                'cancelled': self.cancelled,
+                'action_limits': dict(self.action_limits)
+            }
+        stats['latency_ms_by_priority'] = _priority_latency_stats(self.latency)
+        return stats
+    
+    async def drain(self) -> None:
+        """Wait for every accepted request to finish"""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+async def _stdin_lines():
+    """Yield stdin lines without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    if sys.platform != 'win32':
+        reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (NotImplementedError, OSError, ValueError):
+            reader = None  # Not a pipe (e.g. a redirected file)
+        if reader is not None:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                yield line.decode('utf-8')
+    
+    # Windows pipes from Node.js and plain files: a reader thread feeds the loop
+    lines = asyncio.Queue()
+    
+    def pump():
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        loop.call_soon_threadsafe(lines.put_nowait, None)
+    
+    threading.Thread(target=pump, name="stdin-reader", daemon=True).start()
+    while True:
+        line = await lines.get()
+        if line is None:
+            return
+        yield line
+
+async def _run_async_daemon(ai_core: MedicalAICore, warmup_file: Optional[str],
+                            action_limits: Optional[Dict[str, int]], warmup_llm_limit: int = 0,
+                            **dispatch_options) -> None:
+    dispatcher = AsyncRequestDispatcher(ai_core, action_limits=action_limits, **dispatch_options)
+    ai_core.dispatcher = dispatcher
+    emit({"type": "startup", "status": "ready", "protocols": [LINE_PROTOCOL]}) # Signal to Node.js
+    health_monitor = asyncio.create_task(ai_core.local_llm.amonitor_health(on_change=announce_llm_status))
+    
+    start_pipeline_preload(ai_core)
+    if warmup_file is not None:
+        start_cache_warmup(ai_core, warmup_file, warmup_llm_limit)
+    
+    try:
+        async for line in _stdin_lines():
             line = line.strip()
             if not line:
                 continue
-                
             try:
                 data = json.loads(line)
-                request_id = data.get('requestId')
-                
-                # Process
-                response = process_request(ai_core, data)
-                
-                # Attach ID for Node.js correlation
-                if request_id:
-                    response['requestId'] = request_id
-                
-                # Send JSON Line
-                print(json.dumps(response), flush=True)
-                
             except json.JSONDecodeError:
                 logger.warning("Invalid JSON received")
-                
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            logger.error(f"Daemon Loop Error: {e}")
+                continue
+            if not isinstance(data, dict):
+                emit(_invalid_request({}, f"Request must be a JSON object, got {type(data).__name__}"))
+                continue
+            if data.get('type') == 'hello':
+                emit({"type": "protocol", "protocol": LINE_PROTOCOL,
+                      "error": "Async mode only speaks JSON lines; use --mode daemon or server for framing"})
+                continue
+            dispatcher.submit(data)
+        await dispatcher.drain()
+    finally:
+        health_monitor.cancel()
+        await ai_core.local_llm.aclose()
+
+def run_async_daemon_mode(ai_core: MedicalAICore, warmup_file: Optional[str] = None,
+                          action_limits: Optional[Dict[str, int]] = None,
+                          max_queue: Optional[int] = DEFAULT_MAX_QUEUE,
+                          default_deadline_ms: Optional[float] = None,
+                          warmup_llm_limit: int = 0):
+    """Persistent asyncio loop: LLM calls are awaited, so in-flight requests cost no threads"""
+    logger.info("Async Daemon Mode Started. Listening on STDIN...")
+    try:
+        asyncio.run(_run_async_daemon(ai_core, warmup_file, action_limits, warmup_llm_limit,
+                                      max_queue=max_queue, default_deadline_ms=default_deadline_ms))
+    except KeyboardInterrupt:
+        pass
+
+class SocketServer:
+    """
+    Serves process_request actions to many clients over a Unix socket or local TCP
+    
+    Each connection carries length-prefixed JSON frames (see daemon_protocol) in
+    both directions and stays open for any number of requests. Requests from
+    all connections share one AsyncRequestDispatcher, so per-action limits and
+    caches apply across clients, and responses carry the client's requestId.
+    """
+    
+    def __init__(self, dispatcher: AsyncRequestDispatcher, socket_path: Optional[str] = None,
+                 host: str = DEFAULT_SERVER_HOST, port: int = DEFAULT_SERVER_PORT,
+                 idle_timeout: Optional[float] = None):
+        """
+        Initialize the server
+        
+        Args:
+            dispatcher: Dispatcher that runs the requests
+            socket_path: Unix domain socket path; TCP on host:port is used when omitted
+            host: TCP bind address (keep it local; the protocol has no authentication)
+            port: TCP port
+            idle_timeout: Close connections idle for this many seconds (None keeps them open)
+        """
+        self.dispatcher = dispatcher
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.total_connections = 0
+        self.protocol_errors = 0
+        self.server = None
+    
+    @property
+    def address(self) -> str:
+        return f"unix:{self.socket_path}" if self.socket_path else f"tcp:{self.host}:{self.port}"
+    
+    async def start(self) -> None:
+        """Bind and start accepting connections"""
+        if self.socket_path:
+            if os.path.lexists(self.socket_path):
+                if not self._owns_socket_path():
+                    raise FileExistsError(f"{self.socket_path} exists and is not a socket; refusing to replace it")
+                os.unlink(self.socket_path)  # Stale socket from a previous run
+            self.server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        else:
+            self.server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]  # Resolves port 0
+    
+    def _owns_socket_path(self) -> bool:
+        """True if socket_path is a socket (never a file or symlink someone pointed --socket at)"""
+        try:
+            return stat.S_ISSOCK(os.lstat(self.socket_path).st_mode)
+        except FileNotFoundError:
+            return False
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.total_connections += 1
+        
+        offered = available_protocols(framed_only=True)
+        protocol = 'json'
+        
+        def send(message: Dict[str, Any]) -> None:
+            # A single write per frame, so frames from concurrent requests never interleave
+            if not writer.is_closing():
+                writer.write(encode_frame(message, protocol))
+        
+        send({"type": "startup", "status": "ready", "protocols": offered})
+        try:
+            while True:
+                try:
+                    if self.idle_timeout:
+                        message = await asyncio.wait_for(read_frame(reader, protocol), self.idle_timeout)
+                    else:
+                        message = await read_frame(reader, protocol)
+                except MessageError as e:
+                    # A complete frame with a bad payload: answer it and keep the connection
+                    send(_invalid_request({}, str(e)))
+                    continue
+                if message is None:
+                    break  # Client closed the connection
+                # Stop reading from a client that does not read its responses
+                await writer.drain()
+                if message.get('type') == 'ping':
+                    send({"type": "pong", "requestId": message.get('requestId')})
+                    continue
+                if message.get('type') == 'hello':
+                    try:
+                        chosen = choose_protocol(message.get('protocol'), offered)
+                    except ProtocolError as e:
+                        send({"type": "protocol", "protocol": protocol, "error": str(e)})
+                        continue
+                    # The acknowledgement is the last frame in the old encoding
+                    send({"type": "protocol", "protocol": chosen})
+                    protocol = chosen
+                    continue
+                self.dispatcher.submit(message, respond=send)
+        except ProtocolError as e:
+            self.protocol_errors += 1
+            logger.warning(f"Closing connection after protocol error: {e}")
+            send({"type": "error", "error": str(e)})
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            # Requests still running finish; their responses are dropped once the socket is closed
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Listening address and connection counts"""
+        return {
+            'address': self.address,
+            'connections': self.connections,
+            'total_connections': self.total_connections,
+            'protocol_errors': self.protocol_errors
+        }
+    
+    async def close(self) -> None:
+        """Stop accepting connections and remove the socket file"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.socket_path and self._owns_socket_path():
+            os.unlink(self.socket_path)
+
+async def _run_server(ai_core: MedicalAICore, warmup_file: Optional[str],
+                      action_limits: Optional[Dict[str, int]], max_queue: Optional[int],
+                      default_deadline_ms: Optional[float], warmup_llm_limit: int = 0,
+                      **server_options) -> None:
+    dispatcher = AsyncRequestDispatcher(ai_core, action_limits=action_limits, max_queue=max_queue,
+                                        default_deadline_ms=default_deadline_ms)
+    server = SocketServer(dispatcher, **server_options)
+    ai_core.dispatcher = dispatcher
+    ai_core.server = server
+    await server.start()
+    emit({"type": "startup", "status": "ready", "address": server.address}) # Signal to the supervisor
+    health_monitor = asyncio.create_task(ai_core.local_llm.amonitor_health(on_change=announce_llm_status))
+    
+    start_pipeline_preload(ai_core)
+    if warmup_file is not None:
+        start_cache_warmup(ai_core, warmup_file, warmup_llm_limit)
+    
+    try:
+        await server.server.serve_forever()
+    finally:
+        health_monitor.cancel()
+        await server.close()
+        await dispatcher.drain()
+        await ai_core.local_llm.aclose()
+
+def run_server_mode(ai_core: MedicalAICore, warmup_file: Optional[str] = None,
+                    action_limits: Optional[Dict[str, int]] = None,
+                    max_queue: Optional[int] = DEFAULT_MAX_QUEUE,
+                    default_deadline_ms: Optional[float] = None, warmup_llm_limit: int = 0,
+                    **server_options):
+    """Long-lived model host shared by several backend processes (see SocketServer)"""
+    logger.info("Server Mode Started.")
+    try:
+        asyncio.run(_run_server(ai_core, warmup_file, action_limits, max_queue, default_deadline_ms,
+                                warmup_llm_limit, **server_options))
+    except KeyboardInterrupt:
+        pass
+
+def parse_action_limits(spec: str) -> Dict[str, int]:
+    """Parse 'action=N,action=N' overrides on top of the default per-action limits"""
+    limits = dict(DEFAULT_ACTION_CONCURRENCY)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        action, _, value = item.partition('=')
+        limits[action.strip()] = int(value)
+    return limits
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--input', type=str, help='Input JSON file path (Legacy Mode)')
-    parser.add_argument('--mode', type=str, default='cli', choices=['cli', 'daemon'], help='Operating Mode')
+    parser.add_argument('--mode', type=str, default='cli', choices=['cli', 'daemon', 'async', 'server'],
+                        help='Operating Mode (async: asyncio daemon with an async Ollama client; '
+                             'server: serve many clients over a socket)')
+    parser.add_argument('--cache-db', type=str, default=os.environ.get('CURAVOX_CACHE_DB', ''),
+                        help='SQLite file for a persistent cache tier in daemon mode (default: off); '
+                             'medicine, OCR and LLM answers only, stored unencrypted')
+    parser.add_argument('--shared-cache', type=str,
+                        default=os.environ.get('CURAVOX_CACHE_SHARED_DIR', ''),
+                        help='Directory of memory-mapped cache files shared by all daemon workers')
+    parser.add_argument('--warmup-file', type=str,
+                        default=os.environ.get('CURAVOX_WARMUP_FILE', DEFAULT_WARMUP_FILE),
+                        help='Frequent queries to pre-cache in the background at daemon startup')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip cache warm-up in daemon mode')
+    parser.add_argument('--warmup-llm-limit', type=int,
+                        default=int(os.environ.get('CURAVOX_WARMUP_LLM_LIMIT', '0')),
+                        help='LLM calls the warm-up may make for advice, images and uncertain texts '
+                             '(default 0: local analysis only)')
+    parser.add_argument('--semantic-cache', action='store_true',
+                        default=os.environ.get('CURAVOX_SEMANTIC_CACHE', '') == '1',
+                        help='Answer near-duplicate advice questions from cache')
+    parser.add_argument('--semantic-threshold', type=float,
+                        default=float(os.environ.get('CURAVOX_SEMANTIC_THRESHOLD', '0.85')),
+                        help='Cosine similarity required for a semantic cache hit')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('CURAVOX_DAEMON_WORKERS', DEFAULT_DAEMON_WORKERS)),
+                        help='Requests processed concurrently in daemon mode')
+    parser.add_argument('--action-limits', type=str, default=os.environ.get('CURAVOX_ACTION_LIMITS', ''),
+                        help='Per-action concurrency overrides, e.g. "analyze_medicine_image=2,get_medical_advice=4"')
+    parser.add_argument('--max-queue', type=int,
+                        default=int(os.environ.get('CURAVOX_MAX_QUEUE', DEFAULT_MAX_QUEUE)),
+                        help='Waiting requests before new ones get an "overloaded" response (0: unbounded)')
+    parser.add_argument('--default-deadline-ms', type=float,
+                        default=float(os.environ['CURAVOX_DEFAULT_DEADLINE_MS'])
+                        if os.environ.get('CURAVOX_DEFAULT_DEADLINE_MS') else None,
+                        help='Deadline for requests without deadline_ms (default: none)')
+    parser.add_argument('--preload', type=str, choices=PRELOAD_POLICIES,
+                        default=os.environ.get('CURAVOX_PRELOAD', DEFAULT_PRELOAD_POLICY),
+                        help='When to load the Hugging Face pipelines: before ready (eager), '
+                             'on a thread after ready (background) or on first use (on-demand)')
+    parser.add_argument('--preload-pipelines', type=str,
+                        default=os.environ.get('CURAVOX_PRELOAD_PIPELINES', ','.join(PIPELINE_SPECS)),
+                        help=f'Comma-separated pipelines to preload (from {", ".join(PIPELINE_SPECS)})')
+    parser.add_argument('--model-memory-mb', type=float,
+                        default=float(os.environ['CURAVOX_MODEL_MEMORY_MB'])
+                        if os.environ.get('CURAVOX_MODEL_MEMORY_MB') else None,
+                        help='Memory ceiling for loaded transformer models; least recently used '
+                             'unpinned models are evicted above it (default: unbounded)')
+    parser.add_argument('--socket', type=str, default=os.environ.get('CURAVOX_SERVER_SOCKET', ''),
+                        help='Unix domain socket path for server mode (TCP is used when empty)')
+    parser.add_argument('--host', type=str, default=os.environ.get('CURAVOX_SERVER_HOST', DEFAULT_SERVER_HOST),
+                        help='TCP bind address for server mode')
+    parser.add_argument('--port', type=int,
+                        default=int(os.environ.get('CURAVOX_SERVER_PORT', DEFAULT_SERVER_PORT)),
+                        help='TCP port for server mode')
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help='Close server connections idle for this many seconds (default: keep alive)')
     args = parser.parse_args()
+    if args.mode == 'server' and args.socket and not hasattr(asyncio, 'start_unix_server'):
+        parser.error('--socket needs Unix domain sockets; use --port on this platform')
+    preload_pipelines = [name.strip() for name in args.preload_pipelines.split(',') if name.strip()]
+    if set(preload_pipelines) - set(PIPELINE_SPECS):
+        parser.error(f'--preload-pipelines takes names from: {", ".join(PIPELINE_SPECS)}')
 
+    # Several daemon processes pointed at the same directory share one cache
+    if args.shared_cache and args.shared_cache != cache_manager.shared_dir:
+        cache_manager.enable_shared_tier(args.shared_cache)
+    is_daemon = args.mode in ('daemon', 'async', 'server')
+    if is_daemon:
+        claim_stdout()
+    
+    # Opt-in: persist non-patient caches across daemon restarts so repeat scans skip the LLM
+    if is_daemon and args.cache_db:
+        cache_manager.enable_disk_tier(args.cache_db)
+    if is_daemon:
+        cache_manager.start_expiry_sweeper()
+
+    model_registry.set_memory_limit(args.model_memory_mb)
+    
     # Initialize Core ONCE
-    ai_core = MedicalAICore()
+    ai_core = MedicalAICore(preload_policy=args.preload, preload_pipelines=preload_pipelines)
+    if args.semantic_cache:
+        ai_core.enable_semantic_cache(threshold=args.semantic_threshold)
     
+    admission = {'max_queue': args.max_queue or None, 'default_deadline_ms': args.default_deadline_ms}
+    warmup = {'warmup_file': None if args.no_warmup else args.warmup_file,
+              'warmup_llm_limit': args.warmup_llm_limit}
     if args.mode == 'daemon':
-        run_daemon_mode(ai_core)
+        run_daemon_mode(ai_core, **warmup,
+                        workers=args.workers, action_limits=parse_action_limits(args.action_limits), **admission)
+    elif args.mode == 'async':
+        run_async_daemon_mode(ai_core, **warmup,
+                              action_limits=parse_action_limits(args.action_limits), **admission)
+    elif args.mode == 'server':
+        run_server_mode(ai_core, **warmup,
+                        action_limits=parse_action_limits(args.action_limits), **admission,
+                        socket_path=args.socket or None, host=args.host, port=args.port,
+                        idle_timeout=args.idle_timeout)
     else:
         # Legacy File-Based Mode (One-Shot)
         if not args.input:
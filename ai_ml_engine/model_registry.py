@@ -0,0 +1,296 @@
+"""
+Model Registry for Medical AI Assistant
+Shares one instance of each transformer model per process and evicts idle models under a memory ceiling
+"""
+
+import gc
+import os
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+DEFAULT_FAILURE_BACKOFF = 30.0  # Seconds before a failed load is attempted again; doubles per consecutive failure
+MAX_FAILURE_BACKOFF = 900.0
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def parameter_bytes(model: Any) -> int:
+    """Size of a pipeline's (or torch module's) weights; 0 when it has none we can see"""
+    module = getattr(model, 'model', model)
+    try:
+        return sum(p.numel() * p.element_size() for p in module.parameters())
+    except Exception:
+        return 0
+
+
+class ModelLoadError(RuntimeError):
+    """Raised by ModelRegistry.get for a model whose last load failed, until its backoff passes"""
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models keyed by model id
+
+    Every caller asking for the same model id shares one instance, and only
+    one thread runs its loader; the others wait on the same Future. Loads of
+    different models are serialized so the RSS growth of each load can be
+    attributed to its model (the weight size is used where RSS is
+    unavailable). A failed load is not attempted again until its backoff
+    passes (or retry() is called), so a model that cannot load is not
+    rebuilt and logged on every use, yet a transient failure heals on its
+    own. When the models' combined footprint exceeds the
+    memory limit, the least recently used unpinned models are dropped. Callers must
+    therefore fetch models from the registry on each use rather than keep
+    references, or an evicted model stays in memory.
+    """
+
+    def __init__(self, memory_limit_mb: Optional[float] = None,
+                 failure_backoff: float = DEFAULT_FAILURE_BACKOFF):
+        """
+        Initialize the registry
+
+        Args:
+            memory_limit_mb: Ceiling for the combined footprint of loaded models (None: unbounded)
+            failure_backoff: Seconds before a failed load is attempted again (doubled per
+                consecutive failure, up to MAX_FAILURE_BACKOFF)
+        """
+        self.memory_limit = int(memory_limit_mb * MB) if memory_limit_mb else None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.models = OrderedDict()  # model_id -> entry dict, least recently used first
+        self.loading = {}  # model_id -> Future
+        self.pinned = set()
+        self.failure_backoff = failure_backoff
+        self.failures = {}  # model_id -> {'error', 'attempts', 'retry_at'} of the last failed load
+        self.known_sizes = {}  # model_id -> bytes, kept after eviction to make room before a reload
+        self.stats = {'loads': 0, 'hits': 0, 'evictions': 0, 'failures': 0}
+
+    def set_memory_limit(self, memory_limit_mb: Optional[float]) -> None:
+        """Change the ceiling (None or 0 for unbounded) and evict down to it"""
+        with self.lock:
+            self.memory_limit = int(memory_limit_mb * MB) if memory_limit_mb else None
+            evicted = self._evict_to_fit(0)
+        self._release(evicted)
+
+    def get(self, model_id: str, loader: Callable[[], Any], pin: bool = False) -> Any:
+        """
+        Return the shared instance of a model, loading it on first use
+
+        Args:
+            model_id: Key shared by every caller (e.g. the Hugging Face model name)
+            loader: Builds the model; called at most once per load
+            pin: Never evict this model
+
+        Returns:
+            The model; the loader's exception propagates to every waiting caller
+
+        Raises:
+            ModelLoadError: The last load of this model failed and its backoff has not passed
+        """
+        with self.lock:
+            if pin:
+                self.pinned.add(model_id)
+            entry = self.models.get(model_id)
+            if entry is not None:
+                self.models.move_to_end(model_id)
+                entry['last_used'] = time.time()
+                entry['uses'] += 1
+                self.stats['hits'] += 1
+                return entry['model']
+            failure = self.failures.get(model_id)
+            if failure is not None and time.monotonic() < failure['retry_at']:
+                raise ModelLoadError(f"Loading {model_id} failed: {failure['error']} "
+                                     f"(retrying in {failure['retry_at'] - time.monotonic():.0f}s)")
+            future = self.loading.get(model_id)
+            loader_thread = future is None
+            if loader_thread:
+                future = self.loading[model_id] = Future()
+        if not loader_thread:
+            return future.result()
+
+        try:
+            model = self._load(model_id, loader)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[model_id]
+                attempts = self.failures.get(model_id, {}).get('attempts', 0) + 1
+                backoff = min(self.failure_backoff * 2 ** (attempts - 1), MAX_FAILURE_BACKOFF)
+                self.failures[model_id] = {
+                    'error': str(e),
+                    'attempts': attempts,
+                    'retry_at': time.monotonic() + backoff
+                }
+                self.stats['failures'] += 1
+            future.set_exception(e)
+            raise
+        future.set_result(model)
+        return model
+
+    def _load(self, model_id: str, loader: Callable[[], Any]) -> Any:
+        with self.load_lock:
+            # A previously evicted model's size is known: make room before loading it again
+            with self.lock:
+                evicted = self._evict_to_fit(self.known_sizes.get(model_id, 0))
+            self._release(evicted)
+
+            start_time = time.perf_counter()
+            rss_before = process_rss()
+            model = loader()
+            rss_after = process_rss()
+            load_ms = round((time.perf_counter() - start_time) * 1000, 1)
+
+        measured = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        # Freed allocator pages are reused after an eviction, so a small delta under-reports
+        size = max(measured, parameter_bytes(model))
+        now = time.time()
+        with self.lock:
+            self.models[model_id] = {
+                'model': model,
+                'bytes': size,
+                'load_ms': load_ms,
+                'loaded_at': datetime.now().isoformat(),
+                'last_used': now,
+                'uses': 1
+            }
+            self.known_sizes[model_id] = size
+            self.failures.pop(model_id, None)
+            del self.loading[model_id]
+            self.stats['loads'] += 1
+            evicted = self._evict_to_fit(0, keep=model_id)
+        self._release(evicted)
+        logger.info(f"Loaded model {model_id} in {load_ms}ms ({size / MB:.0f} MB)")
+        return model
+
+    def _resident_bytes(self) -> int:
+        return sum(entry['bytes'] for entry in self.models.values())
+
+    def _evict_to_fit(self, incoming: int, keep: Optional[str] = None) -> list:
+        """Drop LRU unpinned models until incoming bytes fit (caller holds the lock); returns them"""
+        if self.memory_limit is None:
+            return []
+        evicted = []
+        for model_id in list(self.models):
+            if self._resident_bytes() + incoming <= self.memory_limit:
+                break
+            if model_id in self.pinned or model_id == keep:
+                continue
+            evicted.append((model_id, self.models.pop(model_id)))
+            self.stats['evictions'] += 1
+        return evicted
+
+    def _release(self, evicted: list) -> None:
+        """Free evicted models outside the lock (the list must hold the last references)"""
+        if not evicted:
+            return
+        for model_id, entry in evicted:
+            logger.info(f"Evicted model {model_id} ({entry['bytes'] / MB:.0f} MB, idle "
+                        f"{time.time() - entry['last_used']:.0f}s)")
+        entry = None
+        evicted.clear()
+        gc.collect()
+        if 'torch' in sys.modules:
+            torch = sys.modules['torch']
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def retry(self, model_id: str) -> bool:
+        """Forget a failed load so the next get() runs the loader without waiting out its backoff; returns False if none failed"""
+        with self.lock:
+            return self.failures.pop(model_id, None) is not None
+
+    def pin(self, model_id: str) -> None:
+        with self.lock:
+            self.pinned.add(model_id)
+
+    def unpin(self, model_id: str) -> None:
+        with self.lock:
+            self.pinned.discard(model_id)
+
+    def evict(self, model_id: str) -> bool:
+        """Drop a model now (pinned or not); returns False if it was not loaded"""
+        with self.lock:
+            evicted = [(model_id, self.models.pop(model_id))] if model_id in self.models else []
+            self.stats['evictions'] += len(evicted)
+        found = bool(evicted)
+        self._release(evicted)
+        return found
+
+    def state(self, model_id: str) -> Dict[str, Any]:
+        """Load state of one model: loaded, loading, failed, evicted or not_loaded"""
+        with self.lock:
+            entry = self.models.get(model_id)
+            if entry is not None:
+                return {
+                    'state': 'loaded',
+                    'rss_mb': round(entry['bytes'] / MB, 1),
+                    'load_ms': entry['load_ms'],
+                    'loaded_at': entry['loaded_at'],
+                    'pinned': model_id in self.pinned
+                }
+            if model_id in self.loading:
+                return {'state': 'loading'}
+            failure = self.failures.get(model_id)
+            if failure is not None:
+                return {
+                    'state': 'failed',
+                    'error': failure['error'],
+                    'attempts': failure['attempts'],
+                    'retry_in_seconds': max(0.0, round(failure['retry_at'] - time.monotonic(), 1))
+                }
+            if model_id in self.known_sizes:
+                return {'state': 'evicted'}
+            return {'state': 'not_loaded'}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model footprint and use, the ceiling and load/eviction counters"""
+        now = time.time()
+        with self.lock:
+            models = {
+                model_id: {
+                    'rss_mb': round(entry['bytes'] / MB, 1),
+                    'load_ms': entry['load_ms'],
+                    'uses': entry['uses'],
+                    'idle_seconds': round(now - entry['last_used'], 1),
+                    'pinned': model_id in self.pinned
+                }
+                for model_id, entry in self.models.items()
+            }
+            resident = self._resident_bytes()
+            stats = dict(self.stats)
+        rss = process_rss()
+        stats.update({
+            'memory_limit_mb': round(self.memory_limit / MB, 1) if self.memory_limit else None,
+            'resident_mb': round(resident / MB, 1),
+            'process_rss_mb': round(rss / MB, 1) if rss is not None else None,
+            'models': models
+        })
+        return stats
+
+
+# Global registry instance, shared by every MedicalAICore, AdvancedMedicalAI and MedicineAnalyzer
+model_registry = ModelRegistry(
+    memory_limit_mb=float(os.environ['CURAVOX_MODEL_MEMORY_MB']) if os.environ.get('CURAVOX_MODEL_MEMORY_MB') else None
+)
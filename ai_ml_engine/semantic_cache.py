@@ -0,0 +1,282 @@
+"""
+Semantic Cache for Medical AI Assistant
+Serves cached LLM answers for near-duplicate questions using hashed n-gram vectors
+"""
+
+import re
+import json
+import time
+import zlib
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import numpy as np
+
+try:
+    from caching_system import LatencyRecorder
+except ImportError:
+    from ai_ml_engine.caching_system import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger(__name__ + ".audit")
+
+# Words that carry no meaning for matching ("what is X used for" ~ "X for")
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did can could should would will shall may might must
+i me my we our you your it its this that these those what whats which who whom how when where why
+of for to in on at by with about from as into and or but if so than then there here please tell
+use used uses using take taking taken give explain know want need some any much many also just
+s t m d ve re ll
+""".split())
+
+# A question and its negation are near-identical as vectors but not in meaning
+NEGATIONS = frozenset("not no never without cannot don doesn didn isn aren shouldn won".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+class HashedNgramEmbedder:
+    """
+    Embeds text as a signed, hashed bag of character n-grams and words
+
+    No model download and no state: the same text always maps to the same
+    vector, in any process. Stopwords are dropped first, so the vector is
+    dominated by content terms (medicine names, symptoms).
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (3, 5), word_weight: float = 2.0):
+        """
+        Initialize the embedder
+
+        Args:
+            dim: Vector dimension
+            ngram_range: Smallest and largest character n-gram
+            word_weight: Weight of whole-word features relative to n-grams
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+
+    @staticmethod
+    def content_terms(text: str) -> list:
+        """Lowercased tokens with stopwords (and contraction fragments like 's) removed"""
+        return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+    def _features(self, terms: Iterable[str]):
+        low, high = self.ngram_range
+        for term in terms:
+            yield "w:" + term, self.word_weight
+            padded = f" {term} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n], 1.0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return an L2-normalized float32 vector (all zeros for content-free text)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(self.content_terms(text)):
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup over cached answers with a NumPy cosine index
+
+    A lookup returns the answer of the most similar cached question when the
+    cosine similarity reaches the threshold and the two questions agree on
+    their guard terms: every number (doses, strengths), negation and
+    protected term (e.g. known medicine names) must match exactly, so
+    "paracetamol 650" never answers "paracetamol 500", "is X not safe" never
+    answers "is X safe" and "ibuprofen" never answers "paracetamol". Entries are partitioned by namespace (e.g. a patient
+    context fingerprint). Each semantic hit is written to the audit log with
+    both questions and the similarity so false hits can be reviewed.
+    """
+
+    def __init__(self, threshold: float = 0.85, capacity: int = 1000, ttl: float = 3600,
+                 embedder: Optional[HashedNgramEmbedder] = None,
+                 protected_terms: Iterable[str] = (),
+                 audit_log_path: Optional[str] = None,
+                 audit_size: int = 100):
+        """
+        Initialize the semantic cache
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            capacity: Maximum number of cached questions (least recently used are replaced)
+            ttl: Seconds an answer stays servable
+            embedder: Text embedder (defaults to HashedNgramEmbedder)
+            protected_terms: Terms that must match exactly between the two questions
+            audit_log_path: Optional JSON-lines file receiving every semantic hit
+            audit_size: Number of recent hits kept in memory for get_stats()
+        """
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.protected_terms = frozenset(term.lower() for term in protected_terms)
+        self.audit_log_path = audit_log_path
+
+        self.vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.namespace_ids = np.full(capacity, -1, dtype=np.int64)
+        self.entries = [None] * capacity  # (question, answer, guard terms)
+        self.size = 0
+        self.namespaces = {}
+        self.lock = threading.Lock()
+
+        self.audit = deque(maxlen=audit_size)
+        self.latency = LatencyRecorder()
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'exact_hits': 0,
+            'misses': 0,
+            'guard_rejections': 0,
+            'inserts': 0
+        }
+
+    def _guard(self, text: str) -> Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]:
+        """Numbers, negations and protected terms that must agree for two questions to match"""
+        terms = self.embedder.content_terms(text)
+        numbers = frozenset(_NUMBER_PATTERN.findall(" ".join(terms)))
+        negations = frozenset(t for t in _TOKEN_PATTERN.findall(text.lower()) if t in NEGATIONS)
+        return numbers, negations, frozenset(t for t in terms if t in self.protected_terms)
+
+    def _namespace_id(self, namespace: str) -> int:
+        """Map a namespace to a small int (caller holds the lock)"""
+        if namespace not in self.namespaces:
+            self.namespaces[namespace] = len(self.namespaces)
+        return self.namespaces[namespace]
+
+    def lookup(self, question: str, namespace: str = "") -> Optional[Any]:
+        """
+        Find the answer to a near-duplicate question
+
+        Args:
+            question: Incoming question
+            namespace: Partition key; only entries with the same namespace match
+
+        Returns:
+            Cached answer or None
+        """
+        start = time.perf_counter()
+        vector = self.embedder.embed(question)
+        guard = self._guard(question)
+        now = time.time()
+
+        with self.lock:
+            self.stats['lookups'] += 1
+            match = None
+            if self.size and namespace in self.namespaces and vector.any():
+                n = self.size
+                similarities = self.vectors[:n] @ vector
+                valid = (self.namespace_ids[:n] == self.namespaces[namespace]) & (self.created_at[:n] > now - self.ttl)
+                similarities = np.where(valid, similarities, -1.0)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity >= self.threshold:
+                    if self.entries[best][2] == guard:
+                        match = best
+                    else:
+                        self.stats['guard_rejections'] += 1
+
+            if match is None:
+                self.stats['misses'] += 1
+                self.latency.record(time.perf_counter() - start)
+                return None
+
+            cached_question, answer, _ = self.entries[match]
+            self.last_used[match] = now
+            self.stats['hits'] += 1
+            exact = cached_question == question
+            if exact:
+                self.stats['exact_hits'] += 1
+
+        self.latency.record(time.perf_counter() - start)
+        if not exact:
+            self._audit(question, cached_question, similarity, namespace)
+        return answer
+
+    def insert(self, question: str, answer: Any, namespace: str = "") -> None:
+        """
+        Cache an answer for later near-duplicate lookups
+
+        Args:
+            question: Question that produced the answer
+            answer: Answer to cache
+            namespace: Partition key (see lookup)
+        """
+        vector = self.embedder.embed(question)
+        if not vector.any():
+            return  # Nothing but stopwords; every such question would match
+        guard = self._guard(question)
+        now = time.time()
+
+        with self.lock:
+            if self.size < self.capacity:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = int(np.argmin(self.last_used))
+            self.vectors[slot] = vector
+            self.created_at[slot] = now
+            self.last_used[slot] = now
+            self.namespace_ids[slot] = self._namespace_id(namespace)
+            self.entries[slot] = (question, answer, guard)
+            self.stats['inserts'] += 1
+
+    def _audit(self, question: str, matched_question: str, similarity: float, namespace: str) -> None:
+        """Record a semantic (non-identical) hit for false-hit review"""
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'question': question,
+            'matched_question': matched_question,
+            'similarity': round(similarity, 4),
+            'namespace': namespace
+        }
+        with self.lock:
+            self.audit.append(record)
+        audit_logger.info(json.dumps(record))
+        if self.audit_log_path:
+            try:
+                with open(self.audit_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write semantic cache audit log: {e}")
+
+    def clear(self) -> None:
+        """Drop every cached question"""
+        with self.lock:
+            self.size = 0
+            self.entries = [None] * self.capacity
+            self.last_used[:] = 0
+            self.namespaces.clear()
+            self.namespace_ids[:] = -1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate, guard rejections, lookup latency and the most recent semantic hits"""
+        with self.lock:
+            stats = dict(self.stats)
+            recent = list(self.audit)
+            size = self.size
+        latency = self.latency.snapshot()
+        stats.update({
+            'hit_rate_percent': round(stats['hits'] / stats['lookups'] * 100, 2) if stats['lookups'] else 0,
+            'entries': size,
+            'threshold': self.threshold,
+            'lookup_latency_ms': {
+                f"p{int(q * 100)}": round(v * 1000, 4) for q, v in latency['quantiles'].items()
+            },
+            'recent_semantic_hits': recent
+        })
+        return stats
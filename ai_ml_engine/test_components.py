@@ -5,6 +5,7 @@ Test script for Medical AI Core components
 
 import sys
 import os
+import time
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 def test_imports():
@@ -60,6 +61,731 @@ def test_basic_functionality():
         traceback.print_exc()
         return False
 
+def test_caching_system():
+    """Test LRU cache eviction and expiry behaviour"""
+    try:
+        from caching_system import LRUCache
+        
+        cache = LRUCache(capacity=3, ttl=3600)
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+        cache.get("a")          # "b" is now least recently used
+        cache.put("d", "D")
+        assert cache.get("b") is None, "LRU entry was not evicted"
+        assert cache.get("a") == "A", "Recently used entry was evicted"
+        assert len(cache) == 3, "Cache exceeded its capacity"
+        print("✓ LRU eviction working")
+        
+        expiring = LRUCache(capacity=3, ttl=0)
+        expiring.put("x", 1)
+        time.sleep(0.01)
+        assert expiring.get("x") is None, "Expired entry was returned"
+        print("✓ TTL expiry working")
+        
+        sliding = LRUCache(capacity=10, ttl=0.3)
+        for key in ("read", "idle", "gone"):
+            sliding.put(key, key)
+        time.sleep(0.2)
+        sliding.get("read")  # A read slides the TTL
+        time.sleep(0.15)
+        assert sliding.expire() == 2 and len(sliding) == 1, "expire() did not reclaim exactly the idle entries"
+        assert sliding.get("read") == "read" and sliding.get_stats()['expirations'] == 2
+        
+        from caching_system import MedicalCacheManager
+        swept = MedicalCacheManager()
+        swept.ocr_cache.ttl = 0.05
+        swept.cache_ocr_result("scan", {"text": "dolo 650"})
+        swept.start_expiry_sweeper(interval=0.05)
+        time.sleep(0.3)
+        swept.stop_expiry_sweeper()
+        assert len(swept.ocr_cache) == 0, "Sweeper left an expired entry in an idle cache"
+        print("✓ Expiry sweeper working")
+        
+        budgeted = LRUCache(capacity=100, ttl=3600, max_bytes=2000)
+        for i in range(20):
+            budgeted.put(f"k{i}", "x" * 300)
+        assert budgeted.current_bytes <= 2000, "Byte budget exceeded"
+        assert budgeted.get("k19") is not None, "Newest entry missing under byte budget"
+        print("✓ Byte-budgeted eviction working")
+        
+        guarded = LRUCache(capacity=2, ttl=3600, admission='tinylfu')
+        for _ in range(3):
+            for key in ("paracetamol", "metformin"):
+                if guarded.get(key) is None:
+                    guarded.put(key, key)
+        for i in range(20):
+            if guarded.get(f"chat{i}") is None:
+                guarded.put(f"chat{i}", i)
+        assert guarded.get("paracetamol") and guarded.get("metformin"), "One-off keys flushed popular entries"
+        print("✓ TinyLFU admission working")
+        
+        from caching_system import make_cache_key
+        from medical_agents import PatientContext
+        ctx_a = PatientContext(age=40, allergies=["penicillin"])
+        ctx_b = PatientContext(age=40, allergies=["penicillin"])
+        assert make_cache_key("advice", "fever", ctx_a) == make_cache_key("advice", "fever", ctx_b), "Equal contexts produced different keys"
+        assert make_cache_key("x", {"a": 1, "b": 2}) == make_cache_key("x", {"b": 2, "a": 1}), "Key depends on dict order"
+        assert make_cache_key("x", ("a", "b")) != make_cache_key("x", "a", "b"), "Distinct arguments collided"
+        print("✓ Stable cache keys working")
+        
+        from caching_system import cache_memoize
+        
+        @cache_memoize(ttl=3600, maxsize=2)
+        def lookup(name, tags=None):
+            return f"{name}:{tags}"
+        
+        assert lookup("dolo", tags=["fever"]) == "dolo:['fever']"
+        assert lookup("dolo", tags=["pain"]) == "dolo:['pain']", "Memoized calls collided"
+        lookup("crocin")
+        info = lookup.cache_info()
+        assert info.misses == 3 and info.currsize == 2, f"Unexpected cache_info: {info}"
+        lookup.cache_clear()
+        assert lookup.cache_info().currsize == 0, "cache_clear did not empty the cache"
+        
+        @cache_memoize(ttl=3600)
+        def echo(*args, **kwargs):
+            return (args, kwargs)
+        assert echo(a=1) == ((), {'a': 1})
+        assert echo('<memoize:kwargs>', ('a', 1)) == (('<memoize:kwargs>', ('a', 1)), {}), "Positional args collided with kwargs"
+        
+        # Shared stores are keyed by stable_hash of the call; it must not vary per process
+        import subprocess
+        from caching_system import _memoize_key, stable_hash
+        calls = [(('dolo', 650), {'tags': ['fever']}), (('dolo',), {'strength': 650})]
+        script = ("from caching_system import _memoize_key, stable_hash\n"
+                  f"for args, kwargs in {calls!r}:\n"
+                  "    print(stable_hash(_memoize_key(args, kwargs, True)))")
+        child = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, text=True, check=True)
+        expected = [stable_hash(_memoize_key(args, kwargs, True)) for args, kwargs in calls]
+        assert child.stdout.split() == expected, "Memoize keys differ between processes"
+        print("✓ Memoization working")
+        
+        import tempfile
+        from caching_system import SharedMemoryCache
+        shared_path = os.path.join(tempfile.mkdtemp(), "llm.cache")
+        writer = SharedMemoryCache(shared_path, capacity=50, ttl=3600, slot_size=512)
+        reader = SharedMemoryCache(shared_path, capacity=50, ttl=3600, slot_size=512)
+        writer.put("llm:fever", {"response": "rest and fluids"})
+        assert reader.get("llm:fever") == {"response": "rest and fluids"}, "Shared entry not visible to second mapping"
+        writer.put("llm:huge", "x" * 1000)
+        assert reader.get("llm:huge") is None, "Oversized value should not be cached"
+        aging = SharedMemoryCache(shared_path, capacity=50, ttl=3600, slot_size=512, soft_ttl=0)
+        time.sleep(0.01)
+        assert aging.get_with_staleness("llm:fever")[1], "Entry past its soft TTL not reported stale"
+        stats = aging.get_stats()
+        assert stats['hits'] == 2 and stats['stale_hits'] == 1, f"Stale hits should be a subset of hits: {stats}"
+        print("✓ Shared memory cache working")
+        
+        import asyncio
+        import threading
+        from caching_system import MedicalCacheManager
+        manager = MedicalCacheManager()
+        computed = []
+        def slow_answer():
+            computed.append(1)
+            time.sleep(0.05)
+            return "rest and fluids"
+        threads = [threading.Thread(target=manager.get_or_compute, args=("fever", slow_answer)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(computed) == 1, f"Concurrent misses computed {len(computed)} times"
+        
+        async def coalesced():
+            async def answer():
+                computed.append(1)
+                await asyncio.sleep(0.05)
+                return "see a doctor"
+            leader = asyncio.ensure_future(manager.aget_or_compute("cough", answer))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(manager.aget_or_compute("cough", answer))
+            survivor = asyncio.ensure_future(manager.aget_or_compute("cough", answer))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            waiter.cancel()
+            return await survivor
+        computed.clear()
+        assert asyncio.run(coalesced()) == "see a doctor", "Cancelled callers cancelled the shared computation"
+        assert len(computed) == 1 and manager.get_cached_llm_response("cough") == "see a doctor"
+        print("✓ Single-flight working")
+        
+        revalidating = MedicalCacheManager(stale_while_revalidate=True)
+        revalidating.llm_cache.soft_ttl = 0.1
+        revalidating.llm_cache.ttl = 0.6
+        answers = iter(["first", "refreshed", "recomputed"])
+        def next_answer():
+            time.sleep(0.05)
+            return next(answers)
+        assert revalidating.get_or_compute("dose", next_answer) == "first"
+        time.sleep(0.12)
+        started = time.perf_counter()
+        assert revalidating.get_or_compute("dose", next_answer) == "first", "Stale entry not served"
+        assert revalidating.get_or_compute("dose", next_answer) == "first"
+        assert time.perf_counter() - started < 0.04, "Stale hit waited for the refresh"
+        assert revalidating.get_cached_llm_response("dose") is None, "Plain lookup returned a stale entry"
+        time.sleep(0.07)
+        assert revalidating.get_or_compute("dose", next_answer) == "refreshed", "Background refresh not stored"
+        time.sleep(0.65)  # Past the hard TTL: recomputed in the caller
+        assert revalidating.get_or_compute("dose", next_answer) == "recomputed"
+        stats = revalidating.get_stats()
+        assert stats['background_refreshes'] == 1, f"Refresh not deduplicated: {stats['background_refreshes']}"
+        
+        async def stale_async():
+            async def refreshed():
+                return "async refresh"
+            revalidating.cache_llm_response("rash", "old")
+            await asyncio.sleep(0.12)
+            served = await revalidating.aget_or_compute("rash", refreshed)
+            await asyncio.sleep(0.01)
+            return served, await revalidating.aget_or_compute("rash", refreshed)
+        assert asyncio.run(stale_async()) == ("old", "async refresh"), "Async stale-while-revalidate failed"
+        print("✓ Stale-while-revalidate working")
+        
+        from caching_system import LatencyRecorder
+        recorder = LatencyRecorder()
+        for _ in range(50):
+            worker = threading.Thread(target=recorder.record, args=(0.002,))
+            worker.start()
+            worker.join()
+        assert len(recorder._buffers) <= 1, f"Buffers of finished threads piled up: {len(recorder._buffers)}"
+        snapshot = recorder.snapshot()
+        assert snapshot['count'] == 50 and abs(snapshot['sum'] - 0.1) < 1e-9 and snapshot['quantiles'][0.5] == 0.002
+        metrics = manager.get_cache_metrics()
+        assert metrics['llm']['hits'] >= 1 and metrics['llm']['get_count'] >= 1, f"Lookups not counted: {metrics['llm']}"
+        exposition = manager.export_prometheus()
+        assert '# TYPE curavox_cache_hits_total counter' in exposition
+        assert f'curavox_cache_hits_total{{cache="llm"}} {metrics["llm"]["hits"]}' in exposition
+        assert 'curavox_cache_operation_latency_seconds{cache="llm",op="get",quantile="0.99"}' in exposition
+        print("✓ Cache metrics working")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Caching test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_semantic_cache():
+    """Test near-duplicate matching and its guards"""
+    try:
+        from semantic_cache import SemanticCache
+        
+        cache = SemanticCache(threshold=0.85, protected_terms=["paracetamol", "ibuprofen"])
+        cache.insert("What is paracetamol used for?", "Pain relief and fever reduction")
+        assert cache.lookup("what's paracetamol for") == "Pain relief and fever reduction", "Paraphrase missed"
+        assert cache.lookup("What is ibuprofen used for?") is None, "Different medicine reused an answer"
+        
+        cache.insert("is paracetamol 650 safe in pregnancy", "Ask your doctor")
+        assert cache.lookup("is paracetamol 500 safe in pregnancy") is None, "Different strength reused an answer"
+        assert cache.lookup("is paracetamol 650 not safe in pregnancy") is None, "Negation reused an answer"
+        assert cache.lookup("What is paracetamol used for?", namespace="patient-1") is None, "Crossed patient contexts"
+        
+        stats = cache.get_stats()
+        assert stats['hits'] == 1 and stats['recent_semantic_hits'], f"Unexpected stats: {stats}"
+        print("✓ Semantic cache working")
+        return True
+    except Exception as e:
+        print(f"✗ Semantic cache test failed: {e}")
+        return False
+
+def test_daemon_protocol():
+    """Test length-prefixed framing and protocol negotiation used by daemon and server mode"""
+    try:
+        import asyncio
+        from daemon_protocol import (encode_frame, read_frame, ProtocolError, MessageError, FRAME_HEADER,
+                                     available_protocols, choose_protocol)
+        
+        async def roundtrip(data, protocol='json'):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return [await read_frame(reader, protocol), await read_frame(reader, protocol)]
+        
+        message = {"action": "get_medical_advice", "query": "dosage of paracetamol?", "requestId": "r1"}
+        for protocol in available_protocols(framed_only=True):
+            result = asyncio.run(roundtrip(encode_frame(message, protocol), protocol))
+            assert result == [message, None], f"{protocol} frame roundtrip failed"
+        try:
+            asyncio.run(roundtrip(FRAME_HEADER.pack(6) + b'[1, 2]'))
+            assert False, "Non-object payload accepted"
+        except MessageError:
+            pass
+        try:
+            asyncio.run(roundtrip(FRAME_HEADER.pack(10) + b'{"a"'))
+            assert False, "Truncated frame accepted"
+        except ProtocolError:
+            pass
+        try:
+            choose_protocol('xml', available_protocols())
+            assert False, "Unknown protocol accepted"
+        except ProtocolError:
+            pass
+        
+        # Once framing is negotiated a stray write to stdout would corrupt the stream for good
+        import subprocess
+        script = ("import os, medical_ai_core\n"
+                  "medical_ai_core.claim_stdout()\n"
+                  "print('stray print')\n"
+                  "os.write(1, b'native write\\n')\n"
+                  "medical_ai_core.switch_stdout_protocol('json')\n"
+                  "medical_ai_core.emit({'type': 'startup'})")
+        child = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, check=True)
+        assert child.stdout == (b'{"type": "protocol", "protocol": "json"}\n'
+                                + encode_frame({'type': 'startup'}, 'json')), f"Stray output on stdout: {child.stdout!r}"
+        assert b'stray print' in child.stderr and b'native write' in child.stderr
+        
+        import tempfile
+        from medical_ai_core import SocketServer, AsyncRequestDispatcher
+        socket_path = os.path.join(tempfile.mkdtemp(), "curavox.sock")
+        
+        async def serve():
+            server = SocketServer(AsyncRequestDispatcher(None), socket_path=socket_path)
+            await server.start()
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            replies = [await read_frame(reader, 'json')]  # startup
+            for message in ([1, 2], {"type": "ping", "requestId": "p1"}):
+                writer.write(encode_frame(message, 'json'))
+                replies.append(await read_frame(reader, 'json'))
+            writer.close()
+            while server.connections:  # Let the handler see the close before the loop ends
+                await asyncio.sleep(0.01)
+            await server.close()
+            return replies
+        
+        if hasattr(asyncio, 'start_unix_server'):
+            startup, invalid, pong = asyncio.run(serve())
+            assert invalid['success'] is False and 'must be an object' in invalid['error'], f"Unexpected reply: {invalid}"
+            assert pong == {"type": "pong", "requestId": "p1"}, "Connection dropped after a non-object frame"
+            with open(socket_path, 'w') as f:
+                f.write("not a socket")
+            try:
+                asyncio.run(SocketServer(AsyncRequestDispatcher(None), socket_path=socket_path).start())
+                assert False, "Server replaced a regular file at its socket path"
+            except FileExistsError:
+                pass
+            assert os.path.isfile(socket_path), "Regular file at the socket path was removed"
+        print("✓ Daemon protocol working")
+        return True
+    except Exception as e:
+        print(f"✗ Daemon protocol test failed: {e}")
+        return False
+
+def test_model_registry():
+    """Test shared model instances, LRU eviction under the memory ceiling and pinning"""
+    try:
+        from model_registry import ModelRegistry, ModelLoadError
+        
+        class FakeModel:
+            """Stands in for a pipeline; parameters() reports 100 MB of float32 weights"""
+            class Weights:
+                def numel(self):
+                    return 25 * 1024 * 1024
+                def element_size(self):
+                    return 4
+            def parameters(self):
+                return [self.Weights()]
+        
+        registry = ModelRegistry(memory_limit_mb=250, failure_backoff=0.1)
+        loads = []
+        def loader(model_id):
+            loads.append(model_id)
+            return FakeModel()
+        
+        first = registry.get('qa', lambda: loader('qa'))
+        assert registry.get('qa', lambda: loader('qa')) is first, "Model loaded twice"
+        registry.get('ner', lambda: loader('ner'), pin=True)
+        registry.get('qa', lambda: loader('qa'))  # ner is now least recently used, but pinned
+        registry.get('summarizer', lambda: loader('summarizer'))
+        stats = registry.get_stats()
+        assert set(stats['models']) == {'ner', 'summarizer'}, f"Unexpected residents: {stats['models']}"
+        assert stats['evictions'] == 1 and registry.state('qa')['state'] == 'evicted'
+        assert loads == ['qa', 'ner', 'summarizer'], f"Unexpected loads: {loads}"
+        
+        def flaky():
+            loads.append('flaky')
+            if loads.count('flaky') == 1:
+                raise OSError("out of memory")
+            return FakeModel()
+        for _ in range(2):
+            try:
+                registry.get('flaky', flaky)
+            except (OSError, ModelLoadError):
+                pass
+        assert loads.count('flaky') == 1, "Failed load was retried before its backoff passed"
+        assert registry.state('flaky')['state'] == 'failed'
+        time.sleep(0.15)
+        assert registry.get('flaky', flaky) is not None, "Load did not recover after the backoff"
+        assert registry.state('flaky')['state'] == 'loaded' and loads.count('flaky') == 2
+        print("✓ Model registry working")
+        return True
+    except Exception as e:
+        print(f"✗ Model registry test failed: {e}")
+        return False
+
+def test_request_dispatchers():
+    """Test daemon request scheduling: deadlines, coalescing, priorities and load shedding"""
+    try:
+        import asyncio
+        import threading
+        from types import SimpleNamespace
+        from medical_ai_core import MedicalAICore, RequestDispatcher, AsyncRequestDispatcher, _schedule_key
+        
+        lock = threading.Lock()
+        
+        class FakeLLM:
+            """Stands in for Ollama; every answer takes 0.2 s, or until gate is set when there is one"""
+            connected = True
+            def __init__(self):
+                self.calls = []
+                self.gate = None
+                self.active = self.peak = 0
+            def generate_medical_response(self, prompt, context):
+                self.calls.append(prompt)
+                with lock:
+                    self.active += 1
+                    self.peak = max(self.peak, self.active)
+                if self.gate is not None:
+                    self.gate.wait(5)
+                else:
+                    time.sleep(0.2)
+                with lock:
+                    self.active -= 1
+                return SimpleNamespace(response=f"answer to {prompt}")
+            async def aensure_probed(self):
+                pass
+            async def agenerate_medical_response(self, prompt, context):
+                self.calls.append(prompt)
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(0.2)
+                self.active -= 1
+                return SimpleNamespace(response=f"answer to {prompt}")
+        
+        ai_core = MedicalAICore()
+        ai_core.local_llm = FakeLLM()
+        
+        async def coalesced(query, deadlines):
+            responses = {}
+            dispatcher = AsyncRequestDispatcher(ai_core, respond=lambda r: responses.setdefault(r['requestId'], r))
+            for i, deadline_ms in enumerate(deadlines):
+                request = {'action': 'get_medical_advice', 'query': query, 'requestId': f"r{i}"}
+                if deadline_ms is not None:
+                    request['deadline_ms'] = deadline_ms
+                dispatcher.submit(request)
+                await asyncio.sleep(0.01)
+            await dispatcher.drain()
+            return [responses[f"r{i}"] for i in range(len(deadlines))]
+        
+        for order, deadlines in enumerate([(50, None), (None, 50)]):
+            responses = asyncio.run(coalesced(f"dispatcher test {order}", deadlines))
+            for deadline_ms, response in zip(deadlines, responses):
+                if deadline_ms is None:
+                    assert response['success'], f"Coalesced request failed with its peer's deadline: {response}"
+                else:
+                    assert response.get('deadline_exceeded'), f"Deadline not enforced: {response}"
+        assert len(ai_core.local_llm.calls) == 2, f"Identical requests were not coalesced: {ai_core.local_llm.calls}"
+        print("✓ Async deadlines with coalesced requests working")
+        
+        def ask(dispatcher, query, **extra):
+            dispatcher.submit({'action': 'get_medical_advice', 'query': query, 'requestId': query, **extra})
+        
+        # Threaded daemon: a slow action at its limit neither blocks other actions nor orders responses
+        llm = ai_core.local_llm = FakeLLM()
+        llm.gate = threading.Event()
+        responses = []
+        threaded = RequestDispatcher(ai_core, max_workers=4, action_limits={'get_medical_advice': 1},
+                                     respond=responses.append)
+        ask(threaded, "threaded slow a")
+        ask(threaded, "threaded slow b")
+        threaded.submit({'action': 'analyze_medicine_text', 'text': "Dolo 650 Paracetamol Tablets IP 650 mg",
+                         'requestId': "quick"})
+        for _ in range(100):
+            if responses:
+                break
+            time.sleep(0.02)
+        assert [r['requestId'] for r in responses] == ["quick"], "Quick request waited behind slow ones"
+        assert llm.calls == ["threaded slow a"], f"Per-action limit not enforced: {llm.calls}"
+        llm.gate.set()
+        threaded.shutdown()
+        assert [r['requestId'] for r in responses] == ["quick", "threaded slow a", "threaded slow b"]
+        assert all(r['success'] for r in responses) and threaded.get_stats()['completed'] == 3
+        print("✓ Threaded dispatcher working")
+        
+        async def async_limits():
+            order = []
+            dispatcher = AsyncRequestDispatcher(ai_core, action_limits={'get_medical_advice': 2},
+                                                respond=lambda r: order.append(r))
+            for i in range(5):
+                ask(dispatcher, f"async limited {i}")
+            dispatcher.submit({'action': 'analyze_medicine_text', 'text': "Crocin Advance Paracetamol Tablets IP 500 mg",
+                               'requestId': "quick"})
+            await dispatcher.drain()
+            return order, dispatcher.get_stats()
+        llm = ai_core.local_llm = FakeLLM()
+        order, stats = asyncio.run(async_limits())
+        assert llm.peak == 2, f"Async per-action limit not enforced: peak {llm.peak}"
+        assert order[0]['requestId'] == "quick", "Quick request waited behind queued LLM calls"
+        assert len(order) == 6 and all(r['success'] for r in order) and stats['completed'] == 6
+        print("✓ Async dispatcher working")
+        
+        # Batch items take a slot of their own action, and give up at the batch's deadline
+        def batch(request_id, count, **extra):
+            return {'action': 'batch', 'requestId': request_id, **extra,
+                    'requests': [{'action': 'get_medical_advice', 'query': f"{request_id} item {i}"} for i in range(count)]}
+        
+        llm = ai_core.local_llm = FakeLLM()
+        responses = []
+        threaded = ai_core.dispatcher = RequestDispatcher(ai_core, max_workers=4, action_limits={'get_medical_advice': 1},
+                                                          respond=responses.append)
+        threaded.submit(batch("threaded batch", 3))
+        threaded.shutdown()
+        assert responses[0]['result']['succeeded'] == 3 and llm.peak == 1, f"Batch items ran {llm.peak} at once"
+        
+        llm.gate = threading.Event()
+        responses.clear()
+        threaded = ai_core.dispatcher = RequestDispatcher(ai_core, max_workers=4, action_limits={'get_medical_advice': 1},
+                                                          respond=responses.append)
+        ask(threaded, "batch blocker")
+        time.sleep(0.05)
+        threaded.submit(batch("late batch", 2, deadline_ms=150))
+        for _ in range(100):
+            if responses:
+                break
+            time.sleep(0.02)
+        assert responses and responses[0]['requestId'] == "late batch", "Batch waited past its deadline"
+        assert all(item.get('deadline_exceeded') for item in responses[0]['result']['results'])
+        llm.gate.set()
+        threaded.shutdown()
+        
+        async def async_batch():
+            got = []
+            dispatcher = ai_core.dispatcher = AsyncRequestDispatcher(ai_core, action_limits={'get_medical_advice': 1},
+                                                                     respond=got.append)
+            dispatcher.submit(batch("async batch", 3))
+            await dispatcher.drain()
+            return got
+        llm = ai_core.local_llm = FakeLLM()
+        got = asyncio.run(async_batch())
+        ai_core.dispatcher = None
+        assert got[0]['result']['succeeded'] == 3 and llm.peak == 1, f"Async batch items ran {llm.peak} at once"
+        print("✓ Batch per-item limits working")
+        
+        # Queued requests expire without running, bad deadlines are refused and a full queue sheds
+        llm = ai_core.local_llm = FakeLLM()
+        llm.gate = threading.Event()
+        responses = []
+        threaded = RequestDispatcher(ai_core, max_workers=4, action_limits={'get_medical_advice': 1},
+                                     max_queue=1, respond=responses.append)
+        ask(threaded, "held")
+        ask(threaded, "expiring", deadline_ms=100)
+        time.sleep(0.3)
+        assert [r['requestId'] for r in responses] == ["expiring"] and responses[0]['deadline_exceeded'], \
+            f"Sweeper did not expire the queued request: {responses}"
+        ask(threaded, "queued")
+        ask(threaded, "shed")
+        assert responses[-1]['requestId'] == "shed" and responses[-1]['overloaded'], f"Full queue not shed: {responses}"
+        assert responses[-1]['queue_depth'] == 1
+        for bad in (-1, "soon", True):
+            ask(threaded, f"bad {bad}", deadline_ms=bad)
+            assert not responses[-1]['success'] and 'deadline_ms' in responses[-1]['error']
+            assert responses[-1]['requestId'] == f"bad {bad}"
+        assert threaded.get_stats()['shed'] == 1
+        llm.gate.set()
+        threaded.shutdown()
+        assert llm.calls == ["held", "queued"], f"Expired or shed requests ran: {llm.calls}"
+        
+        async def async_admission():
+            got = []
+            dispatcher = AsyncRequestDispatcher(ai_core, action_limits={'get_medical_advice': 1}, max_queue=1,
+                                                respond=got.append)
+            for query in ("async held", "async queued", "async shed"):
+                ask(dispatcher, query)
+            ask(dispatcher, "async bad", deadline_ms="soon")
+            await dispatcher.drain()
+            return {r['requestId']: r for r in got}, dispatcher.get_stats()
+        llm = ai_core.local_llm = FakeLLM()
+        got, stats = asyncio.run(async_admission())
+        assert got["async shed"]['overloaded'] and stats['shed'] == 1, f"Async queue not shed: {got}"
+        assert not got["async bad"]['success'] and 'deadline_ms' in got["async bad"]['error']
+        assert got["async held"]['success'] and got["async queued"]['success']
+        print("✓ Deadlines and load shedding working")
+        
+        llm = ai_core.local_llm = FakeLLM()
+        llm.gate = threading.Event()
+        threaded = RequestDispatcher(ai_core, max_workers=1, action_limits={}, respond=lambda r: None)
+        ask(threaded, "priority blocker")
+        time.sleep(0.05)  # The blocker holds the only worker
+        for query, priority in (("priority low", 'low'), ("priority normal", 'normal'), ("priority emergency", 'emergency')):
+            ask(threaded, query, priority=priority)
+        threaded_stats = threaded.get_stats()
+        assert threaded_stats['queued_by_priority'] == {'low': 1, 'normal': 1, 'emergency': 1}, threaded_stats
+        llm.gate.set()
+        threaded.shutdown()
+        assert llm.calls[1:] == ["priority emergency", "priority normal", "priority low"], f"Wrong order: {llm.calls}"
+        # Aging: low work that waited three aging periods beats fresh emergencies, so it never starves
+        assert _schedule_key('low', 0.0) < _schedule_key('emergency', 16.0)
+        
+        async def async_stats():
+            dispatcher = AsyncRequestDispatcher(ai_core, action_limits={'get_medical_advice': 1}, respond=lambda r: None)
+            for query, priority in (("stats running", 'normal'), ("stats low", 'low'), ("stats high", 'high')):
+                ask(dispatcher, query, priority=priority)
+            await asyncio.sleep(0.01)
+            stats = dispatcher.get_stats()
+            await dispatcher.drain()
+            return stats
+        llm.gate = None
+        stats = asyncio.run(async_stats())
+        assert stats['queued_by_priority'] == {'low': 1, 'high': 1}, stats
+        assert set(stats) == set(threaded_stats), f"Stats differ by mode: {set(stats) ^ set(threaded_stats)}"
+        print("✓ Priority scheduling working")
+        return True
+    except Exception as e:
+        print(f"✗ Request dispatcher test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_daemon_startup():
+    """Test what the daemon does around startup: cache warm-up, the LLM health monitor and pipeline preloading"""
+    try:
+        import io
+        import json
+        import asyncio
+        import contextlib
+        import tempfile
+        import threading
+        from types import SimpleNamespace
+        from medical_ai_core import MedicalAICore, PIPELINE_SPECS, start_pipeline_preload
+        from caching_system import make_cache_key
+        from local_llm_integration import LocalMedicalLLM
+        from model_registry import ModelRegistry
+        
+        class FakeLLM:
+            """Stands in for a connected Ollama that answers at once"""
+            connected = True
+            def __init__(self):
+                self.calls = []
+            def generate_medical_response(self, prompt, context):
+                self.calls.append(prompt)
+                return SimpleNamespace(response=f"answer to {prompt}")
+        
+        ai_core = MedicalAICore()
+        llm = ai_core.local_llm = FakeLLM()
+        config_path = os.path.join(tempfile.mkdtemp(), "warmup.json")
+        with open(config_path, 'w') as f:
+            json.dump({'medicine_texts': ["Dolo 650 Paracetamol Tablets IP 650 mg"],
+                       'medical_advice': ["Warm-up question one?", "Warm-up question two?"]}, f)
+        
+        status = ai_core.warm_up_caches(config_path)
+        knowledge_base = len(ai_core.medicine_analyzer.medical_knowledge_base)
+        assert status['entries']['knowledge_base'] == knowledge_base and status['entries']['medicine_texts'] == 1, status
+        assert status['llm_calls'] == 0 and not llm.calls, "Warm-up used the LLM without an llm_limit"
+        medicine_cache = ai_core.cache_manager.medicine_cache
+        hits = medicine_cache.get_stats()['hits']
+        ai_core.analyze_medicine_from_text("Dolo 650 Paracetamol Tablets IP 650 mg")
+        assert medicine_cache.get_stats()['hits'] == hits + 1, "Warmed entry missed on the read path"
+        assert ai_core.cache_manager.get_cached_llm_response(make_cache_key("medical_advice", "Warm-up question one?", None)) is None
+        
+        status = ai_core.warm_up_caches(config_path, llm_limit=1)
+        assert status['llm_calls'] == 1 and llm.calls == ["Warm-up question one?"], f"LLM budget not honoured: {llm.calls}"
+        assert status['entries']['medical_advice'] == 1
+        print("✓ Cache warm-up working")
+        
+        class ScriptedOllama(LocalMedicalLLM):
+            """LocalMedicalLLM whose /api/tags answers come from a script instead of HTTP"""
+            def __init__(self):
+                super().__init__()
+                self.tags = None
+                self.probes = 0
+            def _fetch_models(self):
+                self.probes += 1
+                time.sleep(0.05)
+                return self.tags
+            async def _afetch_models(self):
+                return self._fetch_models()
+        
+        assert not MedicalAICore().local_llm._probed.is_set(), "Constructing the core probed Ollama"
+        llm = ScriptedOllama()
+        readers = [threading.Thread(target=lambda: llm.connected) for _ in range(5)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        assert llm.probes == 1 and not llm.connected, f"First readers did not share one probe: {llm.probes}"
+        
+        llm = ScriptedOllama()
+        changes = []
+        llm.start_health_monitor(on_change=changes.append).join(0.3)
+        assert [c['available'] for c in changes] == [False], f"Monitor did not announce the first probe: {changes}"
+        llm.tags = ["llama3.2:3b"]
+        llm.refresh_health()
+        llm.refresh_health()
+        assert [c['available'] for c in changes] == [False, True], f"Unchanged health was re-announced: {changes}"
+        assert changes[-1]['available_models'] == ["llama3.2:3b"] and llm.health_status()['available']
+        llm._mark_unreachable()
+        assert [c['available'] for c in changes] == [False, True, False] and not llm.connected
+        llm.stop_health_monitor()
+        
+        async def monitor():
+            task = asyncio.create_task(llm.amonitor_health(on_change=changes.append))
+            await asyncio.sleep(0.2)
+            task.cancel()
+        llm = ScriptedOllama()
+        llm.tags = ["llama3.2:3b"]
+        changes = []
+        asyncio.run(monitor())
+        assert [c['available'] for c in changes] == [True] and llm.probes == 1, f"Async monitor: {changes}"
+        print("✓ LLM health monitor working")
+        
+        for bad in ({'preload_policy': 'bogus'}, {'preload_pipelines': ['ner', 'ocr']}):
+            try:
+                MedicalAICore(**bad)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"MedicalAICore accepted {bad}")
+        
+        registry = ModelRegistry()
+        
+        class StubPipelineCore(MedicalAICore):
+            """Loads a placeholder per pipeline into a private registry instead of a Hugging Face model"""
+            def get_pipeline(self, name, pin=False):
+                self.model_registry = registry
+                _, model, _ = PIPELINE_SPECS[name]
+                return registry.get(model, lambda: f"{name} pipeline", pin=pin)
+        
+        def states(core):
+            return {name: p['state'] for name, p in core.get_pipeline_status()['pipelines'].items()}
+        
+        core = StubPipelineCore()
+        core.model_registry = registry
+        assert core.get_pipeline_status()['policy'] == 'on-demand' and set(states(core).values()) == {'not_loaded'}
+        assert start_pipeline_preload(core) is None, "on-demand core started a preload"
+        
+        core = StubPipelineCore(preload_policy='eager', preload_pipelines=['ner'])
+        assert states(core) == {'ner': 'loaded', 'qa': 'not_loaded', 'summarizer': 'not_loaded'}, states(core)
+        assert core.get_pipeline_status()['pipelines']['ner']['pinned'], "Preloaded pipeline is evictable"
+        assert start_pipeline_preload(core) is None, "eager core started a second preload"
+        
+        core = StubPipelineCore(preload_policy='background', preload_pipelines=['ner', 'qa'])
+        assert states(core)['qa'] == 'not_loaded', "background core loaded before start_pipeline_preload"
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            start_pipeline_preload(core).join(5)
+        message = json.loads(out.getvalue())
+        assert message['type'] == 'preload' and message['pipelines'] == states(core), message
+        assert message['pipelines']['qa'] == 'loaded' and message['pipelines']['summarizer'] == 'not_loaded'
+        print("✓ Pipeline preload policy working")
+        return True
+    except Exception as e:
+        print(f"✗ Daemon startup test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     print("=== Medical AI Core Component Tests ===")
     
@@ -77,6 +803,48 @@ def main():
         print("✗ Basic functionality failed")
         return
     
+    print("\n3. Testing Caching System:")
+    if test_caching_system():
+        print("✓ Caching system working")
+    else:
+        print("✗ Caching system failed")
+        return
+    
+    print("\n4. Testing Semantic Cache:")
+    if test_semantic_cache():
+        print("✓ Semantic cache working")
+    else:
+        print("✗ Semantic cache failed")
+        return
+    
+    print("\n5. Testing Daemon Protocol:")
+    if test_daemon_protocol():
+        print("✓ Daemon protocol working")
+    else:
+        print("✗ Daemon protocol failed")
+        return
+    
+    print("\n6. Testing Model Registry:")
+    if test_model_registry():
+        print("✓ Model registry working")
+    else:
+        print("✗ Model registry failed")
+        return
+    
+    print("\n7. Testing Request Dispatchers:")
+    if test_request_dispatchers():
+        print("✓ Request dispatchers working")
+    else:
+        print("✗ Request dispatchers failed")
+        return
+    
+    print("\n8. Testing Daemon Startup:")
+    if test_daemon_startup():
+        print("✓ Daemon startup working")
+    else:
+        print("✗ Daemon startup failed")
+        return
+    
     print("\n=== All Tests Passed! ===")
     print("Medical AI Core is ready for use")
 
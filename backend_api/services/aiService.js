@@ -9,6 +9,8 @@ const fs = require('fs').promises;
 const os = require('os');
 const { v4: uuidv4 } = require('uuid');
 
+const AI_REQUEST_TIMEOUT_MS = 90000;
+
 class AdvancedMedicalAI {
   constructor() {
     // Singleton Pattern: Prevent multiple spawns
@@ -22,6 +24,7 @@ class AdvancedMedicalAI {
     this.pythonProcess = null;
     this.pendingRequests = new Map();
     this.isPythonReady = false;
+    this.isLLMAvailable = false; // Updated by llm_status messages
     this.buffer = '';
     this.logFile = path.join(__dirname, '../../logs/backend.log');
 
@@ -110,6 +113,28 @@ class AdvancedMedicalAI {
             console.log("✅ AI Engine is READY and listening.");
             this.logToFile("AI Engine Reported: READY");
             this.isPythonReady = true;
+          } else if (message.type === 'warmup') {
+            // Background cache warm-up finished; informational only
+            const warmupMsg = `AI Engine cache warm-up ${message.status} in ${message.duration_ms}ms`;
+            console.log(`🔥 ${warmupMsg}`);
+            this.logToFile(warmupMsg);
+          } else if (message.type === 'preload') {
+            // Background model preload finished; informational only
+            const preloadMsg = `AI Engine model preload ${message.status}: ${JSON.stringify(message.pipelines)}`;
+            console.log(`📦 ${preloadMsg}`);
+            this.logToFile(preloadMsg);
+          } else if (message.type === 'llm_status') {
+            // Ollama came up or went away; the engine itself stays ready either way
+            this.isLLMAvailable = message.available;
+            const llmMsg = message.available
+              ? `Local LLM available (model ${message.model})`
+              : "Local LLM unavailable; answering with offline fallbacks";
+            console.log(`${message.available ? '🧠' : '⚠️'} ${llmMsg}`);
+            this.logToFile(llmMsg);
+          } else if (message.type === 'batch_item') {
+            // Streamed batch result; the final response still resolves the request
+            const request = this.pendingRequests.get(message.requestId);
+            if (request && request.onItem) request.onItem(message);
           } else {
             this.resolveRequest(message);
           }
@@ -161,7 +186,7 @@ class AdvancedMedicalAI {
   /**
    * Public API to call Python
    */
-  async callPythonEngine(action, params) {
+  async callPythonEngine(action, params, onItem = null) {
     if (!this.pythonProcess) {
       throw new Error("AI Engine process not started.");
     }
@@ -170,12 +195,13 @@ class AdvancedMedicalAI {
     const payload = {
       requestId, // Critical for matching response
       action,
+      deadline_ms: AI_REQUEST_TIMEOUT_MS, // Python drops the request once we have given up on it
       ...params
     };
 
     return new Promise((resolve, reject) => {
       // Store the promise triggers
-      this.pendingRequests.set(requestId, { resolve, reject });
+      this.pendingRequests.set(requestId, { resolve, reject, onItem });
 
       // Send to Python
       const jsonStr = JSON.stringify(payload) + '\n'; // Newline is critical
@@ -187,7 +213,7 @@ class AdvancedMedicalAI {
           this.pendingRequests.delete(requestId);
           reject(new Error("AI Engine Timeout (90s)"));
         }
-      }, 90000);
+      }, AI_REQUEST_TIMEOUT_MS);
     });
   }
 
@@ -215,6 +241,16 @@ class AdvancedMedicalAI {
     }
   }
 
+  /**
+   * Analyze many OCR texts (e.g. a pharmacy shelf) in one round trip.
+   * Results keep input order; pass onItem to receive each one as it finishes.
+   */
+  async analyzeMedicineTexts(userId, ocrTexts, onItem = null) {
+    const requests = ocrTexts.map(text => ({ action: 'analyze_medicine_text', text }));
+    const result = await this.callPythonEngine('batch', { requests, stream: Boolean(onItem) }, onItem);
+    return result.results || result;
+  }
+
   async checkInteractions(userId, medicine1, medicine2) {
     try {
       const result = await this.callPythonEngine('get_medical_advice', {